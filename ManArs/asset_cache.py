@@ -0,0 +1,69 @@
+"""
+Processed image assets for the dashboard
+----------------------------------------
+Purpose:
+    Team logos are shown with their white / grey / beige background removed and resized.
+    Doing that on every launch is wasted work, so the processed RGBA image is saved in
+    .asset_cache/ under a key made of the source file's hash, the target size and the
+    processing version. Later launches just open the small cached PNG.
+
+How:
+    Background removal is one set of NumPy masks over the whole (height, width, 4) pixel
+    array instead of a Python loop over img.getdata().
+"""
+
+import hashlib
+import os
+
+import numpy as np
+from PIL import Image
+
+from pipeline_cache import hash_file
+
+ASSET_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".asset_cache")
+# Why: bump when the processing below changes, so old cached images are not reused
+PROCESSING_VERSION = 1
+
+
+def remove_background(img):
+    """Make white, light grey and other very light (beige, off-white) pixels fully transparent."""
+    pixels = np.array(img.convert("RGBA"))
+    r, g, b = (pixels[..., i].astype(np.int16) for i in range(3))
+
+    is_background = (
+        # Pure white
+        ((r > 240) & (g > 240) & (b > 240)) |
+        # Light gray
+        ((np.abs(r - g) < 10) & (np.abs(g - b) < 10) & (np.abs(r - b) < 10) & (r > 200)) |
+        # Very light colors (beige, off-white, etc.)
+        ((r > 230) & (g > 230) & (b > 220))
+    )
+    pixels[is_background] = (255, 255, 255, 0)
+    return Image.fromarray(pixels, "RGBA")
+
+
+def _cache_key(path, size, transparent):
+    key = f"{hash_file(path)}-{size[0]}x{size[1]}-{int(transparent)}-v{PROCESSING_VERSION}"
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def processed_logo(path, size, transparent=True, cache_dir=ASSET_CACHE_DIR):
+    """
+    `path` as an RGBA image resized to `size` (width, height), background removed if `transparent`.
+    Served from the disk cache when the same source file was processed before.
+    """
+    cached_path = os.path.join(cache_dir, _cache_key(path, size, transparent) + ".png")
+    if os.path.exists(cached_path):
+        return Image.open(cached_path).convert("RGBA")
+
+    img = Image.open(path).convert("RGBA")
+    if transparent:
+        img = remove_background(img)
+    img = img.resize(size, Image.Resampling.LANCZOS)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to a temporary name first so a crash never leaves a half-written cache file
+    tmp_path = cached_path + ".tmp"
+    img.save(tmp_path, format="PNG")
+    os.replace(tmp_path, cached_path)
+    return img
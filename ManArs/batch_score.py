@@ -0,0 +1,110 @@
+"""
+Batch scoring
+-------------
+Purpose:
+    Score a whole fixture list (a matchweek, a season's fixtures, a historical replay)
+    instead of the single fixture Step 5 prints. The fixture file is read in chunks:
+        1. build the Step 2 pre-match features for the chunk from team_state.json
+           (FixtureFeatureBuilder - form, Elo, rest days, head-to-head)
+        2. one predict_proba call for the whole chunk
+        3. append the chunk's probabilities to the output file
+    so memory stays bounded by the chunk size whatever the length of the list.
+
+Input:
+    CSV / Parquet / Feather with HomeTeam, AwayTeam and Date columns (and optionally Matchweek), in date order
+    (rest days carry over from one chunk to the next). Opening bookmaker prices (B365H/B365D/B365A,
+    BWH/BWD/BWA, ...) are turned into the odds features when present; fixtures without them are
+    scored by the registered model trained without odds.
+    Features come from the saved team state, so every fixture is scored with the form
+    and ratings as they are now.
+
+Usage:
+    python batch_score.py fixtures.csv predictions.parquet
+    python batch_score.py fixtures.csv predictions.csv --engine goals --chunk-rows 20000
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+import feature_sets
+import model_registry
+import odds_engine
+import storage
+from fixture_builder import FixtureFeatureBuilder, score_fixtures
+from goals_model import DixonColesModel
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_COLUMNS = ['Date', 'HomeTeam', 'AwayTeam']
+OPTIONAL_COLUMNS = ['Matchweek']    # copied to the output when the fixture file has them
+PROB_COLUMNS = ['prob_Away', 'prob_Draw', 'prob_Home']
+
+
+def fixture_columns(path):
+    """Columns to read from the fixture file: the fixture itself plus any model inputs it provides."""
+    available = storage.table_columns(path)
+    missing = [col for col in FIXTURE_COLUMNS if col not in available]
+    if missing:
+        raise ValueError(f"Fixture file {path} is missing columns: {missing}")
+    optional = [col for col in OPTIONAL_COLUMNS if col in available]
+    prices = [col for book in odds_engine.available_books(available) for col in odds_engine.price_columns(book)]
+    extra = [col for col in feature_sets.source_columns() if col in available and col not in FIXTURE_COLUMNS]
+    return optional + FIXTURE_COLUMNS + prices + extra
+
+
+def make_scorer(engine, data_dir=DATA_DIR):
+    """Return score(chunk) -> chunk with prob_* columns, for the 'model' or 'goals' engine."""
+    if engine == 'goals':
+        goals_path = os.path.join(data_dir, "goals_model.json")
+        if os.path.exists(goals_path):
+            goals_model = DixonColesModel.load(goals_path)
+        else:
+            goals_model = DixonColesModel().fit(storage.read_table(storage.table_path(data_dir, "combined_matches")))
+        return goals_model.predict_outcomes
+
+    registered = model_registry.load_model(registry_dir=os.path.join(data_dir, "models"))
+    builder = FixtureFeatureBuilder.from_file(os.path.join(data_dir, "team_state.json"))
+
+    def score(chunk):
+        scored = score_fixtures(chunk, registered, builder)
+        builder.mark_played(chunk)
+        return scored
+    return score
+
+
+def score_file(input_path, output_path, engine='model', chunk_rows=50_000, data_dir=DATA_DIR):
+    """Stream `input_path` through the scorer into `output_path`. Returns (rows, rows per second)."""
+    score = make_scorer(engine, data_dir)
+    columns = fixture_columns(input_path)
+
+    start = time.perf_counter()
+    with storage.TableWriter(output_path) as writer:
+        for chunk in storage.iter_table(input_path, chunk_rows, columns):
+            scored = score(chunk)
+            # Probabilities are stored in the order Away, Draw, Home (as Step 4 saves them)
+            probs = scored[PROB_COLUMNS].to_numpy()
+            scored['prediction'] = np.array(['Away', 'Draw', 'Home'])[probs.argmax(axis=1)]
+            writer.write(scored[columns + PROB_COLUMNS + ['prediction']])
+            print(f"⚙️ Scored {writer.rows:,} fixtures")
+        rows = writer.rows
+    elapsed = time.perf_counter() - start
+    return rows, rows / elapsed if elapsed else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a fixture list in bulk")
+    parser.add_argument("input", help="fixture file (.csv, .parquet or .feather) with Date, HomeTeam, AwayTeam")
+    parser.add_argument("output", help="predictions file (.csv, .parquet or .feather)")
+    parser.add_argument("--engine", choices=["model", "goals"], default="model",
+                        help="registered model from Step 4, or the Dixon-Coles goals model")
+    parser.add_argument("--chunk-rows", type=int, default=50_000, help="fixtures per chunk")
+    args = parser.parse_args()
+
+    rows, rows_per_second = score_file(args.input, args.output, args.engine, args.chunk_rows)
+    print(f"📂 {rows:,} predictions saved to: {args.output} ({rows_per_second:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+"""
+Benchmark suite
+---------------
+Purpose:
+    The real data is five seasons of one league (about 1,900 matches), which is too small to
+    show how the pipeline scales. This suite generates synthetic leagues in the same schema
+    as the manars_YYYY-YY.csv season files and times each stage at 10k, 100k and 1M matches:
+        ingest            Step 1: read the season files, combine, drop duplicates
+        standardize       Step 2.2 - 2.3
+        rolling_features  Step 2.4: rolling form
+        elo               Step 2.5: Elo ratings
+        rest_days         Step 2.6: rest days
+        head_to_head      Step 2.6b: head-to-head record
+        odds              Step 2.7: bookmaker probabilities and consensus
+        training          Step 4.4: the random forest fit (on at most TRAIN_ROWS recent matches)
+        batch_inference   team state -> fixture features -> predict_proba for every match
+    Every run is appended to benchmark_history.jsonl with the git commit it ran on, and each
+    stage is compared with the previous run at the same size, so slowdowns between versions
+    stand out.
+
+Synthetic leagues:
+    Each league is a double round-robin of 20 teams, one round a week from August to May.
+    Teams have attack / defence strengths that drift from season to season; goals are
+    Poisson with a home advantage, and shots, corners and cards follow the expected goals.
+    Every bookmaker prices 1X2, over/under 2.5 and the Asian handicap from the true
+    probabilities with its own noise and margin; closing prices are sharper than opening.
+    Sizes above one league's history are reached by adding leagues (Div L001, L002, ...).
+
+Usage:
+    python benchmark.py                                    # 10k, 100k and 1M matches
+    python benchmark.py --sizes 10000 100000 --memory      # also trace peak memory (slower)
+    python benchmark.py --sizes 10000 --fail-on-regression
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.stats import poisson
+from sklearn.ensemble import RandomForestClassifier
+
+import feature_sets
+import feature_store
+import profiling
+import step1_data_collection as step1
+import step2_feature_engineering as step2
+from fixture_builder import FixtureFeatureBuilder, score_fixtures
+from head_to_head import add_head_to_head_features
+from elo_engine import add_elo_features
+from model_registry import RegisteredModel
+from team_features import add_rolling_features, add_rest_days
+from walk_forward import season_of
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_FILE = os.path.join(DATA_DIR, "benchmark_history.jsonl")
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+TEAMS_PER_LEAGUE = 20
+MAX_SEASONS = 20            # larger sizes add leagues rather than seasons
+LAST_SEASON = 2024          # the most recent synthetic season is 2024/25
+TRAIN_ROWS = 100_000        # Step 4's forest is fitted on at most this many recent matches
+REGRESSION_THRESHOLD = 1.25  # a stage 25% slower than the previous run at the same size is flagged
+
+# -------------------------
+# Season file schema (column order of manars_YYYY-YY.csv)
+# -------------------------
+MATCH_COLUMNS = ['Div', 'Date', 'Time', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR', 'HTHG', 'HTAG',
+                 'HTR', 'Referee', 'HS', 'AS', 'HST', 'AST', 'HF', 'AF', 'HC', 'AC', 'HY', 'AY', 'HR', 'AR']
+RESULT_BOOKS = {'B365': 0.05, 'BW': 0.055, 'BF': 0.045, 'PS': 0.03, 'WH': 0.06, '1XB': 0.045, 'BFE': 0.01}
+LINE_BOOKS = {'B365': 0.06, 'P': 0.03, 'BFE': 0.01}     # over/under 2.5 and Asian handicap
+RESULT_COLUMN_BOOKS = ['B365', 'BW', 'BF', 'PS', 'WH', '1XB', 'Max', 'Avg', 'BFE']
+LINE_COLUMN_BOOKS = ['B365', 'P', 'Max', 'Avg', 'BFE']
+
+
+def market_columns(closing=False):
+    c = 'C' if closing else ''
+    return ([f'{book}{c}{side}' for book in RESULT_COLUMN_BOOKS for side in 'HDA'] +
+            [f'{book}{c}{side}2.5' for book in LINE_COLUMN_BOOKS for side in '><'] +
+            [f'AH{c}h'] + [f'{book}{c}AH{side}' for book in LINE_COLUMN_BOOKS for side in 'HA'])
+
+
+SEASON_COLUMNS = MATCH_COLUMNS + market_columns() + market_columns(closing=True)
+
+
+# -------------------------
+# Synthetic league generator
+# -------------------------
+
+def round_robin_rounds(n_teams):
+    """Double round-robin by the circle method: (2 * (n - 1) rounds, n / 2 matches, [home, away])."""
+    if n_teams % 2:
+        raise ValueError("n_teams must be even")
+    teams = list(range(n_teams))
+    rounds = []
+    for r in range(n_teams - 1):
+        pairs = [(teams[i], teams[n_teams - 1 - i]) for i in range(n_teams // 2)]
+        if r % 2:
+            # Why: otherwise the fixed team would be at home in every first-half round
+            pairs[0] = pairs[0][::-1]
+        rounds.append(pairs)
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+    first_half = np.array(rounds)
+    return np.concatenate([first_half, first_half[:, :, ::-1]])
+
+
+def _prices(probs, margin, noise, rng):
+    """Decimal odds for (matches, outcomes) probabilities: per-book noise, then the book's margin."""
+    quoted = probs * np.exp(rng.normal(0, noise, probs.shape))
+    quoted /= quoted.sum(axis=1, keepdims=True)
+    return np.maximum(np.round(1 / (quoted * (1 + margin)), 2), 1.01)
+
+
+def _market(columns, probs, books, sides, closing, rng, suffix=''):
+    # Every book in `books` plus the Max / Avg aggregates, for one market (opening or closing)
+    noise = 0.02 if closing else 0.05
+    c = 'C' if closing else ''
+    quoted = {book: _prices(probs, margin, noise, rng) for book, margin in books.items()}
+    stacked = np.stack(list(quoted.values()))
+    quoted['Max'] = stacked.max(axis=0)
+    quoted['Avg'] = np.round(stacked.mean(axis=0), 2)
+    for book, prices in quoted.items():
+        for j, side in enumerate(sides):
+            columns[f'{book}{c}{side}{suffix}'] = prices[:, j]
+
+
+def _season(year, n_leagues, attack, defence, template, rng):
+    # One season of every league as a dict of columns
+    n_rounds, per_round, _ = template.shape
+    n_teams = attack.shape[1]
+
+    # Each league draws its teams into the fixture slots in a new order every season
+    slots = template.reshape(-1, 2)
+    order = np.argsort(rng.random((n_leagues, n_teams)), axis=1)
+    home, away = order[:, slots[:, 0]].ravel(), order[:, slots[:, 1]].ravel()
+    league = np.repeat(np.arange(n_leagues), len(slots))
+    m = len(home)
+
+    # One round a week from the first Saturday on or after 10 August; some games move to Fri/Sun/Mon
+    first = pd.Timestamp(year, 8, 10)
+    first += pd.Timedelta(days=(5 - first.weekday()) % 7)
+    round_no = np.tile(np.repeat(np.arange(n_rounds), per_round), n_leagues)
+    shift = rng.choice([0, 1, 2, -1], size=m, p=[0.6, 0.25, 0.1, 0.05])
+    dates = first + pd.to_timedelta(round_no * 7 + shift, unit='D')
+
+    # Goals: Poisson with home advantage and the teams' attack / defence strengths
+    home_xg = np.exp(0.2 + 0.15 + attack[league, home] - defence[league, away])
+    away_xg = np.exp(0.2 + attack[league, away] - defence[league, home])
+    fthg, ftag = rng.poisson(home_xg), rng.poisson(away_xg)
+    hthg, htag = rng.binomial(fthg, 0.45), rng.binomial(ftag, 0.45)
+
+    def result(h, a):
+        return np.where(h > a, 'H', np.where(h < a, 'A', 'D'))
+
+    hs = rng.poisson(4 * home_xg + 6)
+    as_ = rng.poisson(4 * away_xg + 5)
+    divs = np.array([f'L{i + 1:03d}' for i in range(n_leagues)])
+    names = np.array([[f'{div} Club {i + 1:02d}' for i in range(n_teams)] for div in divs])
+    columns = {
+        'Div': divs[league],
+        'Date': dates,
+        'Time': rng.choice(['12:30', '15:00', '17:30', '20:00'], size=m),
+        'HomeTeam': names[league, home],
+        'AwayTeam': names[league, away],
+        'FTHG': fthg, 'FTAG': ftag, 'FTR': result(fthg, ftag),
+        'HTHG': hthg, 'HTAG': htag, 'HTR': result(hthg, htag),
+        'Referee': np.char.add('Ref ', rng.integers(1, 25, size=m).astype(str)),
+        'HS': hs, 'AS': as_,
+        'HST': np.maximum(rng.binomial(hs, 0.35), fthg), 'AST': np.maximum(rng.binomial(as_, 0.35), ftag),
+        'HF': rng.poisson(11, m), 'AF': rng.poisson(11.5, m),
+        'HC': rng.poisson(2 * home_xg + 3), 'AC': rng.poisson(2 * away_xg + 2.5),
+        'HY': rng.poisson(1.6, m), 'AY': rng.poisson(1.8, m),
+        'HR': rng.binomial(1, 0.04, m), 'AR': rng.binomial(1, 0.05, m),
+    }
+
+    # True 1X2 probabilities from the two Poisson distributions (goals capped at 10)
+    goals = np.arange(11)
+    home_pmf = poisson.pmf(goals, home_xg[:, None])
+    away_pmf = poisson.pmf(goals, away_xg[:, None])
+    away_cdf = away_pmf.cumsum(axis=1)
+    p_home = (home_pmf[:, 1:] * away_cdf[:, :-1]).sum(axis=1)
+    p_draw = (home_pmf * away_pmf).sum(axis=1)
+    probs = np.column_stack([p_home, p_draw, np.clip(1 - p_home - p_draw, 1e-6, None)])
+    p_over = 1 - poisson.cdf(2, home_xg + away_xg)
+    totals = np.column_stack([p_over, 1 - p_over])
+    # Asian handicap lines are set so both sides are close to even money
+    handicap = np.column_stack([np.full(m, 0.5), np.full(m, 0.5)])
+
+    for closing in (False, True):
+        c = 'C' if closing else ''
+        _market(columns, probs, RESULT_BOOKS, 'HDA', closing, rng)
+        _market(columns, totals, LINE_BOOKS, '><', closing, rng, suffix='2.5')
+        columns[f'AH{c}h'] = np.clip(-np.round((home_xg - away_xg) * 4) / 4, -3, 3) + 0.0   # no -0.0
+        _market(columns, handicap, LINE_BOOKS, ['AHH', 'AHA'], closing, rng)
+    return columns
+
+
+def generate_matches(n_matches, n_teams=TEAMS_PER_LEAGUE, seed=0, max_seasons=MAX_SEASONS,
+                     last_season=LAST_SEASON):
+    """
+    `n_matches` synthetic matches (oldest first) in the season file schema, with Date as datetime.
+    The most recent season is cut short when `n_matches` is not a whole number of seasons.
+    """
+    rng = np.random.default_rng(seed)
+    template = round_robin_rounds(n_teams)
+    league_seasons = math.ceil(n_matches / (n_teams * (n_teams - 1)))
+    n_seasons = min(league_seasons, max_seasons)
+    n_leagues = math.ceil(league_seasons / n_seasons)
+
+    attack = rng.normal(0, 0.25, (n_leagues, n_teams))
+    defence = rng.normal(0, 0.25, (n_leagues, n_teams))
+    seasons = []
+    for year in range(last_season - n_seasons + 1, last_season + 1):
+        seasons.append(pd.DataFrame(_season(year, n_leagues, attack, defence, template, rng)))
+        # Strengths drift between seasons (transfers, managers) and are pulled back towards average
+        attack = 0.85 * attack + rng.normal(0, 0.1, attack.shape)
+        defence = 0.85 * defence + rng.normal(0, 0.1, defence.shape)
+
+    matches = pd.concat(seasons, ignore_index=True).sort_values('Date', kind='mergesort')
+    return matches.head(n_matches).reset_index(drop=True)[SEASON_COLUMNS]
+
+
+def write_season_files(matches, directory):
+    """Write `matches` as one manars_YYYY-YY.csv per season (dd/mm/yyyy dates). Returns the paths."""
+    paths = []
+    seasons = season_of(matches['Date'])
+    for year in np.unique(seasons):
+        season = matches[seasons == year].copy()
+        season['Date'] = season['Date'].dt.strftime('%d/%m/%Y')
+        path = os.path.join(directory, f"manars_{year}-{(year + 1) % 100:02d}.csv")
+        season.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+# -------------------------
+# Benchmarks
+# -------------------------
+
+def _benchmark_size(n_matches, profiler, seed, train_rows, work_dir):
+    print(f"\n🏟️ {n_matches:,} matches")
+    start = time.perf_counter()
+    matches = generate_matches(n_matches, seed=seed)
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        write_season_files(matches, tmp)
+        print(f"   generated and written in {time.perf_counter() - start:.1f}s")
+        del matches
+
+        with profiler.stage('ingest', rows=n_matches):
+            df = step1.collect_matches(tmp)
+
+    # Step 2, in the order engineer_features runs it
+    with profiler.stage('standardize', rows=len(df)):
+        df = step2.standardize_matches(df).sort_values('Date').reset_index(drop=True)
+    with profiler.stage('rolling_features', rows=len(df)):
+        df = add_rolling_features(df, window=step2.FORM_WINDOW)
+    with profiler.stage('elo', rows=len(df)):
+        df = add_elo_features(df, **step2.ELO_PARAMS)
+    with profiler.stage('rest_days', rows=len(df)):
+        df = add_rest_days(df, congestion_windows=step2.CONGESTION_WINDOWS)
+    with profiler.stage('head_to_head', rows=len(df)):
+        df = add_head_to_head_features(df, last_n=step2.H2H_LAST_N)
+    with profiler.stage('odds', rows=len(df)):
+        df = step2.add_odds_probs(df)
+
+    # Step 4's model, fitted on the most recent matches
+    train = df.tail(train_rows)
+    model = RandomForestClassifier(n_estimators=200, random_state=42)
+    with profiler.stage('training', rows=len(train)):
+        X = feature_sets.build_matrix(train)
+        model.fit(X, train['match_winner'].to_numpy())
+
+    # Score every match as a fixture against the final team state
+    registered = RegisteredModel(model, feature_sets.PRE_MATCH_FEATURE_NAMES, list(model.classes_),
+                                 version='benchmark', meta={})
+    fixtures = df[['Date', 'HomeTeam', 'AwayTeam']]
+    with profiler.stage('batch_inference', rows=len(fixtures)):
+        state = feature_store.build_state(df, window=step2.FORM_WINDOW, h2h_last_n=step2.H2H_LAST_N,
+                                          **step2.ELO_PARAMS)
+        score_fixtures(fixtures, registered, FixtureFeatureBuilder(state))
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, seed=0, train_rows=TRAIN_ROWS, memory=False, work_dir=None):
+    """Time every stage at each size. Returns one record per (size, stage)."""
+    results = []
+    for n_matches in sizes:
+        profiler = profiling.Profiler('on' if memory else 'time').start()
+        try:
+            _benchmark_size(n_matches, profiler, seed, train_rows, work_dir)
+        finally:
+            profiler.stop()
+        results.extend({'size': n_matches, **record} for record in profiler.records)
+    return results
+
+
+# -------------------------
+# History
+# -------------------------
+
+def git_commit(repo_dir=DATA_DIR):
+    """Short hash of the checked-out commit (with '+dirty' for uncommitted changes), or None."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=repo_dir,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=repo_dir,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("+dirty" if dirty else "")
+
+
+def load_history(path=HISTORY_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(run, path=HISTORY_FILE):
+    with open(path, "a") as f:
+        f.write(json.dumps(run) + "\n")
+
+
+def compare_with_history(results, history, threshold=REGRESSION_THRESHOLD):
+    """
+    Each result with the previous run's time for the same size and stage.
+    Returns a DataFrame (size, stage, rows, seconds, previous, ratio, regression).
+    """
+    previous = {}
+    for run in history:
+        for record in run['results']:
+            previous[(record['size'], record['stage'])] = record['seconds']
+
+    rows = []
+    for record in results:
+        before = previous.get((record['size'], record['stage']))
+        ratio = record['seconds'] / before if before else None
+        rows.append({
+            'size': record['size'], 'stage': record['stage'], 'rows': record['rows'],
+            'seconds': record['seconds'], 'rows_per_second': record['rows_per_second'],
+            'peak_mb': record.get('peak_mb'), 'previous': before, 'ratio': ratio,
+            'regression': bool(ratio is not None and ratio > threshold),
+        })
+    return pd.DataFrame(rows)
+
+
+def print_comparison(comparison):
+    print("\n📊 Benchmark results:")
+    for size, group in comparison.groupby('size', sort=False):
+        print(f"\n{size:,} matches")
+        for row in group.itertuples():
+            change = f"{row.ratio:5.2f}x previous" if pd.notna(row.ratio) else "(no previous run)"
+            flag = "  ⚠️ slower" if row.regression else ""
+            print(f"  {row.stage:16s} {row.seconds:9.3f}s {row.rows_per_second or 0:>12,.0f} rows/s  {change}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic leagues")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="matches per benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--train-rows", type=int, default=TRAIN_ROWS,
+                        help="most recent matches the forest is fitted on")
+    parser.add_argument("--memory", action="store_true", help="also trace peak memory (slows stages down)")
+    parser.add_argument("--history", default=HISTORY_FILE, help="JSON-lines file the runs are appended to")
+    parser.add_argument("--no-save", action="store_true", help="compare with the history but do not append")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help=f"exit with status 1 if a stage is over {REGRESSION_THRESHOLD:.2f}x its previous time")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.seed, args.train_rows, args.memory)
+    # Only runs with the same settings are comparable (tracemalloc alone changes the timings)
+    settings = {'seed': args.seed, 'train_rows': args.train_rows, 'memory': args.memory}
+    history = [run for run in load_history(args.history)
+               if all(run.get(key) == value for key, value in settings.items())]
+    comparison = compare_with_history(results, history)
+    print_comparison(comparison)
+
+    if not args.no_save:
+        append_history({
+            'run_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            **settings,
+            'results': results,
+        }, args.history)
+        print(f"\n📂 Run appended to: {args.history}")
+
+    if args.fail_on_regression and comparison['regression'].any():
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Elo rating engine for Step 2
+----------------------------
+Purpose:
+    Compute Elo ratings for every team in a single chronological pass.
+    Team names are mapped to integer IDs once, and ratings live in a NumPy array,
+    so the loop only does array indexing and arithmetic.
+    If numba is installed the loop is compiled; otherwise a plain Python loop is used.
+
+Output (per match):
+    home_elo / away_elo   -> ratings BEFORE the match (safe to use as pre-match features)
+    elo_home / elo_away   -> ratings AFTER the match
+    elo_diff              -> elo_home - elo_away (post-match, as Step 2 always produced)
+"""
+
+import numpy as np
+import pandas as pd
+
+import profiling
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional
+    njit = None
+
+
+def build_team_index(df):
+    """Map team names to integer IDs. Returns (home_ids, away_ids, teams)."""
+    home, away = df['HomeTeam'], df['AwayTeam']
+    if isinstance(home.dtype, pd.CategoricalDtype) and home.dtype == away.dtype:
+        # Teams share one dictionary (storage.compact): its codes already are team IDs
+        return (home.cat.codes.to_numpy(dtype=np.int64), away.cat.codes.to_numpy(dtype=np.int64),
+                list(home.cat.categories))
+    n = len(df)
+    codes, teams = pd.factorize(
+        np.concatenate([df['HomeTeam'].to_numpy(), df['AwayTeam'].to_numpy()])
+    )
+    return codes[:n], codes[n:], list(teams)
+
+
+def match_scores(df):
+    """Home team's actual score per match: 1 win, 0.5 draw, 0 loss (from FTHG/FTAG)."""
+    goal_diff = df['FTHG'].to_numpy(dtype=float) - df['FTAG'].to_numpy(dtype=float)
+    return (np.sign(goal_diff) + 1) / 2
+
+
+def _elo_loop(home_ids, away_ids, home_scores, ratings, k, home_advantage,
+              pre_home, pre_away, post_home, post_away):
+    for i in range(len(home_ids)):
+        h = home_ids[i]
+        a = away_ids[i]
+        rating_home = ratings[h]
+        rating_away = ratings[a]
+        pre_home[i] = rating_home
+        pre_away[i] = rating_away
+
+        expected_home = 1.0 / (1.0 + 10.0 ** ((rating_away - rating_home - home_advantage) / 400.0))
+        delta = k * (home_scores[i] - expected_home)
+
+        ratings[h] = rating_home + delta
+        ratings[a] = rating_away - delta
+        post_home[i] = rating_home + delta
+        post_away[i] = rating_away - delta
+
+
+_elo_loop_compiled = njit(cache=True)(_elo_loop) if njit is not None else None
+
+
+def elo_pass(home_ids, away_ids, home_scores, ratings, k=20, home_advantage=0.0, use_compiled=True):
+    """
+    Run Elo over matches in order. `ratings` (float array indexed by team ID) is updated in place.
+
+    Returns (pre_home, pre_away, post_home, post_away) arrays.
+    """
+    n = len(home_ids)
+    pre_home, pre_away = np.empty(n), np.empty(n)
+    post_home, post_away = np.empty(n), np.empty(n)
+
+    if use_compiled and _elo_loop_compiled is not None:
+        _elo_loop_compiled(np.asarray(home_ids, dtype=np.int64), np.asarray(away_ids, dtype=np.int64),
+                           np.asarray(home_scores, dtype=np.float64), ratings, float(k),
+                           float(home_advantage), pre_home, pre_away, post_home, post_away)
+    else:
+        # Why: Python lists index much faster than NumPy arrays inside an interpreted loop
+        rating_list = ratings.tolist()
+        _elo_loop(np.asarray(home_ids).tolist(), np.asarray(away_ids).tolist(),
+                  np.asarray(home_scores, dtype=float).tolist(), rating_list, k,
+                  home_advantage, pre_home, pre_away, post_home, post_away)
+        ratings[:] = rating_list
+
+    return pre_home, pre_away, post_home, post_away
+
+
+@profiling.profiled
+def add_elo_features(df, k=20, base_rating=1500, home_advantage=0.0, use_compiled=True):
+    """
+    Add pre-match (home_elo, away_elo) and post-match (elo_home, elo_away, elo_diff) ratings.
+
+    Every team starts at `base_rating`. `home_advantage` is added to the home rating
+    when computing the expected result (0 keeps the original Step 2 behaviour).
+    """
+    df = df.copy()
+    home_ids, away_ids, teams = build_team_index(df)
+    ratings = np.full(len(teams), float(base_rating))
+
+    pre_home, pre_away, post_home, post_away = elo_pass(
+        home_ids, away_ids, match_scores(df), ratings,
+        k=k, home_advantage=home_advantage, use_compiled=use_compiled,
+    )
+
+    elo_cols = pd.DataFrame({
+        'elo_home': post_home,
+        'elo_away': post_away,
+        'elo_diff': post_home - post_away,
+        'home_elo': pre_home,
+        'away_elo': pre_away,
+    }, index=df.index)
+    return pd.concat([df, elo_cols], axis=1)
@@ -0,0 +1,116 @@
+"""
+Model feature sets
+------------------
+Purpose:
+    Declare exactly which columns the models see, and how each one is built, instead of
+    feeding every column of the features table to the model. Only information known BEFORE
+    kick-off is allowed:
+        - rolling form (last 5 matches), pre-match Elo, rest days and head-to-head record from Step 2
+        - bookmaker implied probabilities from pre-match (opening) odds: Bet365 and the consensus
+          across bookmakers, with how much they disagree
+    Outcome fields (FTHG, FTAG, FTR, result_label, half-time score, match stats) and post-match
+    Elo (elo_home / elo_away / elo_diff) are never used - they leak the result.
+
+    Bookmaker prices are not known for every fixture we score, so NO_ODDS_FEATURE_NAMES is the
+    same set without the odds features; Step 4 trains a second model on it for those fixtures
+    (model_registry.OddsFallbackModel).
+
+Output:
+    build_matrix() returns a contiguous float32 NumPy array (rows = matches, columns = features),
+    which is what RandomForest trains on internally anyway, so no copies are made at fit time.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Feature:
+    name: str
+    sources: tuple = ()          # input columns; empty means the column `name` itself
+    transform: str = 'identity'  # 'identity' or 'difference' (sources[0] - sources[1])
+
+
+def _form_features(window=5):
+    return [Feature(f'{side}_{stat}_last{window}')
+            for stat in ('points', 'goals', 'shots', 'sot') for side in ('home', 'away')]
+
+
+PRE_MATCH_FEATURES = [
+    *_form_features(),
+    Feature('home_elo'),
+    Feature('away_elo'),
+    Feature('elo_diff_pre', ('home_elo', 'away_elo'), 'difference'),
+    Feature('days_rest_home'),
+    Feature('days_rest_away'),
+    Feature('rest_days_diff'),
+    Feature('h2h_meetings'),
+    Feature('h2h_goal_diff'),
+    Feature('h2h_last5_points'),
+    Feature('h2h_last5_goal_diff'),
+]
+
+# Built from pre-match bookmaker prices (odds_engine.py) - missing when a fixture has no prices yet
+ODDS_FEATURES = [
+    Feature('odds_home_prob'),
+    Feature('odds_draw_prob'),
+    Feature('odds_away_prob'),
+    Feature('cons_home_prob'),
+    Feature('cons_draw_prob'),
+    Feature('cons_away_prob'),
+    Feature('cons_home_std'),
+    Feature('book_overround'),
+]
+PRE_MATCH_FEATURES += ODDS_FEATURES
+
+# Columns that are only known after the final whistle
+OUTCOME_COLUMNS = ['FTHG', 'FTAG', 'FTR', 'HTHG', 'HTAG', 'HTR', 'result_label', 'match_winner',
+                   'elo_home', 'elo_away', 'elo_diff']
+
+
+def validate_feature_set(features):
+    """Raise if any feature is built from a column that is only known after the match."""
+    for feature in features:
+        leaks = set(feature.sources or (feature.name,)) & set(OUTCOME_COLUMNS)
+        if leaks:
+            raise ValueError(f"Feature {feature.name} uses post-match columns: {sorted(leaks)}")
+
+
+validate_feature_set(PRE_MATCH_FEATURES)
+
+FEATURES = {feature.name: feature for feature in PRE_MATCH_FEATURES}
+PRE_MATCH_FEATURE_NAMES = [feature.name for feature in PRE_MATCH_FEATURES]
+ODDS_FEATURE_NAMES = [feature.name for feature in ODDS_FEATURES]
+NO_ODDS_FEATURE_NAMES = [name for name in PRE_MATCH_FEATURE_NAMES if name not in ODDS_FEATURE_NAMES]
+
+
+def _column(df, name):
+    # Missing inputs (e.g. odds for a fixture that has no prices yet) become NaN
+    if name in df.columns:
+        return df[name].to_numpy(dtype=np.float32, na_value=np.nan)
+    return np.full(len(df), np.nan, dtype=np.float32)
+
+
+def source_columns(names=PRE_MATCH_FEATURE_NAMES):
+    """Input columns needed to build the features in `names`."""
+    columns = []
+    for name in names:
+        for col in FEATURES[name].sources or (name,):
+            if col not in columns:
+                columns.append(col)
+    return columns
+
+
+def build_matrix(df, names=PRE_MATCH_FEATURE_NAMES):
+    """Model input matrix for `df`: contiguous float32 array with one column per feature in `names`."""
+    X = np.empty((len(df), len(names)), dtype=np.float32)
+    for j, name in enumerate(names):
+        feature = FEATURES[name]
+        if feature.transform == 'identity':
+            X[:, j] = _column(df, feature.sources[0] if feature.sources else feature.name)
+        elif feature.transform == 'difference':
+            X[:, j] = _column(df, feature.sources[0]) - _column(df, feature.sources[1])
+        else:
+            raise ValueError(f"Unknown transform '{feature.transform}' for feature {name}")
+    return X
@@ -0,0 +1,188 @@
+"""
+Per-team feature state for incremental updates
+----------------------------------------------
+Purpose:
+    Step 2 features only depend on a small amount of running state per team:
+        - the last N values of each form stat (points, goals, shots, shots on target)
+        - the current Elo rating
+        - the date of the last match played
+    plus the head-to-head record of every pair of teams (head_to_head.HeadToHeadIndex).
+    This module builds that state from a full feature table, saves/loads it as JSON,
+    and applies new matches to it so a matchweek can be added without replaying history.
+
+Usage:
+    Step 2 saves the state after every full rebuild and uses it in --incremental mode.
+"""
+
+import json
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from team_features import FORM_STATS, team_long_view, match_points
+from elo_engine import elo_pass, match_scores
+from head_to_head import HeadToHeadIndex, head_to_head_pass
+
+STATE_VERSION = 3   # 3: shots / shots on target form read from HS/AS and HST/AST, odds margin method
+
+
+# -------------------------
+# Build / save / load
+# -------------------------
+
+def build_state(features_df, window=5, k=20, base_rating=1500, home_advantage=0, h2h_last_n=5,
+                odds_method='proportional'):
+    """Build the per-team state from a chronologically sorted Step 2 feature table."""
+    long_df = team_long_view(features_df)
+    match_idx = long_df['match_idx'].to_numpy()
+    long_df['elo'] = np.where(
+        long_df['is_home'].to_numpy(),
+        features_df['elo_home'].to_numpy()[match_idx],
+        features_df['elo_away'].to_numpy()[match_idx],
+    )
+
+    teams = {}
+    for team, team_rows in long_df.groupby('team', sort=False):
+        recent = team_rows.tail(window)
+        teams[team] = {
+            'form': {stat: recent[stat].tolist() for stat in FORM_STATS},
+            'elo': float(team_rows['elo'].iloc[-1]),
+            'last_date': pd.Timestamp(team_rows['Date'].iloc[-1]).strftime('%Y-%m-%d'),
+        }
+
+    last_date = features_df['Date'].max()
+    on_last_date = features_df[features_df['Date'] == last_date]
+    return {
+        'version': STATE_VERSION,
+        'window': window,
+        'elo_params': {'k': k, 'base_rating': base_rating, 'home_advantage': home_advantage},
+        # How Step 2 removed the bookmaker margin, so fixture prices are turned into the same features
+        'odds_method': odds_method,
+        'teams': teams,
+        'head_to_head': HeadToHeadIndex.from_matches(features_df, h2h_last_n).to_state(),
+        # Why: several matches share a date, so we also remember which ones on the last date were applied
+        'last_date': pd.Timestamp(last_date).strftime('%Y-%m-%d'),
+        'last_date_matches': on_last_date[['HomeTeam', 'AwayTeam']].values.tolist(),
+    }
+
+
+def save_state(state, path):
+    with open(path, 'w') as f:
+        json.dump(state, f, indent=1)
+
+
+def load_state(path):
+    with open(path) as f:
+        state = json.load(f)
+    if state.get('version') != STATE_VERSION:
+        raise ValueError(f"Unsupported team state version in {path}: {state.get('version')} "
+                         "(run Step 2 without --incremental to rebuild it)")
+    return state
+
+
+# -------------------------
+# Incremental update
+# -------------------------
+
+def select_new_matches(matches_df, state):
+    """Return the rows of `matches_df` that have not been applied to `state` yet."""
+    last_date = pd.Timestamp(state['last_date'])
+    applied = {tuple(pair) for pair in state['last_date_matches']}
+
+    dates = matches_df['Date']
+    same_day_new = (dates == last_date) & ~pd.Series(
+        list(zip(matches_df['HomeTeam'], matches_df['AwayTeam'])), index=matches_df.index
+    ).isin(applied)
+    return matches_df[(dates > last_date) | same_day_new]
+
+
+def apply_matches(state, new_matches):
+    """
+    Compute rolling form, Elo, rest-day and head-to-head features for `new_matches` from `state`,
+    then update `state` in place. Returns the matches (sorted by date) with the new columns.
+    """
+    window = state['window']
+    elo_params = state['elo_params']
+    teams = state['teams']
+    df = new_matches.sort_values('Date', kind='mergesort').reset_index(drop=True)
+    n = len(df)
+
+    # Elo: run the shared engine over the new rows, starting from the stored ratings
+    names = pd.unique(np.concatenate([df['HomeTeam'].to_numpy(), df['AwayTeam'].to_numpy()]))
+    team_id = {team: i for i, team in enumerate(names)}
+    ratings = np.array([teams[t]['elo'] if t in teams else float(elo_params['base_rating']) for t in names])
+    pre_home, pre_away, post_home, post_away = elo_pass(
+        df['HomeTeam'].map(team_id).to_numpy(dtype=int), df['AwayTeam'].map(team_id).to_numpy(dtype=int),
+        match_scores(df), ratings, k=elo_params['k'], home_advantage=elo_params['home_advantage'],
+    )
+
+    # Form and rest days: walk the (few) new rows in order using per-team buffers
+    home_points, away_points = match_points(df)
+    stat_sources = {
+        stat: (df[home_col].to_numpy() if home_col in df.columns else np.zeros(n),
+               df[away_col].to_numpy() if away_col in df.columns else np.zeros(n))
+        for stat, (home_col, away_col) in FORM_STATS.items()
+    }
+    stat_sources['points'] = (home_points, away_points)
+
+    buffers = {
+        team: {stat: deque(values, maxlen=window) for stat, values in teams[team]['form'].items()}
+        for team in names if team in teams
+    }
+    last_dates = {team: pd.Timestamp(teams[team]['last_date']) for team in names if team in teams}
+
+    form_cols = {f'{side}_{stat}_last{window}': np.full(n, np.nan)
+                 for stat in FORM_STATS for side in ('home', 'away')}
+    rest = {'home': np.full(n, np.nan), 'away': np.full(n, np.nan)}
+
+    for i, (home, away, date) in enumerate(zip(df['HomeTeam'], df['AwayTeam'], df['Date'])):
+        for side, team, col in (('home', home, 0), ('away', away, 1)):
+            team_buffers = buffers.setdefault(
+                team, {stat: deque(maxlen=window) for stat in FORM_STATS})
+            for stat, values in team_buffers.items():
+                if len(values) >= window:
+                    form_cols[f'{side}_{stat}_last{window}'][i] = np.mean(values)
+            if team in last_dates:
+                rest[side][i] = (date - last_dates[team]).days
+
+            for stat, values in team_buffers.items():
+                values.append(float(stat_sources[stat][col][i]))
+            last_dates[team] = date
+
+    # Column order matches a full Step 2 rebuild
+    ordered_form = {}
+    for stat in FORM_STATS:
+        ordered_form[f'home_{stat}_last{window}'] = form_cols[f'home_{stat}_last{window}']
+        ordered_form[f'away_{stat}_last{window}'] = form_cols[f'away_{stat}_last{window}']
+    new_cols = pd.DataFrame({
+        **ordered_form,
+        'elo_home': post_home,
+        'elo_away': post_away,
+        'elo_diff': post_home - post_away,
+        'home_elo': pre_home,
+        'away_elo': pre_away,
+        'days_rest_home': rest['home'],
+        'days_rest_away': rest['away'],
+        'rest_days_diff': rest['home'] - rest['away'],
+    })
+    h2h_index = HeadToHeadIndex.from_state(state['head_to_head'])
+    out = pd.concat([df, new_cols, head_to_head_pass(h2h_index, df)], axis=1)
+
+    # Write the updated state back
+    for team in names:
+        teams[team] = {
+            'form': {stat: list(values) for stat, values in buffers[team].items()},
+            'elo': float(ratings[team_id[team]]),
+            'last_date': last_dates[team].strftime('%Y-%m-%d'),
+        }
+    state['head_to_head'] = h2h_index.to_state()
+    last_date = df['Date'].max()
+    if pd.Timestamp(last_date) == pd.Timestamp(state['last_date']):
+        state['last_date_matches'] += df[['HomeTeam', 'AwayTeam']].values.tolist()
+    else:
+        on_last_date = df[df['Date'] == last_date]
+        state['last_date'] = pd.Timestamp(last_date).strftime('%Y-%m-%d')
+        state['last_date_matches'] = on_last_date[['HomeTeam', 'AwayTeam']].values.tolist()
+    return out
+
@@ -0,0 +1,179 @@
+"""
+Fixture feature builder
+-----------------------
+Purpose:
+    Build the Step 2 pre-match feature row for any upcoming (home, away, date) fixture
+    directly from the per-team state (team_state.json), without recomputing history:
+        - rolling form (home_/away_<stat>_last<N>)
+        - pre-match Elo (home_elo / away_elo)
+        - rest days (days_rest_home / days_rest_away / rest_days_diff)
+        - head-to-head record (h2h_*), one dictionary lookup per fixture
+        - bookmaker odds features (odds_*, cons_*, book_overround), when the fixture list has
+          prices (e.g. B365H/B365D/B365A), with the margin removed as Step 2 does
+    The state is unpacked once into per-team arrays, so one fixture is an O(1) lookup
+    and a whole fixture list is a handful of NumPy gathers.
+
+Usage:
+    builder = FixtureFeatureBuilder.from_file("team_state.json")
+    builder.build("Arsenal", "Man United", "2025-08-17")     # one row (dict)
+    score_fixtures(fixtures_df, registered_model, builder)    # whole season, one predict_proba call
+"""
+
+import numpy as np
+import pandas as pd
+
+import feature_store
+import odds_engine
+import storage
+from head_to_head import HeadToHeadIndex
+from team_features import FORM_STATS
+
+# The fixture this project is about (Arsenal at home to Man United, Matchweek 1 2025/26)
+DEFAULT_FIXTURE = ("Arsenal", "Man United", "2025-08-17")
+
+
+class FixtureFeatureBuilder:
+    def __init__(self, state):
+        self.window = state['window']
+        self.base_rating = float(state['elo_params']['base_rating'])
+        self.odds_method = state['odds_method']
+        self.teams = list(state['teams'])
+        self.team_id = {team: i for i, team in enumerate(self.teams)}
+        self.h2h = HeadToHeadIndex.from_state(state['head_to_head'])
+
+        # One row per team; an extra last row holds the values used for unknown teams
+        n = len(self.teams)
+        self.form = {stat: np.full(n + 1, np.nan) for stat in FORM_STATS}
+        self.elo = np.full(n + 1, self.base_rating)
+        self.last_date = np.full(n + 1, np.datetime64('NaT'), dtype='datetime64[ns]')
+        for i, team in enumerate(self.teams):
+            team_state = state['teams'][team]
+            for stat in FORM_STATS:
+                values = team_state['form'][stat]
+                if len(values) >= self.window:
+                    self.form[stat][i] = np.mean(values[-self.window:])
+            self.elo[i] = team_state['elo']
+            self.last_date[i] = np.datetime64(team_state['last_date'], 'ns')
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(feature_store.load_state(path))
+
+    def _ids(self, teams):
+        unknown = len(self.teams)
+        return np.array([self.team_id.get(team, unknown) for team in teams])
+
+    def _add_team(self, team):
+        # A team that is not in the state (e.g. promoted): the unknown-team values (no form,
+        # base Elo) but its own row, so its last match date can be tracked
+        i = len(self.teams)
+        self.teams.append(team)
+        self.team_id[team] = i
+        for stat in FORM_STATS:
+            self.form[stat] = np.insert(self.form[stat], i, np.nan)
+        self.elo = np.insert(self.elo, i, self.base_rating)
+        self.last_date = np.insert(self.last_date, i, np.datetime64('NaT'))
+        return i
+
+    def build(self, home, away, date):
+        """Feature row (dict) for one fixture."""
+        return self.build_many(pd.DataFrame({'HomeTeam': [home], 'AwayTeam': [away], 'Date': [date]})
+                               ).iloc[0].to_dict()
+
+    def build_many(self, fixtures_df, sequential=True):
+        """
+        Feature rows for a fixture list with HomeTeam, AwayTeam and Date columns.
+
+        Form, Elo and head-to-head are the current state for every fixture (results of earlier fixtures in
+        the list are unknown). Rest days count from the team's previous fixture in the list,
+        or from its last played match for its first fixture. With sequential=False the rows are
+        unrelated fixtures (e.g. separate requests batched together) and rest days always count
+        from the last played match.
+        """
+        # Dates are read like the season files: DD/MM/YYYY first, then ISO (storage.parse_match_dates)
+        dates = storage.parse_match_dates(fixtures_df['Date']).to_numpy(dtype='datetime64[ns]')
+        home_ids = self._ids(fixtures_df['HomeTeam'])
+        away_ids = self._ids(fixtures_df['AwayTeam'])
+
+        features = {}
+        for side, ids in (('home', home_ids), ('away', away_ids)):
+            for stat in FORM_STATS:
+                features[f'{side}_{stat}_last{self.window}'] = self.form[stat][ids]
+        features['home_elo'] = self.elo[home_ids]
+        features['away_elo'] = self.elo[away_ids]
+
+        if sequential:
+            rest_home, rest_away = self._rest_days(fixtures_df, dates, home_ids, away_ids)
+        else:
+            rest_home = (dates - self.last_date[home_ids]) / np.timedelta64(1, 'D')
+            rest_away = (dates - self.last_date[away_ids]) / np.timedelta64(1, 'D')
+        features['days_rest_home'] = rest_home
+        features['days_rest_away'] = rest_away
+        features['rest_days_diff'] = rest_home - rest_away
+        out = pd.DataFrame(features, index=fixtures_df.index)
+
+        h2h_rows = [self.h2h.lookup(home, away)
+                    for home, away in zip(fixtures_df['HomeTeam'], fixtures_df['AwayTeam'])]
+        h2h = pd.DataFrame(h2h_rows, index=fixtures_df.index, dtype=float)
+        return pd.concat([out, h2h, self._odds(fixtures_df)], axis=1)
+
+    def _odds(self, fixtures_df):
+        # Opening prices in the fixture list -> the odds features Step 2 builds (none without prices)
+        books = odds_engine.available_books(fixtures_df.columns)
+        if not books:
+            return pd.DataFrame(index=fixtures_df.index)
+        prices = fixtures_df[[col for book in books for col in odds_engine.price_columns(book)]]
+        odds = odds_engine.add_odds_features(prices, method=self.odds_method, closing=False)
+        return odds.drop(columns=prices.columns)
+
+    def mark_played(self, fixtures_df):
+        """
+        Move each team's last match date to its latest fixture in `fixtures_df`, so rest days in
+        the next fixtures count from these ones (used when a long list is scored in chunks).
+        Teams missing from the state are added, so their rest days carry over between chunks too.
+        """
+        dates = storage.parse_match_dates(fixtures_df['Date'])
+        played = pd.concat([
+            pd.Series(dates.to_numpy(), index=fixtures_df['HomeTeam'].to_numpy()),
+            pd.Series(dates.to_numpy(), index=fixtures_df['AwayTeam'].to_numpy()),
+        ])
+        for team, date in played.groupby(level=0).max().items():
+            i = self.team_id[team] if team in self.team_id else self._add_team(team)
+            self.last_date[i] = np.datetime64(date, 'ns')
+
+    def _rest_days(self, fixtures_df, dates, home_ids, away_ids):
+        n = len(fixtures_df)
+        long_df = pd.DataFrame({
+            'row': np.concatenate([np.arange(n), np.arange(n)]),
+            'is_home': np.concatenate([np.ones(n, dtype=bool), np.zeros(n, dtype=bool)]),
+            'team': np.concatenate([fixtures_df['HomeTeam'].to_numpy(), fixtures_df['AwayTeam'].to_numpy()]),
+            'Date': np.concatenate([dates, dates]),
+            'last_played': self.last_date[np.concatenate([home_ids, away_ids])],
+        }).sort_values(['Date', 'row'], kind='mergesort')
+
+        previous = long_df.groupby('team', sort=False)['Date'].shift(1)
+        previous = previous.fillna(long_df['last_played'])
+        rest = (long_df['Date'] - previous).dt.days.to_numpy(dtype=float)
+
+        out = np.empty(2 * n)
+        out[long_df.index.to_numpy()] = rest
+        # long_df's original index is 0..n-1 for home rows and n..2n-1 for away rows
+        return out[:n], out[n:]
+
+
+def score_fixtures(fixtures_df, registered, builder, sequential=True):
+    """
+    Add outcome probabilities to a fixture list with one batched predict_proba call.
+
+    `registered` is a model_registry.RegisteredModel. Adds one column per class
+    (e.g. prob_Away, prob_Draw, prob_Home) and returns the new DataFrame.
+    `sequential` is passed to builder.build_many (False for fixtures that are not a calendar).
+    """
+    # Columns in the fixture list itself (e.g. odds_home_prob) are used when the model needs them,
+    # unless the builder computed them (e.g. from the fixture's prices)
+    built = builder.build_many(fixtures_df, sequential=sequential)
+    features = pd.concat([fixtures_df.drop(columns=built.columns.intersection(fixtures_df.columns)), built], axis=1)
+    probabilities = registered.predict_proba(features)
+    prob_cols = pd.DataFrame(probabilities, columns=[f'prob_{c}' for c in registered.classes],
+                             index=fixtures_df.index)
+    return pd.concat([fixtures_df, prob_cols], axis=1)
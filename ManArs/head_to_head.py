@@ -0,0 +1,136 @@
+"""
+Head-to-head index
+------------------
+Purpose:
+    Keep the pairwise history of every pair of teams in one dictionary keyed by the pair,
+    so head-to-head features never need a rescan of past matches:
+        - meetings, wins / draws / losses and cumulative goal difference
+        - the goal differences of the last N meetings
+    Each pair is stored once (teams in alphabetical order) and is flipped on lookup,
+    so Arsenal v Man United and Man United v Arsenal share the same record.
+
+    Step 2 fills the index in one chronological pass and reads each match's values
+    BEFORE that match is added, so the columns only use earlier meetings.
+    Looking up an upcoming fixture is a single dictionary access.
+
+Output columns (seen from the home team's side, any venue):
+    h2h_meetings, h2h_home_wins, h2h_draws, h2h_away_wins, h2h_goal_diff,
+    h2h_last<N>_points, h2h_last<N>_goal_diff  (NaN until the teams have met)
+"""
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import profiling
+
+# Separator for pair keys in the saved state (JSON keys must be strings)
+PAIR_SEPARATOR = "|"
+
+
+def h2h_columns(last_n=5):
+    return ['h2h_meetings', 'h2h_home_wins', 'h2h_draws', 'h2h_away_wins', 'h2h_goal_diff',
+            f'h2h_last{last_n}_points', f'h2h_last{last_n}_goal_diff']
+
+
+class HeadToHeadIndex:
+    def __init__(self, last_n=5):
+        self.last_n = last_n
+        # (team A, team B) with A < B -> record from team A's side
+        self.pairs = {}
+
+    @staticmethod
+    def _key(home, away):
+        # Returns the pair key and whether the home team is the key's first team
+        return ((home, away), True) if home <= away else ((away, home), False)
+
+    def _new_record(self):
+        return {'meetings': 0, 'wins': 0, 'draws': 0, 'losses': 0, 'goal_diff': 0,
+                'recent': deque(maxlen=self.last_n)}
+
+    def update(self, home, away, home_goals, away_goals):
+        """Add one finished match to the index."""
+        key, home_first = self._key(home, away)
+        record = self.pairs.get(key)
+        if record is None:
+            record = self.pairs[key] = self._new_record()
+
+        goal_diff = int(home_goals - away_goals) if home_first else int(away_goals - home_goals)
+        record['meetings'] += 1
+        record['goal_diff'] += goal_diff
+        if goal_diff > 0:
+            record['wins'] += 1
+        elif goal_diff < 0:
+            record['losses'] += 1
+        else:
+            record['draws'] += 1
+        record['recent'].append(goal_diff)
+
+    def lookup(self, home, away):
+        """Head-to-head values for `home` v `away` from the home team's side (a dict)."""
+        key, home_first = self._key(home, away)
+        record = self.pairs.get(key)
+        if record is None:
+            return dict(zip(h2h_columns(self.last_n), [0, 0, 0, 0, 0, np.nan, np.nan]))
+
+        sign = 1 if home_first else -1
+        recent = [sign * gd for gd in record['recent']]
+        home_wins, away_wins = ((record['wins'], record['losses']) if home_first
+                                else (record['losses'], record['wins']))
+        return dict(zip(h2h_columns(self.last_n), [
+            record['meetings'],
+            home_wins,
+            record['draws'],
+            away_wins,
+            sign * record['goal_diff'],
+            np.mean([3 if gd > 0 else 1 if gd == 0 else 0 for gd in recent]),
+            np.mean(recent),
+        ]))
+
+    # -------------------------
+    # Save / load (part of team_state.json)
+    # -------------------------
+
+    def to_state(self):
+        return {
+            'last_n': self.last_n,
+            'pairs': {PAIR_SEPARATOR.join(key): {**record, 'recent': list(record['recent'])}
+                      for key, record in self.pairs.items()},
+        }
+
+    @classmethod
+    def from_state(cls, h2h_state):
+        index = cls(h2h_state['last_n'])
+        for key, record in h2h_state['pairs'].items():
+            index.pairs[tuple(key.split(PAIR_SEPARATOR))] = {
+                **record, 'recent': deque(record['recent'], maxlen=index.last_n)}
+        return index
+
+    @classmethod
+    def from_matches(cls, df, last_n=5):
+        """Index of every match in `df` (chronologically sorted, with FTHG / FTAG)."""
+        index = cls(last_n)
+        head_to_head_pass(index, df)
+        return index
+
+
+def head_to_head_pass(index, df):
+    """
+    One chronological pass over `df`: record each match's pre-match head-to-head values,
+    then add the match to `index` (updated in place). Returns a DataFrame of h2h columns.
+    """
+    columns = h2h_columns(index.last_n)
+    values = np.empty((len(df), len(columns)))
+    rows = zip(df['HomeTeam'], df['AwayTeam'], df['FTHG'].to_numpy(), df['FTAG'].to_numpy())
+    for i, (home, away, home_goals, away_goals) in enumerate(rows):
+        values[i] = list(index.lookup(home, away).values())
+        index.update(home, away, home_goals, away_goals)
+    return pd.DataFrame(values, columns=columns, index=df.index)
+
+
+@profiling.profiled
+def add_head_to_head_features(df, last_n=5):
+    """Add pre-match h2h_* columns to a chronologically sorted match table."""
+    index = HeadToHeadIndex(last_n)
+    return pd.concat([df, head_to_head_pass(index, df)], axis=1)
@@ -0,0 +1,171 @@
+"""
+Model registry
+--------------
+Purpose:
+    Keep every trained model together with what is needed to use it later:
+        - the feature columns it was trained on (in order)
+        - its class order (e.g. ['Away', 'Draw', 'Home'])
+        - training parameters and metrics
+    Models are saved uncompressed with joblib (nothing to decompress on load) and each loaded
+    version is kept in memory, so repeated lookups do not reload it.
+
+Layout:
+    models/<name>/v0001/model.joblib
+    models/<name>/v0001/meta.json
+    models/<name>/LATEST            -> "v0001"
+
+Odds fallback:
+    Step 4 registers an OddsFallbackModel: the forest trained on every pre-match feature plus
+    one trained without the bookmaker odds features. Fixtures whose odds are unknown (no
+    prices in the input) are scored by the second forest instead of feeding NaN to the first.
+
+Usage:
+    register_model(model, feature_columns, metrics=...)     # Step 4
+    predict_fixture("Arsenal", "Man United", "2025-08-17")  # no training needed
+"""
+
+import json
+import os
+import time
+from dataclasses import dataclass
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import feature_sets
+from fixture_builder import FixtureFeatureBuilder
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_DIR = os.path.join(DATA_DIR, "models")
+DEFAULT_NAME = "match_winner"
+
+
+@dataclass
+class RegisteredModel:
+    model: object
+    feature_columns: list
+    classes: list
+    version: str
+    meta: dict
+
+    def predict_proba(self, features_df):
+        """Class probabilities for rows of `features_df` (built into the model's feature matrix)."""
+        X = feature_sets.build_matrix(features_df, self.feature_columns)
+        return self.model.predict_proba(X)
+
+
+class OddsFallbackModel:
+    """
+    Classifier over feature_sets.PRE_MATCH_FEATURE_NAMES that scores each row with `with_odds`
+    (trained on every feature) if its odds features are all known, and otherwise with
+    `without_odds` (trained on feature_sets.NO_ODDS_FEATURE_NAMES, the same rows).
+    """
+
+    def __init__(self, with_odds, without_odds, feature_columns=feature_sets.PRE_MATCH_FEATURE_NAMES):
+        if list(with_odds.classes_) != list(without_odds.classes_):
+            raise ValueError("Both models must be trained on the same classes")
+        self.with_odds = with_odds
+        self.without_odds = without_odds
+        self.classes_ = with_odds.classes_
+        self.odds_idx = [i for i, name in enumerate(feature_columns) if name in feature_sets.ODDS_FEATURE_NAMES]
+        self.base_idx = [i for i, name in enumerate(feature_columns) if name not in feature_sets.ODDS_FEATURE_NAMES]
+
+    def has_odds(self, X):
+        """Rows of the feature matrix `X` whose odds features are all known."""
+        return ~np.isnan(X[:, self.odds_idx]).any(axis=1)
+
+    def predict_proba(self, X):
+        X = np.asarray(X)
+        has_odds = self.has_odds(X)
+        proba = np.empty((len(X), len(self.classes_)))
+        if has_odds.any():
+            proba[has_odds] = self.with_odds.predict_proba(X[has_odds])
+        if not has_odds.all():
+            proba[~has_odds] = self.without_odds.predict_proba(X[~has_odds][:, self.base_idx])
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def get_params(self, deep=True):
+        return {'with_odds': self.with_odds.get_params(deep), 'without_odds': self.without_odds.get_params(deep)}
+
+
+# Loaded models stay warm for the life of the process
+_loaded = {}
+
+
+def _model_dir(name, registry_dir):
+    return os.path.join(registry_dir, name)
+
+
+def latest_version(name=DEFAULT_NAME, registry_dir=REGISTRY_DIR):
+    path = os.path.join(_model_dir(name, registry_dir), "LATEST")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No registered '{name}' model in {registry_dir} - run Step 4 first.")
+    with open(path) as f:
+        return f.read().strip()
+
+
+def list_versions(name=DEFAULT_NAME, registry_dir=REGISTRY_DIR):
+    model_dir = _model_dir(name, registry_dir)
+    if not os.path.isdir(model_dir):
+        return []
+    return sorted(v for v in os.listdir(model_dir) if v.startswith("v"))
+
+
+def register_model(model, feature_columns, metrics=None, params=None,
+                   name=DEFAULT_NAME, registry_dir=REGISTRY_DIR):
+    """Save `model` as the next version of `name` and mark it as latest. Returns the version."""
+    versions = list_versions(name, registry_dir)
+    version = f"v{int(versions[-1][1:]) + 1:04d}" if versions else "v0001"
+    version_dir = os.path.join(_model_dir(name, registry_dir), version)
+    os.makedirs(version_dir)
+
+    # Why: compress=0 - loading a 300-tree forest skips decompression; disk space is not a concern here
+    joblib.dump(model, os.path.join(version_dir, "model.joblib"), compress=0)
+    meta = {
+        "name": name,
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "model_class": type(model).__name__,
+        "feature_columns": list(feature_columns),
+        "classes": [str(c) for c in model.classes_],
+        "params": params or {},
+        "metrics": metrics or {},
+    }
+    with open(os.path.join(version_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=1, default=str)
+
+    with open(os.path.join(_model_dir(name, registry_dir), "LATEST"), "w") as f:
+        f.write(version)
+    return version
+
+
+def load_model(version=None, name=DEFAULT_NAME, registry_dir=REGISTRY_DIR):
+    """Load a registered model (latest by default). Repeated calls reuse the loaded model."""
+    version = version or latest_version(name, registry_dir)
+    key = (registry_dir, name, version)
+    if key not in _loaded:
+        version_dir = os.path.join(_model_dir(name, registry_dir), version)
+        with open(os.path.join(version_dir, "meta.json")) as f:
+            meta = json.load(f)
+        model = joblib.load(os.path.join(version_dir, "model.joblib"))
+        _loaded[key] = RegisteredModel(model, meta["feature_columns"], meta["classes"], version, meta)
+    return _loaded[key]
+
+
+def predict_fixture(home, away, date, version=None, data_dir=DATA_DIR, registry_dir=REGISTRY_DIR):
+    """
+    Win/draw/loss probabilities for an upcoming fixture, e.g. predict_fixture("Arsenal", "Man United", "2025-08-17").
+
+    Features come from the per-team state Step 2 saves (team_state.json). No bookmaker prices
+    are given, so an OddsFallbackModel scores the fixture with its model trained without odds.
+    Returns {class: probability}, e.g. {'Away': 0.2, 'Draw': 0.25, 'Home': 0.55}.
+    """
+    registered = load_model(version, registry_dir=registry_dir)
+    builder = FixtureFeatureBuilder.from_file(os.path.join(data_dir, "team_state.json"))
+    row = pd.DataFrame([builder.build(home, away, date)])
+    probabilities = registered.predict_proba(row)[0]
+    return {cls: float(p) for cls, p in zip(registered.classes, probabilities)}
@@ -0,0 +1,169 @@
+"""
+Bookmaker odds engine
+---------------------
+Purpose:
+    The season files carry 1X2 prices from several bookmakers, for the opening market
+    (B365H/D/A, BWH/D/A, ...) and the closing market (B365CH/CD/CA, ...). This module turns
+    all of them into margin-free probabilities and market features in one pass:
+        - odds_home_prob / odds_draw_prob / odds_away_prob   Bet365 opening, margin removed
+        - cons_<outcome>_prob    consensus: mean margin-free probability across bookmakers
+        - cons_<outcome>_std     dispersion: how much the bookmakers disagree
+        - book_overround         mean bookmaker margin (sum of 1/odds - 1)
+        - n_books                bookmakers with a full set of prices
+    and the same consensus / dispersion / overround columns for the closing market (close_*).
+
+How:
+    Prices are stacked into one (matches, bookmakers, 3) array, so implied probabilities,
+    margin removal and the consensus are NumPy operations over the whole array - there is
+    no loop over bookmakers or matches. Missing prices are NaN and are ignored by the
+    consensus.
+
+Margin removal (METHODS):
+    proportional   divide by the booksum (what Step 2 always did)
+    shin           Shin's model: the margin comes from insider trading, which shades
+                   longshots more than favourites
+    power          raise the implied probabilities to the power k that makes them sum to 1
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import profiling
+
+OUTCOMES = ['home', 'draw', 'away']
+
+# Individual bookmakers (consensus is taken over these)
+BOOKMAKERS = ['B365', 'BW', 'BF', 'PS', 'WH', '1XB', 'BFE', 'IW', 'VC', 'LB']
+# Market aggregates in the files (kept out of the consensus so books are not double counted)
+AGGREGATES = ['Max', 'Avg']
+
+METHODS = ('proportional', 'shin', 'power')
+
+
+# -------------------------
+# Price arrays
+# -------------------------
+
+def price_columns(prefix, closing=False):
+    """The H/D/A price columns of one bookmaker, e.g. B365H/B365D/B365A or B365CH/B365CD/B365CA."""
+    marker = 'C' if closing else ''
+    return [f'{prefix}{marker}{suffix}' for suffix in ('H', 'D', 'A')]
+
+
+def available_books(columns, books=BOOKMAKERS, closing=False):
+    """Bookmakers in `books` whose three price columns are all present."""
+    columns = set(columns)
+    return [book for book in books if set(price_columns(book, closing)) <= columns]
+
+
+def stack_prices(df, books, closing=False):
+    """Prices as a (matches, len(books), 3) float array (NaN where a price is missing or invalid)."""
+    cols = [col for book in books for col in price_columns(book, closing)]
+    prices = df[cols].to_numpy(dtype=float, na_value=np.nan).reshape(len(df), len(books), 3)
+    # Why: decimal odds must be above 1; anything else is a data error, not a price
+    return np.where(prices > 1, prices, np.nan)
+
+
+# -------------------------
+# Margin removal
+# -------------------------
+
+def _proportional(implied):
+    return implied / implied.sum(axis=-1, keepdims=True)
+
+
+def _shin(implied, iterations=60):
+    # Find Shin's insider share z in [0, 0.5) for every row at once by bisection on sum(p) = 1
+    booksum = implied.sum(axis=-1, keepdims=True)
+    lo = np.zeros_like(booksum)
+    hi = np.full_like(booksum, 0.5)
+
+    def probs(z):
+        return (np.sqrt(z ** 2 + 4 * (1 - z) * implied ** 2 / booksum) - z) / (2 * (1 - z))
+
+    for _ in range(iterations):
+        z = (lo + hi) / 2
+        too_big = probs(z).sum(axis=-1, keepdims=True) > 1
+        lo = np.where(too_big, z, lo)
+        hi = np.where(too_big, hi, z)
+    p = probs((lo + hi) / 2)
+    return p / p.sum(axis=-1, keepdims=True)
+
+
+def _power(implied, iterations=30):
+    # Newton's method on f(k) = sum(implied ** k) - 1 for every row at once
+    log_implied = np.log(implied)
+    k = np.ones(implied.shape[:-1] + (1,))
+    for _ in range(iterations):
+        powered = implied ** k
+        f = powered.sum(axis=-1, keepdims=True) - 1
+        slope = (powered * log_implied).sum(axis=-1, keepdims=True)
+        k = np.clip(k - f / slope, 0.1, 10)
+    p = implied ** k
+    return p / p.sum(axis=-1, keepdims=True)
+
+
+def remove_margin(prices, method='proportional'):
+    """Margin-free probabilities from decimal odds (last axis = home, draw, away)."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown margin method '{method}' (use one of {METHODS})")
+    implied = 1 / prices
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if method == 'shin':
+            return _shin(implied)
+        if method == 'power':
+            return _power(implied)
+        return _proportional(implied)
+
+
+# -------------------------
+# Features
+# -------------------------
+
+def market_features(prices, method='proportional', prefix=''):
+    """Consensus, dispersion, overround and book count for a (matches, books, 3) price array."""
+    probs = remove_margin(prices, method)
+    complete = ~np.isnan(probs).any(axis=-1)                   # (matches, books)
+    n_books = complete.sum(axis=1)
+    overround = (1 / prices).sum(axis=-1) - 1
+
+    features = {}
+    with warnings.catch_warnings():
+        # Why: nanmean / nanstd warn on matches with no prices at all; those rows are NaN anyway
+        warnings.simplefilter('ignore', RuntimeWarning)
+        consensus = np.nanmean(probs, axis=1)
+        dispersion = np.nanstd(probs, axis=1)
+        features[f'{prefix}book_overround'] = np.nanmean(overround, axis=1)
+    for j, outcome in enumerate(OUTCOMES):
+        features[f'{prefix}cons_{outcome}_prob'] = consensus[:, j]
+        features[f'{prefix}cons_{outcome}_std'] = dispersion[:, j]
+    features[f'{prefix}n_books'] = n_books.astype(float)
+    return features
+
+
+@profiling.profiled
+def add_odds_features(df, method='proportional', closing=True):
+    """
+    Add margin-free Bet365 probabilities (odds_*_prob) and the consensus market features for
+    every bookmaker present in `df`, for the opening and (if `closing`) the closing market.
+    """
+    new_cols = {}
+
+    if set(price_columns('B365')) <= set(df.columns):
+        b365 = remove_margin(stack_prices(df, ['B365'])[:, 0, :], method)
+        for j, outcome in enumerate(OUTCOMES):
+            new_cols[f'odds_{outcome}_prob'] = b365[:, j]
+
+    for market_prefix, is_closing in (('', False), ('close_', True)):
+        if is_closing and not closing:
+            continue
+        books = available_books(df.columns, closing=is_closing)
+        if books:
+            new_cols.update(market_features(stack_prices(df, books, is_closing), method, market_prefix))
+
+    if not new_cols:
+        return df
+    df = df.drop(columns=[col for col in new_cols if col in df.columns])
+    return pd.concat([df, pd.DataFrame(new_cols, index=df.index)], axis=1)
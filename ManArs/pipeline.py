@@ -0,0 +1,249 @@
+"""
+In-process pipeline (Steps 1 - 5)
+---------------------------------
+Purpose:
+    Run the whole pipeline inside one Python process with run_pipeline(config).
+    Each step is an importable function; DataFrames and the trained model are passed
+    between steps in memory instead of launching a new interpreter per step.
+
+Caching:
+    Steps still write their usual output files, and pipeline_cache skips any step whose
+    inputs, code and parameters (e.g. the fixture Steps 3 and 4 score) are unchanged.
+    A skipped step's outputs are read back from disk only if a later step actually needs them.
+
+Background runs:
+    PipelineJob runs the pipeline on a worker thread (e.g. for the dashboard) and reports
+    progress, per-step timings and the result through a queue, so a GUI can poll it from its
+    own thread. job.cancel() stops the run before the next step starts.
+
+Profiling:
+    With --profile (or MANARS_PROFILE=1) every step that runs, and the feature / training
+    stages inside it, is timed and memory-traced; the report goes to profile/ (see profiling.py).
+
+Usage:
+    python pipeline.py            # run, skipping up-to-date steps
+    python pipeline.py --force    # run every step
+    python pipeline.py --force --profile cprofile    # also write profile/<step>.prof
+"""
+
+import argparse
+import os
+import queue
+import threading
+from dataclasses import dataclass, field
+
+import feature_store
+import pipeline_cache
+import profiling
+import storage
+from fixture_builder import DEFAULT_FIXTURE
+import step1_data_collection as step1
+import step2_feature_engineering as step2
+import step3_modelling as step3
+import step4_modelValidation as step4
+import step5_finalOne as step5
+
+
+@dataclass
+class PipelineConfig:
+    data_dir: str = pipeline_cache.CODE_DIR
+    force: bool = False        # ignore the cache and run every step
+    tune_model: bool = True    # run Step 3's hyperparameter search
+    home_team: str = DEFAULT_FIXTURE[0]
+    away_team: str = DEFAULT_FIXTURE[1]
+    fixture_date: str = DEFAULT_FIXTURE[2]
+    profile: str = field(default_factory=profiling.env_mode)  # None, 'on', 'time' or 'cprofile'
+
+    @property
+    def fixture(self):
+        return (self.home_team, self.away_team, self.fixture_date)
+
+
+@dataclass
+class PipelineResult:
+    config: PipelineConfig
+    matches: object = None         # Step 1 DataFrame
+    features: object = None        # Step 2 DataFrame
+    state: dict = None             # Step 2 per-team state (form, Elo, last match date)
+    tuned: dict = None             # Step 3 result (model, best_params, accuracy, ...)
+    validation: dict = None        # Step 4 result (model, accuracy, walk_forward, ...)
+    probabilities: list = None     # [Away, Draw, Home] in %
+    prediction: dict = None        # Step 5 result
+    timings: list = field(default_factory=list)  # (step, 'ran' | 'skipped', seconds)
+    profile: dict = None           # profiling report (stages with time, memory, rows), if profiling was on
+
+
+# -------------------------
+# Inputs: in memory if the previous step ran, otherwise from its saved output
+# -------------------------
+
+def _matches(result):
+    if result.matches is None:
+        result.matches = storage.read_table(storage.table_path(result.config.data_dir, "combined_matches"))
+    return result.matches
+
+
+def _features(result):
+    if result.features is None:
+        # Steps 3 and 4 only need the model inputs, the target and the date
+        result.features = step4.load_features(result.config.data_dir)
+    return result.features
+
+
+def _state(result):
+    if result.state is None:
+        result.state = feature_store.load_state(os.path.join(result.config.data_dir, "team_state.json"))
+    return result.state
+
+
+def _probabilities(result):
+    if result.probabilities is None:
+        result.probabilities = step5.load_probabilities(
+            os.path.join(result.config.data_dir, "step4_probabilities.csv"))
+    return result.probabilities
+
+
+# -------------------------
+# Steps
+# -------------------------
+
+def _run_step1(result):
+    data_dir = result.config.data_dir
+    result.matches = step1.collect_matches(data_dir)
+    storage.write_table(result.matches, storage.table_path(data_dir, "combined_matches"))
+
+
+def _run_step2(result):
+    data_dir = result.config.data_dir
+    result.features = step2.engineer_features(_matches(result))
+    step2.save_features(result.features, storage.table_path(data_dir, "features"),
+                        os.path.join(data_dir, "team_state.json"))
+
+
+def _run_step3(result):
+    result.tuned = step3.train_model(_features(result))
+    step3.example_prediction(result.tuned['model'], result.tuned['feature_columns'],
+                             _state(result), result.config.fixture)
+
+
+def _run_step4(result):
+    result.validation = step4.validate_model(_features(result), _state(result), result.config.fixture)
+    result.probabilities = result.validation['probabilities']
+    step4.save_outputs(result.validation, result.config.data_dir)
+
+
+def _run_step5(result):
+    result.prediction = step5.final_prediction(_probabilities(result))
+    step5.show_result(result.prediction)
+
+
+STEP_RUNNERS = {
+    'step1': _run_step1,
+    'step2': _run_step2,
+    'step3': _run_step3,
+    'step4': _run_step4,
+    'step5': _run_step5,
+}
+
+# Table each step works through, for the profiler's rows/s
+STEP_ROWS = {'step1': 'matches', 'step2': 'features', 'step3': 'features', 'step4': 'features'}
+
+
+def _run_step(step, result):
+    with profiling.stage(step.name) as record:
+        STEP_RUNNERS[step.name](result)
+        table = getattr(result, STEP_ROWS.get(step.name, ''), None)
+        record['rows'] = len(table) if table is not None else None
+
+
+def run_pipeline(config=None, progress=None, on_result=None, cancelled=None):
+    """
+    Run Steps 1 - 5 in-process. progress(message) is called before each step and
+    on_result((name, status, seconds)) after it; cancelled() is checked between steps.
+    """
+    config = config or PipelineConfig()
+    result = PipelineResult(config=config)
+
+    steps = [step for step in pipeline_cache.PIPELINE_STEPS
+             if config.tune_model or step.name != 'step3']
+    # Why: Steps 3 and 4 score the configured fixture, so it is part of their cache key
+    steps = pipeline_cache.with_params(steps, fixture=list(config.fixture))
+    profile_dir = os.path.join(config.data_dir, profiling.PROFILE_DIR_NAME)
+    with profiling.session(profile_dir, config.profile) as profiler:
+        result.timings = pipeline_cache.run_cached_steps(
+            steps, lambda step: _run_step(step, result),
+            data_dir=config.data_dir, force=config.force, progress=progress,
+            on_result=on_result, cancelled=cancelled,
+        )
+
+        # Step 5 is cheap; make sure the final prediction is available even if it was skipped
+        if result.prediction is None:
+            result.prediction = step5.final_prediction(_probabilities(result))
+    if profiler is not None:
+        result.profile = profiler.report()
+    return result
+
+
+class PipelineJob:
+    """
+    run_pipeline on a background thread. Events are read with poll(), from any thread:
+        ('progress', message)   before each step
+        ('step', (name, status, seconds))   after each step
+        ('done', PipelineResult) | ('cancelled', message) | ('error', exception)   once, at the end
+    """
+
+    def __init__(self, config=None):
+        self.config = config or PipelineConfig()
+        self.events = queue.Queue()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def poll(self):
+        """All events posted since the last call (never blocks)."""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _run(self):
+        try:
+            result = run_pipeline(
+                self.config,
+                progress=lambda message: self.events.put(('progress', message)),
+                on_result=lambda timing: self.events.put(('step', timing)),
+                cancelled=self._cancel.is_set,
+            )
+            self.events.put(('done', result))
+        except pipeline_cache.PipelineCancelled as e:
+            self.events.put(('cancelled', str(e)))
+        except Exception as e:
+            self.events.put(('error', e))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run pipeline Steps 1 - 5")
+    parser.add_argument("--force", action="store_true", help="run every step, ignoring the cache")
+    parser.add_argument("--skip-tuning", action="store_true", help="skip Step 3's hyperparameter search")
+    parser.add_argument("--profile", nargs="?", const="on", choices=profiling.MODES, default=None,
+                        help="record time / memory / rows per stage to profile/ (default mode: on)")
+    args = parser.parse_args()
+
+    config = PipelineConfig(force=args.force, tune_model=not args.skip_tuning)
+    if args.profile:
+        config.profile = args.profile
+    result = run_pipeline(config, progress=print)
+    for name, status, seconds in result.timings:
+        print(f"{name:6s} {status:8s} {seconds:6.2f}s")
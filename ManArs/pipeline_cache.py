@@ -0,0 +1,234 @@
+"""
+Cached pipeline runner
+----------------------
+Purpose:
+    Run Steps 1 - 5 in dependency order, but skip any step whose inputs, code and
+    parameters are unchanged since its last successful run and whose outputs are
+    still on disk untouched.
+
+How it works:
+    - Each step declares its input files, output files and the steps it depends on.
+    - Before running a step we hash (sha256) its input files, its script plus every
+      local module it imports, and its parameters. That hash is the step's cache key.
+    - After a successful run we record the key and the hashes of the outputs in
+      pipeline_cache.json. If a step's outputs come out byte-identical, later steps
+      see identical inputs and are skipped too.
+
+Usage:
+    pipeline.run_pipeline(config) runs the steps in-process through run_cached_steps().
+"""
+
+import ast
+import glob
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field, replace
+
+import storage
+from fixture_builder import DEFAULT_FIXTURE
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_NAME = "pipeline_cache.json"
+
+
+@dataclass
+class Step:
+    name: str
+    script: str
+    inputs: list = field(default_factory=list)    # file names or glob patterns, relative to data_dir
+    outputs: list = field(default_factory=list)   # file names, relative to data_dir
+    depends_on: list = field(default_factory=list)
+    params: dict = field(default_factory=dict)    # settings that change the step's outputs
+
+
+PIPELINE_STEPS = [
+    Step("step1", "step1_data_collection.py",
+         inputs=["manars_*.csv"],
+         outputs=[os.path.basename(storage.table_path("", "combined_matches"))]),
+    Step("step2", "step2_feature_engineering.py",
+         inputs=[os.path.basename(storage.table_path("", "combined_matches"))],
+         outputs=[os.path.basename(storage.table_path("", "features")), "team_state.json"],
+         depends_on=["step1"]),
+    Step("step3", "step3_modelling.py",
+         inputs=[os.path.basename(storage.table_path("", "features")), "team_state.json"],
+         depends_on=["step2"],
+         params={'fixture': list(DEFAULT_FIXTURE)}),
+    Step("step4", "step4_modelValidation.py",
+         inputs=[os.path.basename(storage.table_path("", "features")), "team_state.json"],
+         outputs=["models/match_winner/LATEST", "model_test_results.csv", "step4_probabilities.csv"],
+         depends_on=["step2"],
+         params={'fixture': list(DEFAULT_FIXTURE)}),
+    Step("step5", "step5_finalOne.py",
+         inputs=["step4_probabilities.csv"],
+         depends_on=["step4"]),
+]
+
+
+def with_params(steps, **params):
+    """
+    Copies of `steps` with these values for the params each step declares, e.g.
+    with_params(steps, fixture=[home, away, date]). Steps that do not declare a param keep their key.
+    """
+    return [replace(step, params={**step.params, **{name: value for name, value in params.items()
+                                                    if name in step.params}})
+            for step in steps]
+
+
+# -------------------------
+# Hashing
+# -------------------------
+
+def hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def local_modules(script, code_dir=CODE_DIR):
+    """The script plus every module in `code_dir` it imports, directly or indirectly."""
+    seen = []
+    pending = [os.path.join(code_dir, script)]
+    while pending:
+        path = pending.pop()
+        if path in seen or not os.path.exists(path):
+            continue
+        seen.append(path)
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                pending.append(os.path.join(code_dir, name.split(".")[0] + ".py"))
+    return sorted(seen)
+
+
+def resolve_inputs(step, data_dir):
+    files = []
+    for pattern in step.inputs:
+        matches = sorted(glob.glob(os.path.join(data_dir, pattern)))
+        if not matches:
+            raise FileNotFoundError(f"{step.name}: no input matching {pattern} in {data_dir}")
+        # Rows appended to a table live in its part files (see storage.append_table)
+        files.extend(file for match in matches for file in storage.table_files(match))
+    return files
+
+
+def step_key(step, data_dir, code_dir=CODE_DIR):
+    """Cache key for a step: hash of its inputs, code and parameters."""
+    digest = hashlib.sha256()
+    for path in resolve_inputs(step, data_dir):
+        digest.update(f"input:{os.path.basename(path)}:{hash_file(path)}".encode())
+    for path in local_modules(step.script, code_dir):
+        digest.update(f"code:{os.path.basename(path)}:{hash_file(path)}".encode())
+    digest.update(f"params:{json.dumps(step.params, sort_keys=True)}".encode())
+    return digest.hexdigest()
+
+
+# -------------------------
+# Manifest
+# -------------------------
+
+def load_manifest(data_dir):
+    path = os.path.join(data_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, data_dir):
+    with open(os.path.join(data_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=1)
+
+
+def outputs_valid(step, record, data_dir):
+    """True if every output exists and still has the hash recorded after the last run."""
+    for name in step.outputs:
+        path = os.path.join(data_dir, name)
+        if not os.path.exists(path) or record.get("outputs", {}).get(name) != hash_file(path):
+            return False
+    return True
+
+
+# -------------------------
+# Runner
+# -------------------------
+
+def order_steps(steps):
+    """Topological order of steps by depends_on."""
+    by_name = {step.name: step for step in steps}
+    ordered, visiting = [], set()
+
+    def visit(step):
+        if step in ordered:
+            return
+        if step.name in visiting:
+            raise ValueError(f"Dependency cycle at {step.name}")
+        visiting.add(step.name)
+        for dep in step.depends_on:
+            visit(by_name[dep])
+        visiting.discard(step.name)
+        ordered.append(step)
+
+    for step in steps:
+        visit(step)
+    return ordered
+
+
+class PipelineCancelled(Exception):
+    """Raised between steps when the caller asked the run to stop."""
+
+
+def run_cached_steps(steps, run_step, data_dir=CODE_DIR, force=False, progress=None,
+                     on_result=None, cancelled=None):
+    """
+    Run `steps` in dependency order with run_step(step), skipping steps that are still up to date.
+
+    progress(message) is called before each step and on_result((name, status, seconds)) after it.
+    If cancelled() returns True before a step starts, PipelineCancelled is raised (steps already
+    finished keep their outputs and cache entries). Returns a list of
+    (step name, 'ran' | 'skipped', seconds) tuples.
+    """
+    manifest = load_manifest(data_dir)
+    results = []
+    ordered = order_steps(steps)
+
+    for i, step in enumerate(ordered, 1):
+        if cancelled and cancelled():
+            raise PipelineCancelled(f"Cancelled before {step.script}")
+        start = time.perf_counter()
+        key = step_key(step, data_dir)
+        record = manifest.get(step.name, {})
+
+        if not force and record.get("key") == key and outputs_valid(step, record, data_dir):
+            results.append((step.name, "skipped", time.perf_counter() - start))
+            if progress:
+                progress(f"{step.script} unchanged - skipped ({i}/{len(ordered)})")
+            if on_result:
+                on_result(results[-1])
+            continue
+
+        if progress:
+            progress(f"Running {step.script}... ({i}/{len(ordered)})")
+        run_step(step)
+
+        manifest[step.name] = {
+            "key": key,
+            "outputs": {name: hash_file(os.path.join(data_dir, name)) for name in step.outputs},
+            "finished_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        save_manifest(manifest, data_dir)
+        results.append((step.name, "ran", time.perf_counter() - start))
+        if on_result:
+            on_result(results[-1])
+
+    return results
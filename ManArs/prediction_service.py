@@ -0,0 +1,270 @@
+"""
+Local prediction service
+------------------------
+Purpose:
+    Serve match predictions over HTTP from a model that is loaded once, so the dashboard
+    and other tools get an answer in milliseconds instead of re-running pipeline scripts.
+        - the registered model and team_state.json are loaded at startup
+        - requests that arrive together are grouped into ONE predict_proba call
+          (micro-batching: wait at most a few milliseconds for more requests to join)
+
+Endpoints:
+    GET  /predict?home=Arsenal&away=Man%20United&date=2025-08-17
+    POST /predict/bulk   body: {"fixtures": [{"home": ..., "away": ..., "date": ...}, ...]}
+    GET  /health
+
+Every fixture is scored against the current team state on its own (rest days count from
+each team's last played match), so batching never changes an answer. Dates are DD/MM/YYYY or
+YYYY-MM-DD (as in the season files); a request with a date that does not parse gets a 400,
+and a request that fails never fails the others batched with it.
+
+Usage:
+    python prediction_service.py --port 8765
+    fetch_prediction("Arsenal", "Man United", "2025-08-17")    # client helper
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import urllib.parse
+import urllib.request
+
+import pandas as pd
+
+import model_registry
+import storage
+from fixture_builder import DEFAULT_FIXTURE, FixtureFeatureBuilder
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BATCH = 1024        # fixtures per predict_proba call
+MAX_WAIT_MS = 2         # how long the first request in a batch waits for others to join
+POLL_MS = 0.5           # while waiting, how often the queue is checked for new requests
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+
+# -------------------------
+# Micro-batching predictor
+# -------------------------
+
+class MicroBatcher:
+    def __init__(self, registered, builder, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.registered = registered
+        self.builder = builder
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.fixtures = 0
+
+    async def predict(self, fixtures):
+        """Probabilities for a list of (home, away, date) tuples, as a list of {class: p} dicts."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((fixtures, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            # Why: get_nowait never loses an item - wait_for(queue.get()) can drop one that arrives
+            #      just as the timeout fires (Python 3.11)
+            while size < self.max_batch:
+                try:
+                    item = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    await asyncio.sleep(min(remaining, POLL_MS / 1000))
+                    continue
+                batch.append(item)
+                size += len(item[0])
+
+            try:
+                # Why: predict_proba runs in a worker thread so the event loop keeps accepting requests
+                results = await loop.run_in_executor(None, self._predict_batch, [f for f, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue  # the caller was cancelled (e.g. client disconnected); nothing to deliver
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _predict_batch(self, requests):
+        """One result per request: its list of {class: p} dicts, or the exception it raised."""
+        try:
+            return self._score(requests)
+        except Exception as e:
+            if len(requests) == 1:
+                return [e]
+        # Why: one bad request must not fail the others batched with it - score them one by one
+        results = []
+        for request in requests:
+            try:
+                results.extend(self._score([request]))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _score(self, requests):
+        fixtures = [fixture for request in requests for fixture in request]
+        fixtures_df = pd.DataFrame(fixtures, columns=['HomeTeam', 'AwayTeam', 'Date'])
+        features = self.builder.build_many(fixtures_df, sequential=False)
+        probabilities = self.registered.predict_proba(features)
+        self.batches += 1
+        self.fixtures += len(fixtures)
+
+        rows = [{cls: float(p) for cls, p in zip(self.registered.classes, row)} for row in probabilities]
+        results, start = [], 0
+        for request in requests:
+            results.append(rows[start:start + len(request)])
+            start += len(request)
+        return results
+
+
+# -------------------------
+# HTTP
+# -------------------------
+
+def parse_date(value):
+    """A fixture date (DD/MM/YYYY, DD/MM/YY or YYYY-MM-DD) as a Timestamp, or None if it does not parse."""
+    date = storage.parse_match_dates(pd.Series([value], dtype='string'))[0]
+    return None if pd.isna(date) else date
+
+
+class PredictionService:
+    def __init__(self, data_dir=DATA_DIR, version=None):
+        self.registered = model_registry.load_model(version, registry_dir=os.path.join(data_dir, "models"))
+        self.builder = FixtureFeatureBuilder.from_file(os.path.join(data_dir, "team_state.json"))
+        self.batcher = MicroBatcher(self.registered, self.builder)
+
+    async def handle(self, method, path, query, body):
+        """Return (status, JSON-serialisable payload)."""
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok", "model_version": self.registered.version,
+                         "batches": self.batcher.batches, "fixtures": self.batcher.fixtures}
+
+        if method == "GET" and path == "/predict":
+            home, away = query.get("home"), query.get("away")
+            if not home or not away:
+                return 400, {"error": "home and away are required"}
+            date = parse_date(query.get("date") or DEFAULT_FIXTURE[2])
+            if date is None:
+                return 400, {"error": f"unparsable date '{query['date']}' (use DD/MM/YYYY or YYYY-MM-DD)"}
+            [probabilities] = await self.batcher.predict([(home, away, date)])
+            return 200, {"home": home, "away": away, "date": date.date().isoformat(),
+                         "probabilities": probabilities, "model_version": self.registered.version}
+
+        if method == "POST" and path == "/predict/bulk":
+            try:
+                fixtures = [(f["home"], f["away"], f.get("date") or DEFAULT_FIXTURE[2])
+                            for f in json.loads(body or b"{}")["fixtures"]]
+            except (ValueError, KeyError, TypeError) as e:
+                return 400, {"error": f"expected {{'fixtures': [{{'home', 'away', 'date'}}]}}: {e}"}
+            if not fixtures:
+                return 200, {"predictions": [], "model_version": self.registered.version}
+            dates = [parse_date(date) for _, _, date in fixtures]
+            bad = [i for i, date in enumerate(dates) if date is None]
+            if bad:
+                return 400, {"error": f"unparsable date in fixtures {bad} (use DD/MM/YYYY or YYYY-MM-DD)"}
+            fixtures = [(home, away, date) for (home, away, _), date in zip(fixtures, dates)]
+            probabilities = await self.batcher.predict(fixtures)
+            return 200, {"predictions": [{"home": h, "away": a, "date": d.date().isoformat(), "probabilities": p}
+                                         for (h, a, d), p in zip(fixtures, probabilities)],
+                         "model_version": self.registered.version}
+
+        return 404, {"error": f"no route for {method} {path}"}
+
+    async def handle_connection(self, reader, writer):
+        # Minimal HTTP/1.1 with keep-alive: request line, headers, optional Content-Length body
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    status, payload = 413, {"error": "request body too large"}
+                    body = None
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    url = urllib.parse.urlsplit(target)
+                    query = dict(urllib.parse.parse_qsl(url.query))
+                    try:
+                        status, payload = await self.handle(method.upper(), url.path, query, body)
+                    except Exception as e:
+                        status, payload = 500, {"error": str(e)}
+
+                data = json.dumps(payload).encode()
+                keep_alive = headers.get("connection", "").lower() != "close" and body is not None
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        batcher_task = asyncio.create_task(self.batcher.run())
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"🌐 Serving model {self.registered.version} on http://{host}:{port} "
+              f"(try /predict?home=Arsenal&away=Man%20United)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher_task.cancel()
+
+
+# -------------------------
+# Client helper
+# -------------------------
+
+def fetch_prediction(home, away, date=None, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=2.0):
+    """Ask a running service for one fixture. Returns {'Away': p, 'Draw': p, 'Home': p}."""
+    query = urllib.parse.urlencode({"home": home, "away": away, "date": date or DEFAULT_FIXTURE[2]})
+    with urllib.request.urlopen(f"http://{host}:{port}/predict?{query}", timeout=timeout) as response:
+        return json.loads(response.read())["probabilities"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP prediction service")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--version", default=None, help="registered model version (default: latest)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    service = PredictionService(version=args.version)
+    print(f"⏱️ Model and team state loaded in {time.perf_counter() - start:.2f}s")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("👋 Service stopped")
+
+
+if __name__ == "__main__":
+    main()
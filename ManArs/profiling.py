@@ -0,0 +1,305 @@
+"""
+Pipeline profiling
+------------------
+Purpose:
+    Show where the pipeline spends its time and memory. When profiling is on, every stage
+    (each pipeline step, and the feature / training functions inside it) records:
+        - wall time and CPU time
+        - peak traced memory (tracemalloc) above what was allocated when the stage started,
+          and the net memory it left allocated
+        - process RSS at the end of the stage (current and maximum so far)
+        - rows processed and rows per second, where the stage knows its row count
+    and an optional cProfile dump per top-level stage.
+
+Enable:
+    python pipeline.py --profile                 (or MANARS_PROFILE=1)
+    python pipeline.py --profile time            timings only - no tracemalloc overhead (MANARS_PROFILE=time)
+    python pipeline.py --profile cprofile        also dump <step>.prof files (MANARS_PROFILE=cprofile)
+    Steps 2 - 4 run on their own honour MANARS_PROFILE as well.
+
+Output (in <data_dir>/profile/):
+    profile_report.json    machine-readable, one record per stage
+    profile_summary.txt    the table printed at the end of the run
+    <stage>.prof           cProfile stats (open with pstats or snakeviz)
+
+Notes:
+    With profiling off, stage() and @profiled cost one global lookup.
+    tracemalloc slows allocation-heavy code down, so compare timings from 'time' mode.
+    Work done in worker processes (walk-forward folds, season simulation) shows up in
+    wall time only.
+"""
+
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import platform
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+PROFILE_ENV = "MANARS_PROFILE"
+PROFILE_DIR_NAME = "profile"
+MODES = ('on', 'time', 'cprofile')
+MB = 1024 * 1024
+
+_active = None
+
+
+def env_mode():
+    """The profiling mode requested through MANARS_PROFILE (None when off)."""
+    value = os.environ.get(PROFILE_ENV, "").strip().lower()
+    if value in ("", "0", "off", "false", "no"):
+        return None
+    return value if value in MODES else 'on'
+
+
+def _rss_mb():
+    # Current and peak resident set size of this process, where the platform tells us
+    current = peak = None
+    if psutil is not None:
+        current = psutil.Process().memory_info().rss / MB
+    elif os.path.exists("/proc/self/statm"):
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / MB
+    if resource is not None:
+        # Why: ru_maxrss is in KB on Linux but in bytes on macOS
+        scale = 1 if platform.system() == "Darwin" else 1024
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / MB
+    return current, peak
+
+
+def _rows_of(value):
+    return len(value) if hasattr(value, "__len__") and hasattr(value, "shape") else None
+
+
+class Profiler:
+    def __init__(self, mode='on'):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}' (use one of {MODES})")
+        self.mode = mode
+        self.trace_memory = mode != 'time'
+        self.records = []
+        self.profiles = {}          # top-level stage name -> cProfile.Profile
+        self._stack = []            # open stages: [name, peak traced bytes seen so far]
+        self._thread = threading.get_ident()
+        self._started_tracemalloc = False
+        self._start = None
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._start = time.perf_counter()
+        return self
+
+    def stop(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    @property
+    def total_seconds(self):
+        return time.perf_counter() - self._start if self._start is not None else 0.0
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        """
+        Time the enclosed block as stage `name`. Yields the stage's record; set record['rows']
+        inside the block if the row count is only known afterwards.
+        """
+        record = {'stage': name, 'rows': rows}
+        # Why: stages from other threads (e.g. the dashboard's prediction refresh) would
+        #      interleave with this run's stage stack - they are not recorded
+        if threading.get_ident() != self._thread:
+            yield record
+            return
+
+        depth = len(self._stack)
+        record['stage'] = "/".join([frame[0] for frame in self._stack] + [name])
+        record['depth'] = depth
+
+        if self.trace_memory:
+            traced_start, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+            tracemalloc.reset_peak()
+        self._stack.append([name, 0])
+
+        profile = None
+        if self.mode == 'cprofile' and depth == 0:
+            # Why: cProfile cannot nest, so only top-level stages get their own profile
+            profile = cProfile.Profile()
+            profile.enable()
+
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - wall_start
+            cpu_seconds = time.process_time() - cpu_start
+            if profile is not None:
+                profile.disable()
+                self.profiles[name] = profile
+
+            _, stage_peak = self._stack.pop()
+            record.update(seconds=round(seconds, 6), cpu_seconds=round(cpu_seconds, 6))
+            if self.trace_memory:
+                traced_end, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, stage_peak)
+                record['peak_mb'] = round((peak - traced_start) / MB, 3)
+                record['net_mb'] = round((traced_end - traced_start) / MB, 3)
+                # The parent's peak must include this stage's peak
+                if self._stack:
+                    self._stack[-1][1] = max(self._stack[-1][1], peak)
+                tracemalloc.reset_peak()
+            record['rss_mb'], record['max_rss_mb'] = (
+                round(value, 1) if value is not None else None for value in _rss_mb())
+            rows = record.get('rows')
+            record['rows_per_second'] = round(rows / seconds, 1) if rows and seconds > 0 else None
+            self.records.append(record)
+
+    # -------------------------
+    # Report
+    # -------------------------
+
+    def report(self):
+        return {
+            'created_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'mode': self.mode,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'total_seconds': round(self.total_seconds, 6),
+            'stages': self._in_start_order(),
+        }
+
+    def summary(self):
+        """A fixed-width table of the stages, nested stages indented under their parent."""
+        lines = [f"{'stage':40s} {'seconds':>9s} {'cpu s':>8s} {'rows':>9s} {'rows/s':>11s} "
+                 f"{'peak MB':>8s} {'net MB':>8s} {'RSS MB':>8s}"]
+        for record in self._in_start_order():
+            label = "  " * record['depth'] + record['stage'].rsplit("/", 1)[-1]
+            lines.append(
+                f"{label[:40]:40s} {record['seconds']:9.3f} {record['cpu_seconds']:8.3f} "
+                f"{_fmt(record['rows'], 9, ',d')} {_fmt(record['rows_per_second'], 11, ',.0f')} "
+                f"{_fmt(record.get('peak_mb'), 8, '.1f')} {_fmt(record.get('net_mb'), 8, '.1f')} "
+                f"{_fmt(record['rss_mb'], 8, '.1f')}")
+        lines.append(f"Total profiled time: {self.total_seconds:.2f}s")
+        return "\n".join(lines)
+
+    def _in_start_order(self):
+        # Records are appended as stages finish, so a parent comes after its children;
+        # order by path (first seen) so parents read above their children
+        order = {}
+        for record in self.records:
+            parts = record['stage'].split("/")
+            for i in range(1, len(parts) + 1):
+                order.setdefault("/".join(parts[:i]), len(order))
+        return sorted(self.records, key=lambda record: [order["/".join(record['stage'].split("/")[:i])]
+                                                        for i in range(1, record['depth'] + 2)])
+
+    def write_report(self, out_dir):
+        """Write profile_report.json, profile_summary.txt and any cProfile dumps. Returns the JSON path."""
+        os.makedirs(out_dir, exist_ok=True)
+        report = self.report()
+        for name, profile in self.profiles.items():
+            prof_path = os.path.join(out_dir, f"{name}.prof")
+            profile.dump_stats(prof_path)
+            for record in report['stages']:
+                if record['stage'] == name:
+                    record['profile'] = prof_path
+
+        json_path = os.path.join(out_dir, "profile_report.json")
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        with open(os.path.join(out_dir, "profile_summary.txt"), "w", encoding="utf-8") as f:
+            f.write(self.summary() + "\n")
+        return json_path
+
+
+def _fmt(value, width, spec):
+    return format(value, f"{width}{spec}") if value is not None else "-".rjust(width)
+
+
+# -------------------------
+# Global switch used by the steps
+# -------------------------
+
+def active():
+    """The running Profiler, or None when profiling is off."""
+    return _active
+
+
+def start(mode='on'):
+    global _active
+    _active = Profiler(mode).start()
+    return _active
+
+
+def stop():
+    global _active
+    profiler, _active = _active, None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+
+@contextlib.contextmanager
+def stage(name, rows=None):
+    """Profile the enclosed block as a stage if profiling is on; otherwise do nothing."""
+    if _active is None:
+        yield {'stage': name, 'rows': rows}
+        return
+    with _active.stage(name, rows) as record:
+        yield record
+
+
+def profiled(func=None, *, name=None):
+    """
+    Decorator: profile every call of `func` as a stage named after it. The row count is
+    taken from the first DataFrame / array argument.
+    """
+    if func is None:
+        return lambda f: profiled(f, name=name)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _active is None:
+            return func(*args, **kwargs)
+        rows = next((_rows_of(arg) for arg in args if _rows_of(arg) is not None), None)
+        with _active.stage(name or func.__name__, rows):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+@contextlib.contextmanager
+def session(out_dir, mode=None):
+    """
+    Profile the enclosed block in `mode` (default: MANARS_PROFILE), then print the summary
+    and write the report to `out_dir`. Does nothing when profiling is off.
+    """
+    mode = mode or env_mode()
+    if mode is None or _active is not None:
+        yield None
+        return
+    profiler = start(mode)
+    try:
+        yield profiler
+    finally:
+        stop()
+        json_path = profiler.write_report(out_dir)
+        print("\n⏱️ Profile:\n" + profiler.summary())
+        print(f"📂 Profile report saved to: {json_path}")
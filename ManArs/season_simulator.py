@@ -0,0 +1,256 @@
+"""
+Monte Carlo season simulator
+----------------------------
+Purpose:
+    Turn per-fixture Home / Draw / Away probabilities into a projected final table:
+    expected points, title, top-4 and relegation chances, and the full distribution
+    of finishing positions.
+
+    Probabilities come from either
+        - the registered model (model_registry + fixture_builder),
+        - the Step 2 Elo ratings in team_state.json (expected score split into H/D/A), or
+        - the Dixon-Coles goals model (goals_model.py).
+
+How:
+    A batch of seasons is one NumPy array of uniform draws (seasons x fixtures). Outcomes
+    are found by comparing against the cumulative probabilities, and points per team are
+    two matrix products with the fixture/team incidence matrices - no Python loop over
+    matches or seasons. Shards of seasons run on a process pool, each with its own
+    seed spawned from one SeedSequence, so a given seed gives the same table on any
+    number of workers.
+
+Teams:
+    By default the league is the teams in matchweek_fixtures.csv (the upcoming season's
+    fixtures), so promoted sides are in and relegated ones are out. --teams overrides it;
+    without either the simulator stops rather than guess from last season's table.
+
+Usage:
+    python season_simulator.py --seasons 100000 --seed 42 --source elo
+    python season_simulator.py --teams Arsenal Chelsea Liverpool ...
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import feature_store
+import storage
+from goals_model import DixonColesModel
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_FILE = os.path.join(DATA_DIR, "matchweek_fixtures.csv")
+OUTCOMES = ['Away', 'Draw', 'Home']
+
+SHARD_SIZE = 10_000   # seasons per process-pool task (fixed, so results do not depend on n_jobs)
+BATCH_SIZE = 2_000    # seasons per NumPy batch inside a shard (bounds memory)
+TOP_N = 4
+RELEGATED = 3
+
+
+# -------------------------
+# Fixtures and probabilities
+# -------------------------
+
+def round_robin_fixtures(teams):
+    """Every team at home to every other team once (a full double round-robin season)."""
+    return pd.DataFrame([(home, away) for home in teams for away in teams if home != away],
+                        columns=['HomeTeam', 'AwayTeam'])
+
+
+def fixture_teams(fixtures_df):
+    """Teams that appear in a fixture list (e.g. matchweek_fixtures.csv)."""
+    return sorted(pd.unique(np.concatenate([fixtures_df['HomeTeam'].to_numpy(), fixtures_df['AwayTeam'].to_numpy()])))
+
+
+def elo_probabilities(fixtures_df, state, draw_rate=0.25, home_advantage=None):
+    """
+    Add prob_Away / prob_Draw / prob_Home from the Elo ratings in `state`.
+
+    The home side's expected score E is split into a draw chance that is largest for
+    evenly matched teams (draw_rate * (1 - |2E - 1|)) and the remaining win chances.
+    """
+    if home_advantage is None:
+        home_advantage = state['elo_params']['home_advantage']
+    base = float(state['elo_params']['base_rating'])
+    ratings = {team: team_state['elo'] for team, team_state in state['teams'].items()}
+    # astype(float) first: a categorical team column maps to a categorical, which cannot be filled
+    home_elo = fixtures_df['HomeTeam'].map(ratings).astype(float).fillna(base).to_numpy()
+    away_elo = fixtures_df['AwayTeam'].map(ratings).astype(float).fillna(base).to_numpy()
+
+    expected = 1 / (1 + 10 ** ((away_elo - home_elo - home_advantage) / 400))
+    draw = draw_rate * (1 - np.abs(2 * expected - 1))
+    out = fixtures_df.copy()
+    out['prob_Away'] = 1 - expected - draw / 2
+    out['prob_Draw'] = draw
+    out['prob_Home'] = expected - draw / 2
+    return out
+
+
+def model_probabilities(fixtures_df, data_dir=DATA_DIR, date=None):
+    """
+    Add prob_* columns from the latest registered model.
+
+    A round-robin has no calendar, so every fixture is scored on its own as the teams' next
+    match: rest days count from each team's last played match to `date` (default: one week
+    after the latest match in the team state).
+    """
+    import model_registry
+    from fixture_builder import FixtureFeatureBuilder, score_fixtures
+
+    registered = model_registry.load_model(registry_dir=os.path.join(data_dir, "models"))
+    builder = FixtureFeatureBuilder.from_file(os.path.join(data_dir, "team_state.json"))
+    fixtures_df = fixtures_df.copy()
+    if 'Date' not in fixtures_df.columns:
+        next_week = pd.Timestamp(np.nanmax(builder.last_date)) + pd.Timedelta(days=7)
+        fixtures_df['Date'] = pd.Timestamp(date) if date else next_week
+    # Why: all fixtures share one date, so scoring them as a sequence would give 0 rest days
+    #      to every fixture after a team's first one
+    return score_fixtures(fixtures_df, registered, builder, sequential=False)
+
+
+# -------------------------
+# Simulation
+# -------------------------
+
+def _simulate_shard(cum_probs, home_matrix, away_matrix, start_points, n_seasons, seed):
+    """
+    Simulate `n_seasons` seasons. Returns (points_sum, position_counts) where
+    position_counts[t, p] counts how often team t finished in position p (0 = champions).
+    """
+    rng = np.random.default_rng(seed)
+    n_fixtures, n_teams = home_matrix.shape
+    points_sum = np.zeros(n_teams)
+    position_counts = np.zeros((n_teams, n_teams), dtype=np.int64)
+    team_idx = np.arange(n_teams)
+
+    for start in range(0, n_seasons, BATCH_SIZE):
+        n = min(BATCH_SIZE, n_seasons - start)
+        u = rng.random((n, n_fixtures))
+        away_win = u < cum_probs[0]
+        draw = ~away_win & (u < cum_probs[1])
+        home_win = ~away_win & ~draw
+
+        home_points = 3 * home_win + draw     # (seasons, fixtures)
+        away_points = 3 * away_win + draw
+        points = start_points + home_points @ home_matrix + away_points @ away_matrix   # (seasons, teams)
+        points_sum += points.sum(axis=0)
+
+        # Goals are not simulated, so ties on points are broken at random
+        order = np.argsort(-(points + rng.random(points.shape)), axis=1)
+        positions = np.empty_like(order)
+        positions[np.arange(n)[:, None], order] = team_idx
+        position_counts += np.bincount((team_idx * n_teams + positions).ravel(),
+                                       minlength=n_teams * n_teams).reshape(n_teams, n_teams)
+
+    return points_sum, position_counts
+
+
+def simulate_season(fixtures_df, n_seasons=100_000, seed=42, n_jobs=None, start_points=None):
+    """
+    Simulate the season in `fixtures_df` (HomeTeam, AwayTeam, prob_Away, prob_Draw, prob_Home)
+    `n_seasons` times. `start_points` ({team: points}) is added for a season already under way.
+
+    Returns (table, seasons_per_second). The table has one row per team, sorted by expected
+    points, with exp_points, p_title, p_top4, p_relegation and pos_1 ... pos_N.
+    """
+    teams = sorted(pd.unique(np.concatenate([fixtures_df['HomeTeam'].to_numpy(),
+                                             fixtures_df['AwayTeam'].to_numpy()])))
+    team_id = {team: i for i, team in enumerate(teams)}
+    n_teams, n_fixtures = len(teams), len(fixtures_df)
+
+    probs = fixtures_df[[f'prob_{o}' for o in OUTCOMES]].to_numpy(dtype=float)
+    probs = probs / probs.sum(axis=1, keepdims=True)
+    cum_probs = np.cumsum(probs, axis=1).T[:2]    # thresholds for Away, then Draw
+
+    home_matrix = np.zeros((n_fixtures, n_teams))
+    away_matrix = np.zeros((n_fixtures, n_teams))
+    home_matrix[np.arange(n_fixtures), fixtures_df['HomeTeam'].map(team_id).to_numpy(dtype=int)] = 1
+    away_matrix[np.arange(n_fixtures), fixtures_df['AwayTeam'].map(team_id).to_numpy(dtype=int)] = 1
+
+    start_points = np.array([(start_points or {}).get(team, 0) for team in teams], dtype=float)
+
+    shard_sizes = [min(SHARD_SIZE, n_seasons - s) for s in range(0, n_seasons, SHARD_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(shard_sizes))
+    jobs = [(cum_probs, home_matrix, away_matrix, start_points, size, s) for size, s in zip(shard_sizes, seeds)]
+
+    start = time.perf_counter()
+    n_jobs = n_jobs or os.cpu_count()
+    if n_jobs == 1 or len(jobs) == 1:
+        results = [_simulate_shard(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(jobs))) as pool:
+            results = list(pool.map(_simulate_shard, *zip(*jobs)))
+    elapsed = time.perf_counter() - start
+
+    points_sum = sum(r[0] for r in results)
+    position_counts = sum(r[1] for r in results)
+    position_probs = position_counts / n_seasons
+
+    table = pd.DataFrame({
+        'team': teams,
+        'exp_points': points_sum / n_seasons,
+        'p_title': position_probs[:, 0],
+        'p_top4': position_probs[:, :TOP_N].sum(axis=1),
+        'p_relegation': position_probs[:, n_teams - RELEGATED:].sum(axis=1),
+    })
+    for p in range(n_teams):
+        table[f'pos_{p + 1}'] = position_probs[:, p]
+    table = table.sort_values('exp_points', ascending=False).reset_index(drop=True)
+    return table, n_seasons / elapsed
+
+
+def print_table(table, seasons_per_second, n_seasons):
+    print(f"\n🏆 Projected table ({n_seasons:,} simulated seasons, {seasons_per_second:,.0f} seasons/s)")
+    shown = table[['team', 'exp_points', 'p_title', 'p_top4', 'p_relegation']]
+    print(shown.to_string(index=False, formatters={
+        'exp_points': '{:.1f}'.format,
+        'p_title': '{:.1%}'.format,
+        'p_top4': '{:.1%}'.format,
+        'p_relegation': '{:.1%}'.format,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo season simulator")
+    parser.add_argument("--seasons", type=int, default=100_000, help="number of seasons to simulate")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--source", choices=["elo", "model", "goals"], default="elo",
+                        help="where fixture probabilities come from")
+    parser.add_argument("--teams", nargs="+", default=None,
+                        help="teams in the league (default: the teams in matchweek_fixtures.csv)")
+    args = parser.parse_args()
+
+    if args.teams:
+        teams = args.teams
+    elif os.path.exists(FIXTURES_FILE):
+        teams = fixture_teams(pd.read_csv(FIXTURES_FILE, usecols=['HomeTeam', 'AwayTeam']))
+    else:
+        parser.error(f"{FIXTURES_FILE} not found - list the league with --teams")
+    fixtures = round_robin_fixtures(teams)
+    if args.source == "elo":
+        fixtures = elo_probabilities(fixtures, feature_store.load_state(os.path.join(DATA_DIR, "team_state.json")))
+    elif args.source == "goals":
+        goals_path = os.path.join(DATA_DIR, "goals_model.json")
+        if os.path.exists(goals_path):
+            goals_model = DixonColesModel.load(goals_path)
+        else:
+            goals_model = DixonColesModel().fit(storage.read_table(storage.table_path(DATA_DIR, "combined_matches")))
+        fixtures = goals_model.predict_outcomes(fixtures)
+    else:
+        fixtures = model_probabilities(fixtures)
+
+    table, seasons_per_second = simulate_season(fixtures, args.seasons, args.seed, args.jobs)
+    print_table(table, seasons_per_second, args.seasons)
+
+    out_path = os.path.join(DATA_DIR, "season_projection.csv")
+    table.to_csv(out_path, index=False)
+    print(f"📂 Season projection saved to: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,92 @@
 import pandas as pd
 import glob
 import os
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import storage
 
 # Set working directory
 data_dir = r"C:\Prediction_Models\ManArs"
 
-# Get all CSV files in directory
-csv_files = glob.glob(os.path.join(data_dir, "*.csv"))
+# 1.1 Find season files
+# What: Only pick up the raw season files (manars_YYYY-YY.csv).
+# Why: A plain *.csv glob also matches this pipeline's own outputs (combined matches, features, test results)
+#      and would concatenate them back in on every run.
+SEASON_FILE_PATTERN = re.compile(r"^manars_\d{4}-\d{2}\.csv$")
 
-# Load and combine all CSVs
-df_list = []
-for file in csv_files:
-    df = pd.read_csv(file)
-    df_list.append(df)
+# Columns every season file must have for Step 2 to work
+REQUIRED_COLUMNS = ['Div', 'Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR']
 
-# Combine into single DataFrame
-matches_df = pd.concat(df_list, ignore_index=True)
+# A match is identified by league, date and the two teams
+MATCH_KEY = ['Div', 'Date', 'HomeTeam', 'AwayTeam']
 
-# Show first few rows
-print(matches_df.head())
 
-# Save combined file
-combined_path = os.path.join(data_dir, "combined_matches.csv")
-matches_df.to_csv(combined_path, index=False)
-print(f"Combined CSV saved at {combined_path}")
+def find_season_files(data_dir):
+    files = glob.glob(os.path.join(data_dir, "manars_*.csv"))
+    return sorted(f for f in files if SEASON_FILE_PATTERN.match(os.path.basename(f)))
 
+# 1.2 Read one season with a fixed schema
+# What: Read text columns as strings and every other column as float, then cast to the storage schema
+#       (integer counts, dates parsed once).
+# Why: Skips per-file dtype inference and guarantees every season ends up with identical dtypes.
+
+def read_season(path):
+    # Integer columns are read as float first because some seasons have gaps
+    dtypes = defaultdict(lambda: 'float64', {col: 'string' for col in storage.TEXT_COLUMNS})
+    dtypes['Date'] = 'string'
+    df = pd.read_csv(path, dtype=dtypes, encoding='utf-8-sig')
+    # Strip the BOM some files carry on the first header ('\ufeffDiv')
+    df.columns = df.columns.str.replace('\ufeff', '', regex=False).str.strip()
+
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"{os.path.basename(path)} is missing required columns: {missing}")
+    return storage.apply_schema(df)
+
+# 1.3 Load all seasons in parallel and combine
+# What: Read the season files concurrently on a thread pool, concatenate and drop duplicate matches.
+# Why: CSV parsing releases the GIL, so many leagues/seasons load in roughly the time of the slowest file.
+
+def ingest_seasons(files, max_workers=None):
+    if not files:
+        raise FileNotFoundError("No season files (manars_YYYY-YY.csv) found")
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        df_list = list(pool.map(read_season, files))
+
+    # Combine into single DataFrame
+    matches_df = pd.concat(df_list, ignore_index=True)
+
+    # The same season can appear in more than one file; keep the first copy of each match
+    before = len(matches_df)
+    matches_df = matches_df.drop_duplicates(subset=MATCH_KEY, keep='first')
+    dropped = before - len(matches_df)
+    if dropped:
+        print(f"Dropped {dropped} duplicate matches")
+
+    matches_df = matches_df.sort_values('Date', kind='mergesort').reset_index(drop=True)
+    # 1.4 Compact dtypes: teams / referees as categoricals, small integer counts, float32 odds (see storage.py)
+    return storage.compact(matches_df, label="Matches")
+
+
+def collect_matches(data_dir):
+    season_files = find_season_files(data_dir)
+    print(f"Found {len(season_files)} season files")
+    return ingest_seasons(season_files)
+
+
+def main():
+    matches_df = collect_matches(data_dir)
+
+    # Show first few rows
+    print(matches_df.head())
+
+    # Save combined file (typed columnar table; see storage.py)
+    combined_path = storage.table_path(data_dir, "combined_matches")
+    storage.write_table(matches_df, combined_path)
+    print(f"Combined matches saved at {combined_path}")
+
+
+if __name__ == "__main__":
+    main()
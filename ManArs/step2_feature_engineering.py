@@ -1,58 +1,34 @@
-import pandas as pd
-import numpy as np
-
-# New: For ELO ratings
-def initialize_elo(df, base_rating=1500):
-    teams = pd.unique(df[['HomeTeam', 'AwayTeam']].values.ravel('K'))
-    elo_dict = {team: base_rating for team in teams}
-    return elo_dict
-
-def update_elo(elo_dict, home, away, home_score, away_score, k=20):
-    expected_home = 1 / (1 + 10 ** ((elo_dict[away] - elo_dict[home]) / 400))
-    expected_away = 1 - expected_home
-
-    if home_score > away_score:
-        result_home = 1
-        result_away = 0
-    elif home_score < away_score:
-        result_home = 0
-        result_away = 1
-    else:
-        result_home = 0.5
-        result_away = 0.5
-
-    elo_dict[home] += k * (result_home - expected_home)
-    elo_dict[away] += k * (result_away - expected_away)
-
-def add_elo_ratings(df):
-    elo_dict = initialize_elo(df)
-    home_elo_list = []
-    away_elo_list = []
-
-    for _, row in df.iterrows():
-        home = row['HomeTeam']
-        away = row['AwayTeam']
-
-        home_elo_list.append(elo_dict[home])
-        away_elo_list.append(elo_dict[away])
-
-        update_elo(elo_dict, home, away, row['FTHG'], row['FTAG'])
+import argparse
+import os
 
-    df['home_elo'] = home_elo_list
-    df['away_elo'] = away_elo_list
-    return df
-
-data_path = r"C:\Prediction_Models\ManArs\combined_matches.csv"
-output_path = r"C:\Prediction_Models\ManArs\features.csv"
+import numpy as np
+import pandas as pd
+from team_features import add_rolling_features, add_rest_days
+from elo_engine import add_elo_features
+from head_to_head import add_head_to_head_features
+from odds_engine import add_odds_features
+import feature_store
+import profiling
+import storage
+
+data_dir = r"C:\Prediction_Models\ManArs"
+data_path = storage.table_path(data_dir, "combined_matches")
+output_path = storage.table_path(data_dir, "features")
+state_path = r"C:\Prediction_Models\ManArs\team_state.json"
+
+FORM_WINDOW = 5
+H2H_LAST_N = 5
+ODDS_MARGIN_METHOD = 'proportional'
+CONGESTION_WINDOWS = ()   # e.g. (7, 14) for home_/away_matches_last7d / _last14d
+ELO_PARAMS = {'k': 20, 'base_rating': 1500, 'home_advantage': 0}
 
 # 2.1 Load data
 # What: Read combined_matches.csv into a pandas DataFrame, check for missing values and data types.
 #Why: To ensure data is clean and ready for feature creation, and identify any issues early.
 
-df = pd.read_csv(data_path, parse_dates=["Date"])
-
-# Explicit date conversion to avoid string issues
-df['Date'] = pd.to_datetime(df['Date'], errors='coerce', dayfirst=True)
+def load_matches(path):
+    # Dates are parsed once, with an explicit format, by the storage layer
+    return storage.read_table(path)
 
 # 2.2 Standardize columns (rename if needed)
 #What:
@@ -66,19 +42,13 @@ rename_map = {
     'AwayGoals': 'FTAG',
     'Result': 'FTR'
 }
-df = df.rename(columns=rename_map)
-
-# Fill missing numeric columns with 0 (for shots, fouls etc.)
-numeric_cols = ['FTHG','FTAG','ShotsHome','ShotsAway','ShotsOnTargetHome','ShotsOnTargetAway']
-for col in numeric_cols:
-    if col in df.columns:
-        df[col] = df[col].fillna(0)
 
 # 2.3 Create target label (0=Home Win,1=Draw,2=Away Win)
 #What: Add a numeric target variable result_label based on match result:
 # Home Win = 0
 # Draw = 1
 # Away Win = 2
+# Also add match_winner ('Home'/'Draw'/'Away' from the goals), the label Steps 3 and 4 train on.
 # Why: ML models need numeric labels to learn classification.
 
 def result_to_label(r):
@@ -87,14 +57,28 @@ def result_to_label(r):
     if r == 'A': return 2
     return np.nan
 
-# If your Result column uses strings like 'H', 'D', 'A'
-if 'FTR' in df.columns:
-    df['result_label'] = df['FTR'].map(result_to_label)
-else:
-    raise ValueError("Result column (FTR) missing")
-
-# Sort by date for rolling calculations
-df = df.sort_values("Date").reset_index(drop=True)
+@profiling.profiled
+def standardize_matches(df):
+    df = df.rename(columns=rename_map)
+
+    # If your Result column uses strings like 'H', 'D', 'A'
+    if 'FTR' not in df.columns:
+        raise ValueError("Result column (FTR) missing")
+
+    # Fill missing numeric columns with 0 (for shots, fouls etc.)
+    numeric_cols = [col for col in ['FTHG','FTAG','HS','AS','HST','AST'] if col in df.columns]
+    filled = df[numeric_cols].fillna(0)
+
+    # Why: the new columns are built together and joined in one concat; assigning them one at a
+    # time to the compacted frame (one block per categorical) fragments it (PerformanceWarning)
+    new_cols = pd.DataFrame({
+        # Why: FTR may be categorical (see storage.compact); mapping the strings keeps result_label numeric
+        'result_label': df['FTR'].astype('string').map(result_to_label),
+        'match_winner': np.select([filled['FTHG'] > filled['FTAG'], filled['FTHG'] < filled['FTAG']],
+                                  ['Home', 'Away'], default='Draw'),
+    }, index=df.index)
+    columns = list(df.columns) + list(new_cols.columns)
+    return pd.concat([df.drop(columns=numeric_cols), filled, new_cols], axis=1)[columns]
 
 # 2.4 Rolling form features (last 5 matches per team)
 #What: For each team, calculate recent form statistics using the last 5 matches before the current game:
@@ -102,193 +86,104 @@ df = df.sort_values("Date").reset_index(drop=True)
 #Average goals scored and conceded
 #Average shots and shots on target
 #Why: Recent performance (form) is predictive of future results — this captures momentum and current strength.
-
-def add_rolling_features(df, window=5):
-    df = df.copy()
-    teams = pd.unique(df[['HomeTeam', 'AwayTeam']].values.ravel())
-
-    # Initialize rolling stats dictionaries for each team
-    rolling_stats = {team: {'points': [], 'goals_for': [], 'goals_against': [], 'shots': [], 'shots_on_target': []} for team in teams}
-
-    # Prepare lists to store features for each row
-    home_points_avg, away_points_avg = [], []
-    home_goals_avg, away_goals_avg = [], []
-    home_shots_avg, away_shots_avg = [], []
-    home_sot_avg, away_sot_avg = [], []
-
-    # Helper to compute points from result
-    def get_points(result, is_home):
-        if result == 'H':
-            return 3 if is_home else 0
-        elif result == 'A':
-            return 0 if is_home else 3
-        elif result == 'D':
-            return 1
-        else:
-            return 0
-
-    for idx, row in df.iterrows():
-        home = row['HomeTeam']
-        away = row['AwayTeam']
-
-        # Compute rolling averages for home team
-        home_stats = rolling_stats[home]
-        if len(home_stats['points']) >= window:
-            home_points_avg.append(np.mean(home_stats['points'][-window:]))
-            home_goals_avg.append(np.mean(home_stats['goals_for'][-window:]))
-            home_shots_avg.append(np.mean(home_stats['shots'][-window:]))
-            home_sot_avg.append(np.mean(home_stats['shots_on_target'][-window:]))
-        else:
-            home_points_avg.append(np.nan)
-            home_goals_avg.append(np.nan)
-            home_shots_avg.append(np.nan)
-            home_sot_avg.append(np.nan)
-
-        # Compute rolling averages for away team
-        away_stats = rolling_stats[away]
-        if len(away_stats['points']) >= window:
-            away_points_avg.append(np.mean(away_stats['points'][-window:]))
-            away_goals_avg.append(np.mean(away_stats['goals_for'][-window:]))
-            away_shots_avg.append(np.mean(away_stats['shots'][-window:]))
-            away_sot_avg.append(np.mean(away_stats['shots_on_target'][-window:]))
-        else:
-            away_points_avg.append(np.nan)
-            away_goals_avg.append(np.nan)
-            away_shots_avg.append(np.nan)
-            away_sot_avg.append(np.nan)
-
-        # Update rolling stats with current match
-        home_points = get_points(row['FTR'], True)
-        away_points = get_points(row['FTR'], False)
-        rolling_stats[home]['points'].append(home_points)
-        rolling_stats[home]['goals_for'].append(row['FTHG'])
-        rolling_stats[home]['goals_against'].append(row['FTAG'])
-        rolling_stats[home]['shots'].append(row.get('ShotsHome', 0))
-        rolling_stats[home]['shots_on_target'].append(row.get('ShotsOnTargetHome', 0))
-
-        rolling_stats[away]['points'].append(away_points)
-        rolling_stats[away]['goals_for'].append(row['FTAG'])
-        rolling_stats[away]['goals_against'].append(row['FTHG'])
-        rolling_stats[away]['shots'].append(row.get('ShotsAway', 0))
-        rolling_stats[away]['shots_on_target'].append(row.get('ShotsOnTargetAway', 0))
-
-    df['home_points_last5'] = home_points_avg
-    df['away_points_last5'] = away_points_avg
-    df['home_goals_last5'] = home_goals_avg
-    df['away_goals_last5'] = away_goals_avg
-    df['home_shots_last5'] = home_shots_avg
-    df['away_shots_last5'] = away_shots_avg
-    df['home_sot_last5'] = home_sot_avg
-    df['away_sot_last5'] = away_sot_avg
-
-    return df
-
-df = add_rolling_features(df)
+#How: team_features.add_rolling_features builds one row per team per match and uses grouped,
+# shifted rolling windows instead of looping over every match. Change `window` for a different form length.
 
 # 2.5 Compute Elo ratings (simple version)
 # What: Compute an Elo rating per team iteratively through the dataset, updating after every match.
 # Why: Elo ratings are a strong way to represent team strength relative to opponents, accounting for match importance and margin.
-
-def compute_elo(df, k=20, base_elo=1500):
-    teams = pd.unique(df[['HomeTeam', 'AwayTeam']].values.ravel())
-    elo = {team: base_elo for team in teams}
-
-    elo_home, elo_away = [], []
-
-    for _, row in df.iterrows():
-        th = row['HomeTeam']
-        ta = row['AwayTeam']
-
-        # Calculate expected result for home
-        Eh = 1 / (1 + 10 ** ((elo[ta] - elo[th]) / 400))
-
-        # Actual result score for home team
-        if row['FTR'] == 'H':
-            Sh = 1
-        elif row['FTR'] == 'D':
-            Sh = 0.5
-        else:
-            Sh = 0
-
-        # Update elo
-        elo[th] += k * (Sh - Eh)
-        elo[ta] += k * ((1 - Sh) - (1 - Eh))
-
-        elo_home.append(elo[th])
-        elo_away.append(elo[ta])
-
-    df['elo_home'] = elo_home
-    df['elo_away'] = elo_away
-    df['elo_diff'] = df['elo_home'] - df['elo_away']
-
-    return df
-
-df = compute_elo(df)
+# How: elo_engine.add_elo_features maps teams to integer IDs and runs one pass over NumPy arrays, writing both
+# pre-match ratings (home_elo/away_elo) and post-match ratings (elo_home/elo_away/elo_diff).
 
 # 2.6 Calculate rest days
 #What: Compute the number of days since each team’s last match.
 #Why: Rest and fatigue impact performance; teams with more rest tend to perform better.
+#How: team_features.add_rest_days takes a grouped date diff on the one-row-per-team-per-match view.
+# CONGESTION_WINDOWS adds matches played in the last N days; those columns are only built by a
+# full rebuild (team_state.json does not track them), so --incremental falls back to one when they are on.
 
-def add_rest_days(df):
-    df = df.copy()
-    df['days_rest_home'] = np.nan
-    df['days_rest_away'] = np.nan
-
-    last_game_date = {}
-
-    for idx, row in df.iterrows():
-        home = row['HomeTeam']
-        away = row['AwayTeam']
-        date = row['Date']
-
-        # Calculate rest days for home
-        if home in last_game_date:
-            df.at[idx, 'days_rest_home'] = (date - last_game_date[home]).days
-        else:
-            df.at[idx, 'days_rest_home'] = np.nan
-        last_game_date[home] = date
-
-        # Calculate rest days for away
-        if away in last_game_date:
-            df.at[idx, 'days_rest_away'] = (date - last_game_date[away]).days
-        else:
-            df.at[idx, 'days_rest_away'] = np.nan
-        last_game_date[away] = date
-
-    # Difference in rest days
-    df['rest_days_diff'] = df['days_rest_home'] - df['days_rest_away']
-
-    return df
-
-df = add_rest_days(df)
+# 2.6b Head-to-head record
+#What: For each match, the two teams' previous meetings: wins/draws/losses, goal difference and the last 5 meetings.
+#Why: Some pairings have a history that overall form does not capture.
+#How: head_to_head.add_head_to_head_features keeps one running record per pair of teams and fills all rows
+# in a single pass over the sorted matches, reading each row before adding that match.
 
 # 2.7 Odds implied probabilities (if odds columns exist)
 #What: If you have betting odds (e.g., from B365H, B365D, B365A), convert them to implied probabilities.
 #Why: Odds reflect expert and market expectations; including them helps improve predictions.
-
-if set(['B365H', 'B365D', 'B365A']).issubset(df.columns):
-    df['odds_home_prob'] = 1 / df['B365H']
-    df['odds_draw_prob'] = 1 / df['B365D']
-    df['odds_away_prob'] = 1 / df['B365A']
-    # Normalize probabilities to sum to 1 (remove bookmaker margin)
-    total_prob = df['odds_home_prob'] + df['odds_draw_prob'] + df['odds_away_prob']
-    df['odds_home_prob'] /= total_prob
-    df['odds_draw_prob'] /= total_prob
-    df['odds_away_prob'] /= total_prob
-
-def add_bookmaker_probs(df):
-    for col in ['B365H', 'B365D', 'B365A']:
-        if col in df.columns:
-            prob_col = col + '_prob'
-            df[prob_col] = 1 / df[col]
-    return df
-
-# Apply new features
-features_df = add_elo_ratings(df)
-features_df = add_bookmaker_probs(features_df)
-
-
-# Save processed features
-features_df.to_csv(output_path, index=False)
-print(f"Feature engineered data saved to {output_path}")
-
+#How: odds_engine.add_odds_features stacks every bookmaker's prices (opening and closing) into one array,
+# removes the margin (ODDS_MARGIN_METHOD: 'proportional', 'shin' or 'power') and adds Bet365's probabilities
+# (odds_*_prob) plus the consensus across bookmakers (cons_*_prob), their spread (cons_*_std) and the overround.
+
+def add_odds_probs(df):
+    return add_odds_features(df, method=ODDS_MARGIN_METHOD)
+
+# 2.8 Full rebuild
+# What: Run 2.2 - 2.7 over the whole match history.
+# Why: Needed the first time, or whenever the form window / Elo settings change.
+
+def engineer_features(df):
+    df = standardize_matches(df)
+
+    # Sort by date for rolling calculations
+    df = df.sort_values("Date").reset_index(drop=True)
+
+    df = add_rolling_features(df, window=FORM_WINDOW)
+    df = add_elo_features(df, **ELO_PARAMS)
+    df = add_rest_days(df, congestion_windows=CONGESTION_WINDOWS)
+    df = add_head_to_head_features(df, last_n=H2H_LAST_N)
+    return add_odds_probs(df)
+
+# 2.9 Incremental update
+# What: Apply only matches that are newer than the saved team state and append them to features.csv.
+# Why: During the season we ingest one matchweek at a time; replaying the whole history for 10 new rows is wasted work.
+
+def update_features(new_matches, state, existing_columns):
+    new_matches = standardize_matches(new_matches)
+    new_features = feature_store.apply_matches(state, new_matches)
+    new_features = add_odds_probs(new_features)
+    return new_features.reindex(columns=existing_columns)
+
+
+@profiling.profiled
+def save_features(features_df, output_path, state_path):
+    # Save processed features (compact dtypes: float32 features and odds, categorical teams)
+    storage.write_table(storage.compact(features_df, label="Features"), output_path)
+    print(f"Feature engineered data saved to {output_path}")
+
+    # Save per-team state so the next matchweek can be applied incrementally
+    state = feature_store.build_state(features_df, window=FORM_WINDOW, h2h_last_n=H2H_LAST_N,
+                                      odds_method=ODDS_MARGIN_METHOD, **ELO_PARAMS)
+    feature_store.save_state(state, state_path)
+    print(f"Team state saved to {state_path}")
+
+
+def main(incremental=False):
+    df = load_matches(data_path)
+
+    if incremental and CONGESTION_WINDOWS:
+        print("Congestion features need a full rebuild - ignoring --incremental")
+    elif incremental and os.path.exists(state_path) and os.path.exists(output_path):
+        state = feature_store.load_state(state_path)
+        new_matches = feature_store.select_new_matches(df, state)
+        if new_matches.empty:
+            print("No new matches since the last update - features are up to date")
+            return
+
+        existing_columns = storage.table_columns(output_path)
+        new_features = update_features(new_matches, state, existing_columns)
+        storage.append_table(new_features, output_path)
+        feature_store.save_state(state, state_path)
+        print(f"Appended {len(new_features)} new matches to {output_path}")
+        return
+
+    save_features(engineer_features(df), output_path, state_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Step 2: feature engineering")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only apply matches newer than the saved team state")
+    args = parser.parse_args()
+    with profiling.session(os.path.join(data_dir, profiling.PROFILE_DIR_NAME)):
+        main(incremental=args.incremental)
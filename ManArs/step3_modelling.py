@@ -5,88 +5,153 @@ Goal: Train a model to predict the winner of Arsenal vs Man United game
 """
 
 # 3.1 Import Libraries
-# Why: We need pandas for data handling, sklearn for model building, numpy for numerical operations
+# Why: We need pandas for data handling, sklearn for model building
+import os
+
 import pandas as pd
-import numpy as np
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.base import clone
+from sklearn.model_selection import GridSearchCV
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report
+import feature_sets
+import feature_store
+import model_registry
+import model_search
+import profiling
+import storage
+from fixture_builder import FixtureFeatureBuilder, DEFAULT_FIXTURE
 
-# 3.2 Load Data
-# Why: We use the cleaned 'features.csv' from Step 2 as our prepared dataset
-df = pd.read_csv("features.csv")
-print(f"✅ Data loaded successfully with shape: {df.shape}")
-
-def get_winner(row):
-    if row['FTHG'] > row['FTAG']:
-        return "Home"
-    elif row['FTHG'] < row['FTAG']:
-        return "Away"
-    else:
-        return "Draw"
+data_dir = r"C:\Prediction_Models\ManArs"
 
-df['match_winner'] = df.apply(get_winner, axis=1)
-
-df.to_csv("features.csv", index=False)
-print("✅ match_winner column added successfully!")
+# 3.2 Load Data
+# Why: We use the cleaned features table from Step 2 (which already has the match_winner label) as our prepared dataset
+# Only the match date, the model's input columns and the target are loaded - see feature_sets.py.
+def load_features(data_dir):
+    features_file = storage.table_path(data_dir, "features")
+    stored = storage.table_columns(features_file)
+    inputs = [col for col in feature_sets.source_columns() if col in stored]
+    df = storage.read_table(features_file, columns=['Date'] + inputs + [target_column])
+    print(f"✅ Data loaded successfully with shape: {df.shape}")
+    return df
 
 # 3.3 Define Target & Features
 # Why: We separate the column we want to predict (target) from input features
 # Assuming 'match_winner' column exists: 'Home', 'Away', 'Draw'
 target_column = "match_winner"
-# Include ELO & bookmaker probs in the training set
-feature_cols = [col for col in df.columns if col not in [target_column, 'home_team', 'away_team', 'date']]
-X = df[feature_cols]
-y = df[target_column]
 
-# Optional: Drop non-numeric columns or encode them
-X = pd.get_dummies(X, drop_first=True)
-
-# 3.4 Split into Train/Test Sets
-# Why: To evaluate how well our model works on unseen data
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
-print(f"📊 Training size: {X_train.shape}, Test size: {X_test.shape}")
+@profiling.profiled
+def prepare_training_data(df):
+    # Include form, pre-match ELO, rest days & bookmaker probs - only what is known before kick-off
+    # (see feature_sets.py; results, match stats and post-match Elo would leak the outcome)
+    # Oldest match first, so the holdout (and the search's validation split) are the most recent matches
+    df = df.sort_values('Date', kind='mergesort').reset_index(drop=True)
+    feature_cols = feature_sets.PRE_MATCH_FEATURE_NAMES
+    X = feature_sets.build_matrix(df, feature_cols)  # contiguous float32 array
+    y = df[target_column].to_numpy()
+    return X, y, feature_cols
 
 # 3.5 Initialize Base Model
 # Why: RandomForest works well for tabular sports data without heavy preprocessing
-rf = RandomForestClassifier(random_state=42)
 
 # 3.6 Hyperparameter Tuning
-# Why: To find the best combination of parameters for higher accuracy
+# Why: To find the best combination of parameters for well-calibrated probabilities (log loss)
+# SEARCH_MODE:
+#   "halving" - successive halving with the number of trees as the budget and warm-started forests,
+#               stopping after SEARCH_TIME_BUDGET seconds (see model_search.py). Much faster.
+#               The final refit of the winner at full size is not counted in the budget.
+#   "grid"    - the full GridSearchCV: all 36 combinations x 3 folds.
+SEARCH_MODE = "halving"
+SEARCH_TIME_BUDGET = 60  # seconds, halving mode only
+
 param_grid = {
     "n_estimators": [100, 200, 300],
     "max_depth": [None, 10, 20],
     "min_samples_split": [2, 5],
     "min_samples_leaf": [1, 2]
 }
-grid_search = GridSearchCV(rf, param_grid, cv=3, scoring="accuracy", n_jobs=-1, verbose=2)
-grid_search.fit(X_train, y_train)
-best_model = grid_search.best_estimator_
-print(f"🏆 Best Parameters: {grid_search.best_params_}")
 
-# 3.7 Evaluate Model
-# Why: To see how well the tuned model predicts results on new data
-y_pred = best_model.predict(X_test)
-y_pred_proba = best_model.predict_proba(X_test)
+@profiling.profiled
+def tune_model(X_train, y_train, mode=SEARCH_MODE):
+    if mode == "halving":
+        halving_grid = {key: values for key, values in param_grid.items() if key != "n_estimators"}
+        best_model, best_params, _ = model_search.successive_halving_search(
+            X_train, y_train, halving_grid,
+            max_estimators=max(param_grid["n_estimators"]), time_budget=SEARCH_TIME_BUDGET,
+        )
+    elif mode == "grid":
+        rf = RandomForestClassifier(random_state=42)
+        grid_search = GridSearchCV(rf, param_grid, cv=3, scoring="neg_log_loss", n_jobs=-1, verbose=2)
+        grid_search.fit(X_train, y_train)
+        best_model, best_params = grid_search.best_estimator_, grid_search.best_params_
+    else:
+        raise ValueError(f"Unknown search mode '{mode}' (use 'halving' or 'grid')")
+    print(f"🏆 Best Parameters: {best_params}")
+    return best_model, best_params
+
+def train_model(df):
+    """Run 3.3 - 3.7 on a features DataFrame and return the tuned model with its test split and accuracy."""
+    X, y, feature_cols = prepare_training_data(df)
+
+    # 3.4 Split into Train/Test Sets
+    # Why: To evaluate how well our model works on unseen data
+    # The most recent 20% of matches are held out - a random split would train on matches played after the test ones.
+    split = int(len(X) * 0.8)
+    X_train, X_test = X[:split], X[split:]
+    y_train, y_test = y[:split], y[split:]
+    print(f"📊 Training size: {X_train.shape}, Test size: {X_test.shape}")
 
-accuracy = accuracy_score(y_test, y_pred)
-print(f"✅ Model Accuracy: {accuracy:.2%}")
-print("\n📄 Classification Report:\n", classification_report(y_test, y_pred))
+    best_model, best_params = tune_model(X_train, y_train)
 
-# 3.8 Example Prediction for Arsenal vs Man United
+    # 3.7 Evaluate Model
+    # Why: To see how well the tuned model predicts results on new data
+    with profiling.stage('evaluate', rows=len(X_test)):
+        y_pred = best_model.predict(X_test)
+
+    accuracy = accuracy_score(y_test, y_pred)
+    print(f"✅ Model Accuracy: {accuracy:.2%}")
+    print("\n📄 Classification Report:\n", classification_report(y_test, y_pred))
+
+    # Fixtures without bookmaker prices are scored by the same tuned model trained without the odds features
+    no_odds_cols = [feature_cols.index(name) for name in feature_sets.NO_ODDS_FEATURE_NAMES]
+    no_odds_model = clone(best_model).fit(X_train[:, no_odds_cols], y_train)
+
+    return {
+        'model': model_registry.OddsFallbackModel(best_model, no_odds_model, feature_cols),
+        'best_params': best_params,
+        'accuracy': accuracy,
+        'feature_columns': feature_cols,
+        'X_test': X_test,
+        'y_test': y_test,
+    }
+
+# 3.8 Prediction for Arsenal vs Man United
 # Why: Final goal — predict this match result with win probability
-# NOTE: Replace the values below with actual match-specific features
-example_match = X_test.iloc[[0]]  # Using a sample row for now
-predicted_winner = best_model.predict(example_match)[0]
-predicted_proba = best_model.predict_proba(example_match)[0]
-
-# Map probabilities to classes
-class_probabilities = dict(zip(best_model.classes_, predicted_proba))
-
-print("\n🎯 Prediction for Arsenal vs Man United:")
-print(f"Predicted Winner: {predicted_winner}")
-print("Win Probability Breakdown:")
-for outcome, prob in class_probabilities.items():
-    print(f"{outcome}: {prob:.2%}")
+# The feature row is built from each team's current form, Elo and rest days (Step 2's team state)
+def example_prediction(best_model, feature_columns, state, fixture=DEFAULT_FIXTURE):
+    home, away, date = fixture
+    example_match = pd.DataFrame([FixtureFeatureBuilder(state).build(home, away, date)])
+    example_match = feature_sets.build_matrix(example_match, feature_columns)
+    predicted_winner = best_model.predict(example_match)[0]
+    predicted_proba = best_model.predict_proba(example_match)[0]
+
+    # Map probabilities to classes
+    class_probabilities = dict(zip(best_model.classes_, predicted_proba))
+
+    print(f"\n🎯 Prediction for {home} vs {away}:")
+    print(f"Predicted Winner: {predicted_winner}")
+    print("Win Probability Breakdown:")
+    for outcome, prob in class_probabilities.items():
+        print(f"{outcome}: {prob:.2%}")
+    return class_probabilities
+
+
+def main():
+    df = load_features(data_dir)
+    result = train_model(df)
+    state = feature_store.load_state(os.path.join(data_dir, "team_state.json"))
+    example_prediction(result['model'], result['feature_columns'], state)
+
+
+if __name__ == "__main__":
+    with profiling.session(os.path.join(data_dir, profiling.PROFILE_DIR_NAME)):
+        main()
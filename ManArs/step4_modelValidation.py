@@ -3,107 +3,201 @@
 # This script evaluates the trained model to check how well it generalizes
 # and to make sure it's not just memorizing old matches.
 
+import os
+
 import pandas as pd
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-import joblib
+import feature_sets
+import feature_store
+import model_registry
+import profiling
+import storage
+import walk_forward
+from fixture_builder import FixtureFeatureBuilder, DEFAULT_FIXTURE
+
+data_dir = r"C:\Prediction_Models\ManArs"
 
 # -------------------------
 # 4.1 Load Prepared Features
 # -------------------------
 # Why: We want to use the processed dataset from Step 2 that contains all the features.
-features_file = r"C:\Prediction_Models\ManArs\features.csv"
-df = pd.read_csv(features_file)
+# Only the model's input columns (plus the target and match date) are loaded - see feature_sets.py.
+def load_features(data_dir):
+    features_file = storage.table_path(data_dir, "features")
+    stored = storage.table_columns(features_file)
+    inputs = [col for col in feature_sets.source_columns() if col in stored]
+    return storage.read_table(features_file, columns=['Date'] + inputs + ['match_winner'])
 
 # -------------------------
 # 4.2 Define Target & Features
 # -------------------------
-# Why: 'match_winner' is our label, the rest are inputs for the model.
+# Why: 'match_winner' is our label; the inputs are the pre-match features declared in feature_sets.py.
 target_column = 'match_winner'
 
-# Ensure target column exists
-assert target_column in df.columns, f"Target column '{target_column}' not found in dataset."
-
-# Remove non-numeric columns except the target
-df = df.drop(columns=[col for col in df.columns if df[col].dtype == 'object' and col != target_column])
-
-# Now separate features and target
-X = df.drop(columns=[target_column])
-y = df[target_column]
-
-# -------------------------
-# 4.3 Train/Test Split
-# -------------------------
-# Why: This allows us to test the model on unseen data to measure generalization.
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
-
-# -------------------------
-# 4.4 Train Model
-# -------------------------
-# Why: We train the model on training data only.
-model = RandomForestClassifier(n_estimators=200, random_state=42)
-model.fit(X_train, y_train)
-
-# -------------------------
-# 4.5 Predict on Test Data
-# -------------------------
-# Why: See how the model performs on new data it hasn't seen.
-y_pred = model.predict(X_test)
-
-# -------------------------
-# 4.6 Evaluate Metrics
-# -------------------------
-# Why: Accuracy is one measure, but precision/recall/F1 give deeper insight.
-print("🎯 Model Evaluation Results:")
-print("-" * 40)
-print("✅ Accuracy:", accuracy_score(y_test, y_pred))
-print("\n📊 Classification Report:")
-print(classification_report(y_test, y_pred))
-print("📌 Confusion Matrix:")
-print(confusion_matrix(y_test, y_pred))
-
-# -------------------------
-# 4.7 Cross-Validation
-# -------------------------
-# Why: Checks model performance stability across different splits of data.
-cv_scores = cross_val_score(model, X, y, cv=5)
-print("\n🔁 Cross-Validation Scores:", cv_scores)
-print("📈 Average CV Score:", cv_scores.mean())
+@profiling.profiled
+def prepare_validation_data(df):
+    # Ensure target column exists
+    assert target_column in df.columns, f"Target column '{target_column}' not found in dataset."
+
+    # Oldest match first, so every split below trains on the past only
+    df = df.sort_values('Date', kind='mergesort').reset_index(drop=True)
+
+    # Pre-match features only, as a contiguous float32 matrix
+    feature_cols = feature_sets.PRE_MATCH_FEATURE_NAMES
+    X = feature_sets.build_matrix(df, feature_cols)
+    y = df[target_column].to_numpy()
+    return X, y, df['Date'], feature_cols
+
+
+def validate_model(df, state=None, fixture=DEFAULT_FIXTURE):
+    """
+    Run 4.2 - 4.7 on a features DataFrame. Returns the models refitted on every match (for
+    production, as an OddsFallbackModel), the test split and metrics measured on the holdout.
+    If Step 2's team `state` is given, also the probabilities for `fixture` (home, away, date).
+    """
+    X, y, dates, feature_cols = prepare_validation_data(df)
+
+    # -------------------------
+    # 4.3 Train/Test Split
+    # -------------------------
+    # Why: This allows us to test the model on unseen data to measure generalization.
+    # The most recent 20% of matches are held out - a random split would train on matches played after the test ones.
+    split = int(len(X) * 0.8)
+    X_train, X_test = X[:split], X[split:]
+    y_train, y_test = y[:split], y[split:]
+
+    # -------------------------
+    # 4.4 Train Model
+    # -------------------------
+    # Why: We train the model on training data only.
+    model = RandomForestClassifier(n_estimators=200, random_state=42)
+    with profiling.stage('fit', rows=len(X_train)):
+        model.fit(X_train, y_train)
+
+    # -------------------------
+    # 4.5 Predict on Test Data
+    # -------------------------
+    # Why: See how the model performs on new data it hasn't seen.
+    y_pred = model.predict(X_test)
+
+    # -------------------------
+    # 4.6 Evaluate Metrics
+    # -------------------------
+    # Why: Accuracy is one measure, but precision/recall/F1 give deeper insight.
+    accuracy = accuracy_score(y_test, y_pred)
+    print("🎯 Model Evaluation Results:")
+    print("-" * 40)
+    print("✅ Accuracy:", accuracy)
+    print("\n📊 Classification Report:")
+    print(classification_report(y_test, y_pred))
+    print("📌 Confusion Matrix:")
+    print(confusion_matrix(y_test, y_pred))
+
+    # -------------------------
+    # 4.7 Walk-Forward Validation
+    # -------------------------
+    # Why: Checks model performance stability across seasons, always training on earlier seasons only
+    #      (folds run in parallel; see walk_forward.py).
+    with profiling.stage('walk_forward', rows=len(X)):
+        walk_forward_report = walk_forward.walk_forward(model, X, y, dates, block='season')
+    walk_forward.print_report(walk_forward_report)
+
+    # -------------------------
+    # 4.7b Model Without Odds
+    # -------------------------
+    # Why: Fixtures scored ahead of time usually have no bookmaker prices yet. Instead of feeding NaN
+    #      to a model that always saw odds, a second model is trained without the odds features
+    #      and scores those fixtures (see model_registry.OddsFallbackModel).
+    no_odds_cols = [feature_cols.index(name) for name in feature_sets.NO_ODDS_FEATURE_NAMES]
+    X_no_odds = X[:, no_odds_cols]
+    no_odds_model = clone(model)
+    with profiling.stage('fit_without_odds', rows=len(X_train)):
+        no_odds_model.fit(X_no_odds[:split], y_train)
+    accuracy_without_odds = accuracy_score(y_test, no_odds_model.predict(X_no_odds[split:]))
+    print(f"✅ Accuracy without odds: {accuracy_without_odds}")
+
+    # -------------------------
+    # 4.7c Refit on All Matches
+    # -------------------------
+    # Why: The holdout is only for measuring the models. The models we register and serve are refitted
+    #      with the same settings on every match, so the most recent season is part of what they learned.
+    with profiling.stage('refit', rows=len(X)):
+        final_model = model_registry.OddsFallbackModel(
+            clone(model).fit(X, y), clone(model).fit(X_no_odds, y), feature_cols)
+
+    # -------------------------
+    # 4.10 Prediction Probabilities for Step 5
+    # -------------------------
+    # Why: Score the real upcoming fixture, built from each team's current form, Elo and rest days
+    #      (see fixture_builder.py). It has no bookmaker prices, so the model without odds scores it.
+    probabilities = None
+    if state is not None:
+        home, away, date = fixture
+        fixture_features = pd.DataFrame([FixtureFeatureBuilder(state).build(home, away, date)])
+        fixture_features = feature_sets.build_matrix(fixture_features, feature_cols)
+        probabilities = list(final_model.predict_proba(fixture_features)[0] * 100)  # Convert to %
+
+    return {
+        'model': final_model,
+        'accuracy': accuracy,
+        'accuracy_without_odds': accuracy_without_odds,
+        'walk_forward': walk_forward_report,
+        'feature_columns': feature_cols,
+        'X_test': X_test,
+        'y_test': y_test,
+        'y_pred': y_pred,
+        'probabilities': probabilities,  # [Away, Draw, Home] in %
+    }
+
+
+def save_outputs(result, data_dir):
+    # -------------------------
+    # 4.8 Save the Trained Model
+    # -------------------------
+    # Why: To avoid retraining from scratch every time. The registry keeps the feature columns and
+    #      class order with the model, so it can be loaded later for predictions (see model_registry.py).
+    registry_dir = os.path.join(data_dir, "models")
+    version = model_registry.register_model(
+        result['model'],
+        feature_columns=result['feature_columns'],
+        metrics={
+            'accuracy': float(result['accuracy']),
+            'accuracy_without_odds': float(result['accuracy_without_odds']),
+            'walk_forward_log_loss': float(result['walk_forward']['log_loss'].mean()),
+            'walk_forward_brier': float(result['walk_forward']['brier'].mean()),
+        },
+        params=result['model'].get_params(),
+        registry_dir=registry_dir,
+    )
+    print(f"\n💾 Model registered as {model_registry.DEFAULT_NAME} {version} in: {registry_dir}")
+
+    # -------------------------
+    # 4.9 Optional: Save Test Results
+    # -------------------------
+    # Why: Useful for reviewing which matches were predicted correctly/wrongly.
+    results_path = os.path.join(data_dir, "model_test_results.csv")
+    results_df = pd.DataFrame(result['X_test'], columns=result['feature_columns'])
+    results_df['Actual'] = result['y_test']
+    results_df['Predicted'] = result['y_pred']
+    results_df.to_csv(results_path, index=False)
+    print(f"📂 Test results saved to: {results_path}")
 
-# -------------------------
-# 4.8 Save the Trained Model
-# -------------------------
-# Why: To avoid retraining from scratch every time.
-model_path = r"C:\Prediction_Models\ManArs\match_winner_model.pkl"
-joblib.dump(model, model_path)
-print(f"\n💾 Model saved to: {model_path}")
+    # Save to CSV so Step 5 can read it
+    if result['probabilities'] is not None:
+        prob_path = os.path.join(data_dir, "step4_probabilities.csv")
+        pd.DataFrame([result['probabilities']], columns=["Away", "Draw", "Home"]).to_csv(prob_path, index=False)
+        print(f"📂 Step 4 probabilities saved to: {prob_path}")
 
-# -------------------------
-# 4.9 Optional: Save Test Results
-# -------------------------
-# Why: Useful for reviewing which matches were predicted correctly/wrongly.
-results_df = X_test.copy()
-results_df['Actual'] = y_test
-results_df['Predicted'] = y_pred
-results_df.to_csv(r"C:\Prediction_Models\ManArs\model_test_results.csv", index=False)
-print("📂 Test results saved to: C:\\Prediction_Models\\ManArs\\model_test_results.csv")
 
+def main():
+    df = load_features(data_dir)
+    state = feature_store.load_state(os.path.join(data_dir, "team_state.json"))
+    result = validate_model(df, state)
+    save_outputs(result, data_dir)
 
-# -------------------------
-# 4.10 Save Example Prediction Probabilities for Step 5
-# -------------------------
-# Pick one test match to demonstrate
-if len(X_test) > 0:
-    example_match_index = X_test.index[0]
-    example_features = X_test.loc[example_match_index].values.reshape(1, -1)
-    example_probabilities = model.predict_proba(example_features)[0] * 100  # Convert to %
 
-    # Save to CSV so Step 5 can read it
-    pd.DataFrame([example_probabilities], columns=["Away", "Draw", "Home"]).to_csv(
-        r"C:\Prediction_Models\ManArs\step4_probabilities.csv",
-        index=False
-    )
-    print("📂 Step 4 probabilities saved to: C:\\Prediction_Models\\ManArs\\step4_probabilities.csv")
+if __name__ == "__main__":
+    with profiling.session(os.path.join(data_dir, profiling.PROFILE_DIR_NAME)):
+        main()
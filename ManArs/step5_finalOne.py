@@ -13,6 +13,7 @@ Automation:
     No need to manually paste probabilities from Step 4.
     Step 4 automatically saves them to 'step4_probabilities.csv'.
     Step 5 reads that file and displays the results.
+    When run through pipeline.run_pipeline, Step 4's probabilities are passed in directly.
 
 Make sure:
     - Step 4 has been run before Step 5
@@ -22,20 +23,20 @@ Make sure:
 import pandas as pd
 import os
 
+prob_file = r"C:\Prediction_Models\ManArs\step4_probabilities.csv"
+
 # ------------------------
 # 5.1 Load Step 4 results
 # ------------------------
-prob_file = r"C:\Prediction_Models\ManArs\step4_probabilities.csv"
-
-if not os.path.exists(prob_file):
-    raise FileNotFoundError(
-        f"Prediction probabilities file not found at: {prob_file}\n"
-        "💡 Run Step 4 first to generate the latest predictions."
-    )
+def load_probabilities(prob_file):
+    if not os.path.exists(prob_file):
+        raise FileNotFoundError(
+            f"Prediction probabilities file not found at: {prob_file}\n"
+            "💡 Run Step 4 first to generate the latest predictions."
+        )
 
-prob_df = pd.read_csv(prob_file)
-# probabilities = prob_df.iloc[0].tolist()
-probabilities = [20, 3, 77]  # Example probabilities for Away, Draw, Home
+    prob_df = pd.read_csv(prob_file)
+    return prob_df.iloc[0].tolist()  # [Away, Draw, Home] in %
 
 # ------------------------
 # 5.2 Map labels
@@ -45,17 +46,31 @@ label_map = {0: "Away", 1: "Draw", 2: "Home"}
 # ------------------------
 # 5.3 Find winner
 # ------------------------
-max_index = probabilities.index(max(probabilities))
-predicted_winner = label_map[max_index]
-winning_percentage = probabilities[max_index]
+def final_prediction(probabilities):
+    max_index = probabilities.index(max(probabilities))
+    return {
+        'predicted_winner': label_map[max_index],
+        'winning_percentage': probabilities[max_index],
+        'probabilities': probabilities,
+    }
 
 # ------------------------
 # 5.4 Show results
 # ------------------------
-print("\n🎯 FINAL PREDICTION RESULT")
-print(f"Predicted Winner: {predicted_winner}")
-print(f"Winning Chance: {winning_percentage:.2f}%")
-print("\nFull Probability Breakdown:")
-print(f"Away Win: {probabilities[0]:.2f}%")
-print(f"Draw:     {probabilities[1]:.2f}%")
-print(f"Home Win: {probabilities[2]:.2f}%")
+def show_result(result):
+    probabilities = result['probabilities']
+    print("\n🎯 FINAL PREDICTION RESULT")
+    print(f"Predicted Winner: {result['predicted_winner']}")
+    print(f"Winning Chance: {result['winning_percentage']:.2f}%")
+    print("\nFull Probability Breakdown:")
+    print(f"Away Win: {probabilities[0]:.2f}%")
+    print(f"Draw:     {probabilities[1]:.2f}%")
+    print(f"Home Win: {probabilities[2]:.2f}%")
+
+
+def main():
+    show_result(final_prediction(load_probabilities(prob_file)))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,71 @@ from PIL import Image, ImageDraw, ImageFont, ImageTk
 import requests
 import io
 import os
+import queue
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import asset_cache
+import pipeline_cache
+
+PIPELINE_POLL_MS = 100   # how often the Tk thread checks background workers for progress
+
+# Matchweek data: a fixture list (Matchweek, Date, HomeTeam, AwayTeam) scored by batch_score.py
+FIXTURES_FILE = os.path.join(pipeline_cache.CODE_DIR, 'matchweek_fixtures.csv')
+PREDICTIONS_FILE = os.path.join(pipeline_cache.CODE_DIR, 'matchweek_predictions.csv')
+
+# Team logos: explicit files first, then logos/<team name>.png, otherwise a coloured badge
+LOGO_DIR = os.path.join(pipeline_cache.CODE_DIR, 'logos')
+TEAM_LOGOS = {
+    'Arsenal': 'arsenal_logo.png',
+    'Man United': 'manutd_logo.png',
+}
+TEAM_COLOURS = {
+    'Arsenal': '#DC143C',
+    'Man United': '#DA020E',
+}
+LOGO_SIZE = (48, 48)
+LOGO_CACHE_SIZE = 40     # Tk images kept in memory (least recently used are dropped)
+ROW_HEIGHT = 64
+
+
+class TeamLogos:
+    """Tk logo images loaded on first use and kept in a small LRU cache"""
+
+    def __init__(self, capacity=LOGO_CACHE_SIZE, size=LOGO_SIZE):
+        self.capacity = capacity
+        self.size = size
+        self._images = OrderedDict()
+
+    def logo_path(self, team):
+        if team in TEAM_LOGOS:
+            path = os.path.join(pipeline_cache.CODE_DIR, TEAM_LOGOS[team])
+        else:
+            path = os.path.join(LOGO_DIR, f"{team}.png")
+        return path if os.path.exists(path) else None
+
+    def get(self, team):
+        """PhotoImage for `team`, or None if it has no logo file"""
+        if team in self._images:
+            self._images.move_to_end(team)
+            return self._images[team]
+
+        path = self.logo_path(team)
+        image = None
+        if path:
+            try:
+                # Processed once, then served from the on-disk asset cache
+                image = ImageTk.PhotoImage(asset_cache.processed_logo(path, self.size))
+            except Exception as e:
+                print(f"Could not load {team} logo: {e}")
+
+        self._images[team] = image
+        if len(self._images) > self.capacity:
+            self._images.popitem(last=False)
+        return image
+
 
 class FootballPredictionDashboard:
     def __init__(self, root):
@@ -11,479 +76,397 @@ class FootballPredictionDashboard:
         self.root.title("Football Prediction Dashboard")
         self.root.geometry("800x600")
         self.root.configure(bg='black')
-        
-        # Prediction values (loaded from step5)
-        self.arsenal_win = tk.StringVar()
-        self.draw = tk.StringVar() 
-        self.manutd_win = tk.StringVar()
-        
-        # Load predictions from step5 on startup
-        self.load_step5_predictions()
-        
-        # Team logos (placeholder paths - replace with actual logo paths)
-        self.arsenal_logo = None
-        self.manutd_logo = None
-        
-        # Load team logos
-        self.load_team_logos()
-        
+
+        # Fixtures and predictions (rows of matchweek_predictions.csv), filled in by refresh_predictions
+        self.fixtures = []
+        self.fixture_rows = []
+        self.matchweek_text = tk.StringVar(value="Matchweek")
+
+        # Background pipeline run (see run_full_pipeline), prediction refresh and the live status line
+        self.pipeline_job = None
+        self.refresh_events = None
+        self.refresh_pending = False  # a refresh asked for while another refresh or a pipeline run was busy
+        self.step_timings = []
+        self.status_text = tk.StringVar(value="Ready")
+
+        # Team logos are loaded only when their row is on screen
+        self.team_logos = TeamLogos()
+        self.premier_logo_img = None
+        self.load_premier_logo()
+
         self.create_dashboard()
-        
-    def load_team_logos(self):
-        """Load team logo images from PNG files"""
-        self.arsenal_logo_img = None
-        self.manutd_logo_img = None
-        self.premier_logo_img = None 
-        
-        try:
-            # Load Arsenal logo - replace 'arsenal_logo.png' with your file name
-            arsenal_img = Image.open('arsenal_logo.png').convert("RGBA")
-            arsenal_img = self.make_background_transparent(arsenal_img)
-            arsenal_img = arsenal_img.resize((68, 68), Image.Resampling.LANCZOS)
-            self.arsenal_logo_img = ImageTk.PhotoImage(arsenal_img)
-        except Exception as e:
-            print(f"Could not load Arsenal logo: {e}")
-            
-        try:
-            # Load Man Utd logo - replace 'manutd_logo.png' with your file name  
-            manutd_img = Image.open('manutd_logo.png').convert("RGBA")
-            manutd_img = self.make_background_transparent(manutd_img)
-            manutd_img = manutd_img.resize((68, 68), Image.Resampling.LANCZOS)
-            self.manutd_logo_img = ImageTk.PhotoImage(manutd_img)
-        except Exception as e:
-            print(f"Could not load Man Utd logo: {e}")
 
+        # Show the last saved predictions straight away, then re-score the fixtures in the background
+        self.show_fixtures(self.load_saved_predictions())
+        self.refresh_predictions()
+
+    def load_premier_logo(self):
         try:
-            pl_img = Image.open('premier_league_logo.png').convert("RGBA")
-            # pl_img = self.make_background_transparent(pl_img)
-            # small horizontal badge next to "Matchweek 1"
-            pl_img = pl_img.resize((80, 80), Image.Resampling.LANCZOS)
+            # small horizontal badge next to the matchweek title (kept with its own background)
+            pl_path = os.path.join(pipeline_cache.CODE_DIR, 'premier_league_logo.png')
+            pl_img = asset_cache.processed_logo(pl_path, (80, 80), transparent=False)
             self.premier_logo_img = ImageTk.PhotoImage(pl_img)
         except Exception as e:
             print(f"Could not load Premier League logo: {e}")
-    
-    def make_background_transparent(self, img):
-        """Advanced background removal - handles white, gray, and similar backgrounds"""
-        img = img.convert("RGBA")
-        data = img.getdata()
-        
-        new_data = []
-        for item in data:
-            r, g, b, a = item
-            
-            # Check if pixel is background (white, light gray, or similar colors)
-            is_background = (
-                # Pure white
-                (r > 240 and g > 240 and b > 240) or
-                # Light gray
-                (abs(r - g) < 10 and abs(g - b) < 10 and abs(r - b) < 10 and r > 200) or
-                # Very light colors (beige, off-white, etc.)
-                (r > 230 and g > 230 and b > 220)
-            )
-            
-            if is_background:
-                new_data.append((255, 255, 255, 0))  # Make transparent
-            else:
-                new_data.append((r, g, b, a))  # Keep original
-        
-        img.putdata(new_data)
-        return img
-    
+
     def create_dashboard(self):
         # Main container
-        main_frame = tk.Frame(self.root, bg='black', padx=40, pady=40)
+        main_frame = tk.Frame(self.root, bg='black', padx=30, pady=20)
         main_frame.pack(fill='both', expand=True)
-        
-        # Title
-        title_label = tk.Label(main_frame, text="Prediction (Win %)", 
-                              font=('Arial', 18, 'bold'), 
-                              fg='white', bg='black')
-        title_label.pack(pady=(0, 30))
-        
-        # Predictions container
-        pred_frame = tk.Frame(main_frame, bg='black')
-        pred_frame.pack(fill='x', pady=20)
-        
-        # Configure grid weights
-        pred_frame.grid_columnconfigure(0, weight=1)
-        pred_frame.grid_columnconfigure(1, weight=1)
-        pred_frame.grid_columnconfigure(2, weight=1)
-        
-        # Arsenal section
-        arsenal_frame = tk.Frame(pred_frame, bg='black')
-        arsenal_frame.grid(row=0, column=0, padx=20)
-        
-        # Arsenal percentage
-        arsenal_perc_label = tk.Label(arsenal_frame, text=f"{self.arsenal_win.get()}%", 
-                                     font=('Verdana', 35, 'bold'), 
-                                     fg='white', bg='black')
-        arsenal_perc_label.pack(pady=(0, 10))
-        
-        # Arsenal logo placeholder (circular) - removed this since we have side-by-side now
-        # This was the original big circular logo
-        
-        # Arsenal logo and text side by side
-        arsenal_info_frame = tk.Frame(arsenal_frame, bg='black')
-        arsenal_info_frame.pack()
-        
-        # Arsenal logo (real PNG or fallback circle)
-        if self.arsenal_logo_img:
-            # Use real PNG logo
-            arsenal_logo_label = tk.Label(arsenal_info_frame, image=self.arsenal_logo_img, bg='black')
-            arsenal_logo_label.pack(side='left', padx=5)
-        else:
-            # Fallback to circular logo if PNG not found
-            arsenal_logo_small = tk.Canvas(arsenal_info_frame, width=75, height=75, bg='black', highlightthickness=0)
-            arsenal_logo_small.create_oval(5, 5, 70, 70, outline='white', width=2, fill='#DC143C')
-            arsenal_logo_small.create_text(25, 25, text="ARS", fill='white', font=('Arial', 9, 'bold'))
-            arsenal_logo_small.pack(side='left', padx=5)
-        
-        # Arsenal text
-        arsenal_text_frame = tk.Frame(arsenal_info_frame, bg='black')
-        arsenal_text_frame.pack(side='left', padx=15)
-
-        arsenal_name_lbl = tk.Label(arsenal_text_frame, text="Arsenal",
-                                    font=('Arial', 22, 'bold'), fg='white', bg='black', anchor='w')
-        arsenal_name_lbl.pack(anchor='w')
-
-        arsenal_loc_lbl = tk.Label(arsenal_text_frame, text="Home",
-                                font=('Arial', 10, 'bold'),  # half of 14
-                                fg='white', bg='black', anchor='w')
-        arsenal_loc_lbl.pack(anchor='w', pady=(20, 0))  # +20px gap
-        
-        # Draw section
-        draw_frame = tk.Frame(pred_frame, bg='black')
-        draw_frame.grid(row=0, column=1, padx=20)
-        
-        # Draw percentage
-        draw_perc_label = tk.Label(draw_frame, text=f"{self.draw.get()}%", 
-                                  font=('Verdana Bold', 35, 'bold'), 
-                                  fg='white', bg='black')
-        draw_perc_label.pack(pady=(0, 10))
-        
-        # Draw text
-        draw_spacer = tk.Canvas(draw_frame, width=68, height=68, bg='black',
-                        highlightthickness=0)
-        draw_spacer.pack(pady=(0, 0))
-
-        draw_label = tk.Label(draw_frame, text="Draw",
-                            font=('Arial', 16, 'bold'), fg='white', bg='black')
-        draw_label.pack(pady=(0, 0))
-        
-        # Man Utd section
-        manutd_frame = tk.Frame(pred_frame, bg='black')
-        manutd_frame.grid(row=0, column=2, padx=20)
-        
-        # Man Utd percentage
-        manutd_perc_label = tk.Label(manutd_frame, text=f"{self.manutd_win.get()}%", 
-                                    font=('Verdana Bold', 35, 'bold'), 
-                                    fg='white', bg='black')
-        manutd_perc_label.pack(pady=(0, 10))
-        
-        # Man Utd logo placeholder (circular) - removed this since we have side-by-side now
-        # This was the original big circular logo
-        
-        # Man Utd logo and text side by side
-        manutd_info_frame = tk.Frame(manutd_frame, bg='black')
-        manutd_info_frame.pack()
-        
-        # Man Utd logo (real PNG or fallback circle)
-        if self.manutd_logo_img:
-            # Use real PNG logo
-            manutd_logo_label = tk.Label(manutd_info_frame, image=self.manutd_logo_img, bg='black')
-            manutd_logo_label.pack(side='left', padx=5)
-        else:
-            # Fallback to circular logo if PNG not found
-            manutd_logo_small = tk.Canvas(manutd_info_frame, width=75, height=75, bg='black', highlightthickness=0)
-            manutd_logo_small.create_oval(5, 5, 70, 70, outline='white', width=2, fill='#DA020E')
-            manutd_logo_small.create_text(25, 25, text="MAN U", fill='white', font=('Arial', 8, 'bold'))
-            manutd_logo_small.pack(side='left', padx=5)
-        
-        # Man Utd text
-        manutd_text_frame = tk.Frame(manutd_info_frame, bg='black')
-        manutd_text_frame.pack(side='left', padx=15)
-
-        manutd_name_lbl = tk.Label(manutd_text_frame, text="Manchester United",
-                                font=('Arial', 22, 'bold'), fg='white', bg='black', anchor='w')
-        manutd_name_lbl.pack(anchor='w')
-
-        manutd_loc_lbl = tk.Label(manutd_text_frame, text="Away",
-                                font=('Arial', 10, 'bold'),
-                                fg='white', bg='black', anchor='w')
-        manutd_loc_lbl.pack(anchor='w', pady=(20, 0))
-        
-        # Matchweek label
+
+        # Matchweek title
         mw_row = tk.Frame(main_frame, bg='black')
-        mw_row.pack(pady=(40, 20))
+        mw_row.pack(pady=(0, 10))
 
         if self.premier_logo_img:
             tk.Label(mw_row, image=self.premier_logo_img, bg='black').pack(side='left', padx=(0, 10))
 
-        tk.Label(mw_row, text="Matchweek 1",
-                font=('Arial', 20, 'bold'),
-                fg='white', bg='black').pack(side='left')
-        
-        # Control panel - only export button
+        tk.Label(mw_row, textvariable=self.matchweek_text,
+                 font=('Arial', 20, 'bold'),
+                 fg='white', bg='black').pack(side='left')
+
+        # Column headings
+        header = tk.Frame(main_frame, bg='black')
+        header.pack(fill='x')
+        self.configure_row_grid(header)
+        for column, text in ((2, "Home %"), (3, "Draw %"), (4, "Away %")):
+            tk.Label(header, text=text, font=('Arial', 10, 'bold'),
+                     fg='gray', bg='black').grid(row=0, column=column)
+
+        # Scrollable fixture list: a frame inside a canvas
+        list_frame = tk.Frame(main_frame, bg='black')
+        list_frame.pack(fill='both', expand=True, pady=(5, 0))
+        self.fixture_canvas = tk.Canvas(list_frame, bg='black', highlightthickness=0)
+        scrollbar = ttk.Scrollbar(list_frame, orient='vertical', command=self.on_scroll)
+        self.fixture_canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side='right', fill='y')
+        self.fixture_canvas.pack(side='left', fill='both', expand=True)
+
+        self.rows_frame = tk.Frame(self.fixture_canvas, bg='black')
+        rows_window = self.fixture_canvas.create_window((0, 0), window=self.rows_frame, anchor='nw')
+        self.rows_frame.bind('<Configure>', lambda e: self.on_list_changed())
+        self.fixture_canvas.bind('<Configure>', lambda e: (
+            self.fixture_canvas.itemconfigure(rows_window, width=e.width), self.load_visible_logos()))
+        self.fixture_canvas.bind_all('<MouseWheel>', self.on_mousewheel)
+
+        # Control panel - run / cancel the pipeline, refresh predictions, export
         control_frame = tk.Frame(main_frame, bg='black')
-        control_frame.pack(fill='x', pady=20)
-        
-        # Store references for updating
-        self.arsenal_perc_label = arsenal_perc_label
-        self.draw_perc_label = draw_perc_label
-        self.manutd_perc_label = manutd_perc_label
-    
-    def load_step5_predictions(self):
-        """Load predictions from step5 on startup"""
-        try:
-            predictions = self.load_predictions_from_pipeline()
-            self.arsenal_win.set(str(predictions['arsenal']))
-            self.draw.set(str(predictions['draw']))
-            self.manutd_win.set(str(predictions['manutd']))
-        except:
-            # Fallback values if step5 can't be loaded
-            self.arsenal_win.set("45")
-            self.draw.set("25")
-            self.manutd_win.set("30")
-        
-    def update_predictions(self):
-        """Update the prediction display with new values"""
-        try:
-            # Validate that values are numbers and sum to 100 (optional)
-            arsenal_val = float(self.arsenal_win.get())
-            draw_val = float(self.draw.get())
-            manutd_val = float(self.manutd_win.get())
-            
-            # Update labels
-            self.arsenal_perc_label.config(text=f"{int(arsenal_val)}%")
-            self.draw_perc_label.config(text=f"{int(draw_val)}%")
-            self.manutd_perc_label.config(text=f"{int(manutd_val)}%")
-            
-            messagebox.showinfo("Success", "Predictions updated successfully!")
-            
-        except ValueError:
-            messagebox.showerror("Error", "Please enter valid numbers for all predictions")
-    
-    def fetch_ml_predictions(self):
-        """🔥 THIS IS WHERE PREDICTIONS ARE FETCHED FROM YOUR ML MODEL 🔥"""
+        control_frame.pack(fill='x', pady=(15, 0))
+
+        buttons_frame = tk.Frame(control_frame, bg='black')
+        buttons_frame.pack()
+        self.run_button = tk.Button(buttons_frame, text="Run Pipeline", command=self.run_full_pipeline,
+                                    font=('Arial', 11, 'bold'), width=14)
+        self.run_button.pack(side='left', padx=5)
+        self.cancel_button = tk.Button(buttons_frame, text="Cancel", command=self.cancel_pipeline,
+                                       font=('Arial', 11, 'bold'), width=10, state='disabled')
+        self.cancel_button.pack(side='left', padx=5)
+        self.refresh_button = tk.Button(buttons_frame, text="Refresh", command=self.refresh_predictions,
+                                        font=('Arial', 11, 'bold'), width=10)
+        self.refresh_button.pack(side='left', padx=5)
+        tk.Button(buttons_frame, text="Export", command=self.export_as_image,
+                  font=('Arial', 11, 'bold'), width=10).pack(side='left', padx=5)
+
+        tk.Label(control_frame, textvariable=self.status_text, font=('Arial', 10),
+                 fg='white', bg='black', justify='center').pack(pady=(10, 0))
+
+    def configure_row_grid(self, frame):
+        # logo | home team | H | D | A | away team | logo
+        for column, weight in enumerate((0, 3, 1, 1, 1, 3, 0)):
+            frame.grid_columnconfigure(column, weight=weight, uniform=f"col{column}" if weight else None)
+
+    # ------------------------
+    # Fixture rows
+    # ------------------------
+    def show_fixtures(self, fixtures):
+        """Rebuild the fixture list (logos are attached later, as rows scroll into view)"""
+        self.fixtures = fixtures
+        for row in self.fixture_rows:
+            row['frame'].destroy()
+        self.fixture_rows = []
+
+        matchweeks = sorted({f['matchweek'] for f in fixtures if f['matchweek'] is not None})
+        if len(matchweeks) == 1:
+            self.matchweek_text.set(f"Matchweek {matchweeks[0]}")
+        elif matchweeks:
+            self.matchweek_text.set(f"Matchweeks {matchweeks[0]}-{matchweeks[-1]}")
+        else:
+            self.matchweek_text.set("Fixtures")
+
+        for fixture in fixtures:
+            self.fixture_rows.append(self.create_fixture_row(fixture))
+        self.on_list_changed()
+
+    def create_fixture_row(self, fixture):
+        frame = tk.Frame(self.rows_frame, bg='black', height=ROW_HEIGHT)
+        frame.pack(fill='x')
+        frame.grid_propagate(False)
+        self.configure_row_grid(frame)
+        frame.grid_rowconfigure(0, weight=1)
+
+        home_logo = self.create_badge(frame, fixture['home'])
+        home_logo.grid(row=0, column=0, padx=5)
+        tk.Label(frame, text=fixture['home'], font=('Arial', 14, 'bold'),
+                 fg='white', bg='black', anchor='w').grid(row=0, column=1, sticky='ew', padx=10)
+
+        # Highlight the most likely outcome
+        probs = (fixture['home_pct'], fixture['draw_pct'], fixture['away_pct'])
+        best = probs.index(max(probs))
+        for i, pct in enumerate(probs):
+            tk.Label(frame, text=f"{pct}%", font=('Verdana', 16, 'bold'),
+                     fg='white' if i == best else 'gray', bg='black').grid(row=0, column=2 + i)
+
+        tk.Label(frame, text=fixture['away'], font=('Arial', 14, 'bold'),
+                 fg='white', bg='black', anchor='e').grid(row=0, column=5, sticky='ew', padx=10)
+        away_logo = self.create_badge(frame, fixture['away'])
+        away_logo.grid(row=0, column=6, padx=5)
+
+        return {'frame': frame, 'fixture': fixture, 'logos': (home_logo, away_logo), 'has_logos': False}
+
+    def create_badge(self, parent, team):
+        """Fallback circular badge with the team's initials (replaced by the PNG logo when visible)"""
+        size = LOGO_SIZE[0] + 4
+        badge = tk.Canvas(parent, width=size, height=size, bg='black', highlightthickness=0)
+        badge.create_oval(2, 2, size - 2, size - 2, outline='white', width=2,
+                          fill=TEAM_COLOURS.get(team, '#444444'))
+        initials = "".join(word[0] for word in team.replace("'", " ").split())[:3].upper()
+        badge.create_text(size // 2, size // 2, text=initials, fill='white', font=('Arial', 9, 'bold'))
+        return badge
+
+    def load_visible_logos(self):
+        """Attach logo images to the rows currently on screen (LRU-cached, loaded on first view)"""
+        if not self.fixture_rows:
+            return
+        top = self.fixture_canvas.canvasy(0)
+        bottom = top + self.fixture_canvas.winfo_height()
+        for row in self.fixture_rows:
+            if row['has_logos']:
+                continue
+            y = row['frame'].winfo_y()
+            if y + ROW_HEIGHT < top or y > bottom:
+                continue
+            for badge, team in zip(row['logos'], (row['fixture']['home'], row['fixture']['away'])):
+                image = self.team_logos.get(team)
+                if image:
+                    badge.delete('all')
+                    badge.create_image(badge.winfo_reqwidth() // 2, badge.winfo_reqheight() // 2, image=image)
+                    # Keep a reference on the widget, so an LRU eviction never blanks a visible logo
+                    badge.image = image
+            row['has_logos'] = True
+
+    def on_list_changed(self):
+        self.fixture_canvas.configure(scrollregion=self.fixture_canvas.bbox('all'))
+        self.root.after_idle(self.load_visible_logos)
+
+    def on_scroll(self, *args):
+        self.fixture_canvas.yview(*args)
+        self.load_visible_logos()
+
+    def on_mousewheel(self, event):
+        self.fixture_canvas.yview_scroll(int(-event.delta / 120), 'units')
+        self.load_visible_logos()
+
+    # ------------------------
+    # Predictions
+    # ------------------------
+    def load_saved_predictions(self):
+        """Fixtures from the last saved batch predictions (empty if there are none yet)"""
         try:
-            # 🎯 MAIN PREDICTION FETCHING HAPPENS HERE
-            predictions = self.load_predictions_from_pipeline()
-            
-            # Update the dashboard with ML model results
-            self.arsenal_win.set(str(predictions['arsenal']))
-            self.draw.set(str(predictions['draw']))
-            self.manutd_win.set(str(predictions['manutd']))
-            
-            self.update_predictions()
-            
+            if not os.path.exists(PREDICTIONS_FILE):
+                return []
+            return self.fixtures_from_predictions(pd.read_csv(PREDICTIONS_FILE))
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to fetch ML predictions: {str(e)}")
-            # Fallback to demo data
-            predictions = self.simulate_ml_model()
-            self.arsenal_win.set(str(predictions['arsenal']))
-            self.draw.set(str(predictions['draw']))
-            self.manutd_win.set(str(predictions['manutd']))
-            self.update_predictions()
-    
-    def load_predictions_from_pipeline(self):
-        """🔥 INTEGRATED WITH YOUR STEP5 FILE 🔥"""
-        
+            print(f"Failed to load saved predictions: {e}")
+            return []
+
+    def fixtures_from_predictions(self, predictions_df):
+        """Rows of a batch_score output as dashboard fixtures (probabilities in whole percent)"""
+        fixtures = []
+        for row in predictions_df.to_dict('records'):
+            matchweek = row.get('Matchweek')
+            fixtures.append({
+                'matchweek': int(matchweek) if pd.notna(matchweek) else None,
+                'date': row['Date'],
+                'home': row['HomeTeam'],
+                'away': row['AwayTeam'],
+                'home_pct': round(row['prob_Home'] * 100),
+                'draw_pct': round(row['prob_Draw'] * 100),
+                'away_pct': round(row['prob_Away'] * 100),
+            })
+        return fixtures
+
+    def refresh_predictions(self):
+        """🔥 Re-score the matchweek fixtures with the latest registered model, in the background"""
+        # Why: queued rather than dropped - a pipeline that registers a new model mid-refresh still gets its re-score
+        if self.refresh_events is not None or (self.pipeline_job and self.pipeline_job.running):
+            self.refresh_pending = True
+            return
+        self.refresh_pending = False
+        self.refresh_events = queue.Queue()
+        # Why: a pipeline run would rewrite team_state.json and the model registry while the worker reads them
+        self.refresh_button.config(state='disabled')
+        self.run_button.config(state='disabled')
+        self.show_progress_message("Refreshing predictions...")
+        threading.Thread(target=self.score_fixtures_worker, args=(self.refresh_events,), daemon=True).start()
+        self.root.after(PIPELINE_POLL_MS, self.poll_refresh)
+
+    def score_fixtures_worker(self, events):
+        # Runs on a worker thread: no Tk calls here, results go through the queue
         try:
-            # Import your step5 file
-            import step5_finalOne
-            
-            # Get probabilities from your step5 file
-            # Your step5 has: probabilities = [Away, Draw, Home]
-            probabilities = step5_finalOne.probabilities
-            
-            return {
-                'arsenal': round(probabilities[2]),  # Home Win (Arsenal is home)
-                'draw': round(probabilities[1]),     # Draw
-                'manutd': round(probabilities[0])    # Away Win (Man Utd is away)
-            }
-            
+            import batch_score
+            batch_score.score_file(FIXTURES_FILE, PREDICTIONS_FILE)
+            events.put(('done', self.fixtures_from_predictions(pd.read_csv(PREDICTIONS_FILE))))
         except Exception as e:
-            print(f"Failed to load from step5: {e}")
-            
-            # Fallback: Try to run step5 directly and capture results
-            try:
-                import subprocess
-                import sys
-                
-                # Run step5 to make sure probabilities are updated
-                subprocess.run([sys.executable, 'step5_finalOne.py'], check=True)
-                
-                # Try importing again
-                import importlib
-                import step5_finalOne
-                importlib.reload(step5_finalOne)  # Reload to get fresh data
-                
-                probabilities = step5_finalOne.probabilities
-                
-                return {
-                    'arsenal': round(probabilities[2]),  # Home Win
-                    'draw': round(probabilities[1]),     # Draw  
-                    'manutd': round(probabilities[0])    # Away Win
-                }
-                
-            except Exception as e2:
-                print(f"Fallback also failed: {e2}")
-                # Use simulation as last resort
-                return self.simulate_ml_model()
-    
-    def simulate_ml_model(self):
-        """Simulate your ML model - fallback method"""
-        import random
-        
-        # Generate random probabilities that sum to 100
-        values = [random.random() for _ in range(3)]
-        total = sum(values)
-        probabilities = [round((v/total) * 100) for v in values]
-        
-        # Ensure they sum to 100
-        diff = 100 - sum(probabilities)
-        probabilities[0] += diff
-        
-        return {
-            'arsenal': probabilities[0],
-            'draw': probabilities[1], 
-            'manutd': probabilities[2]
-        }
-    
-    def run_full_pipeline(self):
-        """🔥 NEW FUNCTION: Run your complete pipeline steps 1-5 then update dashboard"""
+            events.put(('error', e))
+
+    def poll_refresh(self):
+        """Runs on the Tk thread: show refreshed predictions once the worker has finished"""
         try:
-            import subprocess
-            import sys
-            
-            # Show progress
-            self.show_progress_message("Running ML Pipeline Steps 1-5...")
-            
-            # Run your steps in sequence (adjust filenames if needed)
-            steps = ['step1.py', 'step2.py', 'step3.py', 'step4.py', 'step5_finalOne.py']
-            
-            for i, step in enumerate(steps, 1):
-                self.show_progress_message(f"Running {step}... ({i}/5)")
-                try:
-                    subprocess.run([sys.executable, step], check=True)
-                except FileNotFoundError:
-                    messagebox.showwarning("Warning", f"{step} not found. Skipping...")
-                except subprocess.CalledProcessError as e:
-                    messagebox.showerror("Error", f"Failed to run {step}: {e}")
-                    return
-            
-            # After pipeline completes, fetch predictions
-            self.show_progress_message("Pipeline complete! Fetching predictions...")
-            self.fetch_ml_predictions()
-            
-            messagebox.showinfo("Success", "Full ML Pipeline executed successfully!")
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Pipeline execution failed: {str(e)}")
-    
+            kind, payload = self.refresh_events.get_nowait()
+        except queue.Empty:
+            self.root.after(PIPELINE_POLL_MS, self.poll_refresh)
+            return
+
+        self.refresh_events = None
+        self.refresh_button.config(state='normal')
+        self.run_button.config(state='normal')
+        if kind == 'done':
+            self.show_fixtures(payload)
+            self.show_progress_message(f"Predictions updated for {len(payload)} fixtures")
+        else:
+            self.show_progress_message(f"Could not refresh predictions: {payload}")
+        if self.refresh_pending:
+            self.refresh_predictions()
+
+    # ------------------------
+    # Pipeline
+    # ------------------------
+    def run_full_pipeline(self):
+        """🔥 Run your complete pipeline steps 1-5 in the background, then update the dashboard"""
+        import pipeline
+
+        if self.pipeline_job and self.pipeline_job.running:
+            return
+
+        # Steps run on a worker thread; unchanged steps are skipped (see pipeline.py / pipeline_cache.py)
+        # Why: the Tk window must keep redrawing while models train, so this method returns immediately
+        self.step_timings = []
+        self.pipeline_job = pipeline.PipelineJob().start()
+        self.run_button.config(state='disabled')
+        self.refresh_button.config(state='disabled')  # see refresh_predictions
+        self.cancel_button.config(state='normal')
+        self.show_progress_message("Running ML Pipeline Steps 1-5...")
+        self.root.after(PIPELINE_POLL_MS, self.poll_pipeline)
+
+    def cancel_pipeline(self):
+        """Stop the background run before its next step (the current step finishes first)"""
+        if self.pipeline_job and self.pipeline_job.running:
+            self.pipeline_job.cancel()
+            self.cancel_button.config(state='disabled')
+            self.show_progress_message("Cancelling after the current step...")
+
+    def poll_pipeline(self):
+        """Runs on the Tk thread: apply events posted by the pipeline worker"""
+        for kind, payload in self.pipeline_job.poll():
+            if kind == 'progress':
+                self.show_progress_message(payload)
+            elif kind == 'step':
+                self.step_timings.append(payload)
+                self.show_progress_message(self.status_text.get().split("\n")[0])
+            elif kind == 'done':
+                # A new model may have been registered: re-score the matchweek with it (see pipeline_finished)
+                self.refresh_pending = True
+                self.pipeline_finished()
+                self.show_pipeline_result(payload)
+                return
+            elif kind == 'cancelled':
+                self.pipeline_finished()
+                messagebox.showinfo("Cancelled", f"Pipeline run cancelled.\n\n{payload}")
+                return
+            elif kind == 'error':
+                self.pipeline_finished()
+                if isinstance(payload, FileNotFoundError):
+                    messagebox.showerror("Error", f"Missing pipeline input: {payload}")
+                else:
+                    messagebox.showerror("Error", f"Pipeline execution failed: {str(payload)}")
+                return
+        self.root.after(PIPELINE_POLL_MS, self.poll_pipeline)
+
+    def pipeline_finished(self):
+        self.run_button.config(state='normal')
+        self.cancel_button.config(state='disabled')
+        self.refresh_button.config(state='normal')
+        self.root.title("Football Prediction Dashboard")
+        if self.refresh_pending:
+            self.refresh_predictions()
+
+    def show_pipeline_result(self, result):
+        ran = [name for name, status, _ in result.timings if status == "ran"]
+        skipped = [name for name, status, _ in result.timings if status == "skipped"]
+        summary = f"Ran: {', '.join(ran) or 'none'}\nSkipped (unchanged): {', '.join(skipped) or 'none'}"
+        messagebox.showinfo("Success", f"Full ML Pipeline executed successfully!\n\n{summary}")
+
     def show_progress_message(self, message):
-        """Show progress message in the title"""
-        original_title = self.root.title()
+        """Show progress message in the title and status line, with the timings of finished steps"""
         self.root.title(f"Football Dashboard - {message}")
-        self.root.update()
-        # Reset title after 2 seconds
-        self.root.after(2000, lambda: self.root.title("Football Prediction Dashboard"))
-    
+        timings = "   ".join(f"{name} {status} {seconds:.1f}s" for name, status, seconds in self.step_timings)
+        self.status_text.set(f"{message}\n{timings}" if timings else message)
+
+    # ------------------------
+    # Export
+    # ------------------------
     def export_as_image(self):
-        """Export the prediction card as an image"""
+        """Export the matchweek predictions as an image"""
         try:
             # Create image
-            img_width, img_height = 800, 400
+            row_height = 50
+            img_width = 800
+            img_height = 160 + row_height * max(len(self.fixtures), 1)
             img = Image.new('RGB', (img_width, img_height), color='black')
             draw = ImageDraw.Draw(img)
-            
+
             # Try to load fonts
             try:
                 title_font = ImageFont.truetype("arial.ttf", 32)
-                large_font = ImageFont.truetype("arial.ttf", 24)
                 medium_font = ImageFont.truetype("arial.ttf", 18)
                 small_font = ImageFont.truetype("arial.ttf", 14)
             except:
                 # Fallback to default font
                 title_font = ImageFont.load_default()
-                large_font = ImageFont.load_default()
                 medium_font = ImageFont.load_default()
                 small_font = ImageFont.load_default()
-            
+
             # Title
-            title_text = "Predictions (Win%)"
+            title_text = f"{self.matchweek_text.get()} - Predictions (Win%)"
             title_bbox = draw.textbbox((0, 0), title_text, font=title_font)
             title_width = title_bbox[2] - title_bbox[0]
-            draw.text(((img_width - title_width) // 2, 30), title_text, 
-                     fill='white', font=title_font)
-            
-            # Arsenal section
-            arsenal_x = 100
-            y_center = 200
-            
-            # Arsenal percentage
-            arsenal_text = f"({self.arsenal_win.get()}%)"
-            draw.text((arsenal_x, y_center - 60), arsenal_text, fill='white', font=large_font)
-            
-            # Arsenal circle
-            circle_size = 60
-            draw.ellipse([arsenal_x, y_center - 30, arsenal_x + circle_size, y_center + 30], 
-                        outline='white', width=3, fill='#DC143C')
-            
-            # Arsenal logo text
-            ars_bbox = draw.textbbox((0, 0), "ARS", font=medium_font)
-            ars_width = ars_bbox[2] - ars_bbox[0]
-            draw.text((arsenal_x + circle_size//2 - ars_width//2, y_center - 8), 
-                     "ARS", fill='white', font=medium_font)
-            
-            # Arsenal label
-            draw.text((arsenal_x, y_center + 50), "Arsenal\nHome", 
-                     fill='white', font=small_font)
-            
-            # Draw section
-            draw_x = img_width // 2 - 50
-            draw_text = f"({self.draw.get()}%)"
-            draw.text((draw_x, y_center - 60), draw_text, fill='white', font=large_font)
-            draw.text((draw_x + 20, y_center + 20), "Draw", fill='white', font=small_font)
-            
-            # Man Utd section
-            manutd_x = img_width - 200
-            
-            # Man Utd percentage
-            manutd_text = f"({self.manutd_win.get()}%)"
-            draw.text((manutd_x, y_center - 60), manutd_text, fill='white', font=large_font)
-            
-            # Man Utd circle
-            draw.ellipse([manutd_x, y_center - 30, manutd_x + circle_size, y_center + 30], 
-                        outline='white', width=3, fill='#DA020E')
-            
-            # Man Utd logo text
-            manu_bbox = draw.textbbox((0, 0), "MAN U", font=small_font)
-            manu_width = manu_bbox[2] - manu_bbox[0]
-            draw.text((manutd_x + circle_size//2 - manu_width//2, y_center - 6), 
-                     "MAN U", fill='white', font=small_font)
-            
-            # Man Utd label
-            draw.text((manutd_x, y_center + 50), "Man Utd\nAway", 
-                     fill='white', font=small_font)
-            
-            # Matchweek
-            matchweek_text = "Matchweek 1"
-            mw_bbox = draw.textbbox((0, 0), matchweek_text, font=medium_font)
-            mw_width = mw_bbox[2] - mw_bbox[0]
-            draw.text(((img_width - mw_width) // 2, img_height - 60), matchweek_text, 
-                     fill='white', font=medium_font)
-            
+            draw.text(((img_width - title_width) // 2, 30), title_text,
+                      fill='white', font=title_font)
+
+            # Column headings
+            columns = {'home': 40, 'home_pct': 330, 'draw_pct': 410, 'away_pct': 490, 'away': 580}
+            y = 100
+            for key, text in (('home_pct', "Home"), ('draw_pct', "Draw"), ('away_pct', "Away")):
+                draw.text((columns[key], y), text, fill='gray', font=small_font)
+
+            # One row per fixture
+            for fixture in self.fixtures:
+                y += row_height
+                draw.text((columns['home'], y), fixture['home'], fill='white', font=medium_font)
+                for key in ('home_pct', 'draw_pct', 'away_pct'):
+                    draw.text((columns[key], y), f"{fixture[key]}%", fill='white', font=medium_font)
+                draw.text((columns['away'], y), fixture['away'], fill='white', font=medium_font)
+
             # Save image
             file_path = filedialog.asksaveasfilename(
                 defaultextension=".png",
                 filetypes=[("PNG files", "*.png"), ("JPEG files", "*.jpg"), ("All files", "*.*")]
             )
-            
+
             if file_path:
                 img.save(file_path)
                 messagebox.showinfo("Success", f"Image saved to {file_path}")
-                
+
         except Exception as e:
             messagebox.showerror("Error", f"Failed to export image: {str(e)}")
 
@@ -493,4 +476,4 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
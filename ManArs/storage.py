@@ -0,0 +1,343 @@
+"""
+Typed table storage shared by Steps 1 - 4
+-----------------------------------------
+Purpose:
+    Pass match and feature tables between steps in a typed columnar format
+    (Parquet, or Feather) instead of CSV, so each step:
+        - skips CSV parsing and dtype inference
+        - parses dates exactly once (when the season files are ingested)
+        - can load only the columns it needs
+
+Compact dtypes:
+    Tables are held in memory with the smallest dtypes that fit the schema:
+        - team names as categoricals sharing one team dictionary (HomeTeam / AwayTeam codes
+          are the same team ids), other text (Div, FTR, HTR, Referee, ...) as categoricals
+        - goals and cards as int8, shots, fouls and corners as int16
+        - odds and every other numeric column as float32
+    read_table / write_table apply this to every table (compact()); a multi-league match
+    history takes several times less memory and groupby work runs on integer codes.
+
+Appending:
+    A Parquet / Feather file cannot grow in place, so append_table writes the new rows to a
+    part file next to the table (features.part-00001.parquet, ...) instead of rewriting it.
+    Readers combine the table and its parts (table_files()); write_table - a full rebuild -
+    replaces the table and removes its parts.
+
+Optional dependency:
+    Parquet/Feather need pyarrow. Without it, tables fall back to CSV, read with the
+    explicit schema below so results are the same (just slower).
+"""
+
+import glob
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+DEFAULT_FORMAT = 'parquet' if HAVE_PYARROW else 'csv'
+EXTENSIONS = {'parquet': '.parquet', 'feather': '.feather', 'csv': '.csv'}
+
+# -------------------------
+# Schema
+# -------------------------
+# Why: Anything not listed here is a numeric stat or bookmaker price and is stored as float64
+#      (float32 once compacted - see compact() below).
+DATE_COLUMNS = ['Date']
+TEXT_COLUMNS = ['Div', 'Time', 'HomeTeam', 'AwayTeam', 'FTR', 'HTR', 'Referee', 'match_winner']
+TEAM_COLUMNS = ['HomeTeam', 'AwayTeam']
+INT_COLUMNS = ['FTHG', 'FTAG', 'HTHG', 'HTAG', 'HS', 'AS', 'HST', 'AST',
+               'HF', 'AF', 'HC', 'AC', 'HY', 'AY', 'HR', 'AR', 'Matchweek']
+
+# Compact dtypes: the smallest integer type for each count (goals and cards fit int8,
+# shots / fouls / corners int16) and float32 for every other number
+COMPACT_INT_DTYPES = {
+    'FTHG': 'int8', 'FTAG': 'int8', 'HTHG': 'int8', 'HTAG': 'int8',
+    'HY': 'int8', 'AY': 'int8', 'HR': 'int8', 'AR': 'int8',
+    'HS': 'int16', 'AS': 'int16', 'HST': 'int16', 'AST': 'int16',
+    'HF': 'int16', 'AF': 'int16', 'HC': 'int16', 'AC': 'int16', 'Matchweek': 'int16',
+}
+COMPACT_FLOAT_DTYPE = 'float32'
+
+# Why: football-data uses dd/mm/yyyy (dd/mm/yy in older files); ISO dates come from older CSV outputs
+MATCH_DATE_FORMATS = ['%d/%m/%Y', '%d/%m/%y', 'ISO8601']
+
+
+def column_dtype(col):
+    if col in TEXT_COLUMNS:
+        return 'string'
+    if col in INT_COLUMNS:
+        return 'int64'
+    return 'float64'
+
+
+def parse_match_dates(values):
+    """Parse match dates in one pass, trying each known format only on rows still unparsed."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    dates = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    for fmt in MATCH_DATE_FORMATS:
+        missing = dates.isna() & values.notna()
+        if not missing.any():
+            break
+        dates[missing] = pd.to_datetime(values[missing], format=fmt, errors='coerce')
+    return dates
+
+
+def apply_schema(df):
+    """Cast every column to its schema dtype (integer columns with gaps become float64)."""
+    dtypes = {}
+    for col in df.columns:
+        if col in DATE_COLUMNS:
+            continue
+        dtype = column_dtype(col)
+        if dtype == 'int64' and df[col].isna().any():
+            dtype = 'float64'
+        dtypes[col] = dtype
+    df = df.astype(dtypes)
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_match_dates(df[col])
+    return df
+
+
+# -------------------------
+# Compact in-memory representation
+# -------------------------
+
+def team_dtype(df):
+    """One categorical dtype for every team column of `df` (sorted union of the names)."""
+    teams = set()
+    for col in TEAM_COLUMNS:
+        if col in df.columns:
+            values = df[col]
+            teams.update(values.cat.categories if isinstance(values.dtype, pd.CategoricalDtype)
+                         else values.dropna().unique())
+    return pd.CategoricalDtype(sorted(teams))
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+def compact(df, label=None):
+    """
+    `df` with compact dtypes: text columns as categoricals (team columns sharing one
+    dictionary), schema integers as int8 / int16 and float64 columns as float32.
+    Columns already compact are left as they are. If `label` is given, print the
+    memory footprint before and after.
+    """
+    before = memory_mb(df) if label else None
+    dtypes = {}
+    teams = team_dtype(df) if any(col in df.columns for col in TEAM_COLUMNS) else None
+    for col, dtype in df.dtypes.items():
+        if col in TEAM_COLUMNS:
+            target = teams
+        elif col in TEXT_COLUMNS:
+            target = dtype if isinstance(dtype, pd.CategoricalDtype) else 'category'
+        elif col in INT_COLUMNS and not df[col].isna().any():
+            target = COMPACT_INT_DTYPES[col]
+        elif pd.api.types.is_float_dtype(dtype):
+            target = COMPACT_FLOAT_DTYPE
+        else:
+            continue
+        if dtype != target:
+            dtypes[col] = target
+    if dtypes:
+        df = df.astype(dtypes)
+
+    if label:
+        after = memory_mb(df)
+        print(f"🗜️ {label}: {before:,.1f} MB -> {after:,.1f} MB in memory "
+              f"({before / after if after else 1:.1f}x smaller)")
+    return df
+
+
+# -------------------------
+# Read / write
+# -------------------------
+
+def table_path(data_dir, name, fmt=DEFAULT_FORMAT):
+    """Path of a named table (e.g. 'features') in `data_dir` for the given format."""
+    return os.path.join(data_dir, name + EXTENSIONS[fmt])
+
+
+def _format_of(path):
+    ext = os.path.splitext(path)[1].lower()
+    for fmt, fmt_ext in EXTENSIONS.items():
+        if ext == fmt_ext:
+            return fmt
+    raise ValueError(f"Unsupported table format: {path}")
+
+
+def table_files(path):
+    """The files holding a stored table: `path` followed by the part files appended to it, in order."""
+    stem, ext = os.path.splitext(path)
+    return [path] + sorted(glob.glob(f"{glob.escape(stem)}.part-*{ext}"))
+
+
+def _next_part_path(path):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.part-{len(table_files(path)):05d}{ext}"
+
+
+def write_table(df, path):
+    """Write a whole table, replacing `path` and any part files appended to it."""
+    for part in table_files(path)[1:]:
+        os.remove(part)
+    _write_file(df, path)
+
+
+def _write_file(df, path):
+    fmt = _format_of(path)
+    if fmt in ('parquet', 'feather'):
+        # Typed formats keep the compact dtypes (categoricals are stored dictionary-encoded)
+        df = compact(df)
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    elif fmt == 'feather':
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        df.to_csv(path, index=False, date_format='%d/%m/%Y')
+
+
+def table_columns(path):
+    """Column names of a stored table, without reading its data."""
+    fmt = _format_of(path)
+    if fmt in ('parquet', 'feather'):
+        import pyarrow.ipc as ipc
+        import pyarrow.parquet as pq
+        schema = pq.read_schema(path) if fmt == 'parquet' else ipc.open_file(path).schema
+        return list(schema.names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def numeric_column_names(columns):
+    """The schema's numeric columns among `columns` (everything except dates and text)."""
+    return [col for col in columns if col not in TEXT_COLUMNS and col not in DATE_COLUMNS]
+
+
+def numeric_columns(path):
+    """Numeric columns of a stored table."""
+    return numeric_column_names(table_columns(path))
+
+
+def read_table(path, columns=None):
+    """Read a stored table, optionally only `columns`, with compact schema dtypes applied."""
+    fmt = _format_of(path)
+    if fmt in ('parquet', 'feather'):
+        read = pd.read_parquet if fmt == 'parquet' else pd.read_feather
+        frames = [read(file, columns=columns) for file in table_files(path)]
+        return compact(frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True))
+
+    header = table_columns(path)
+    usecols = columns if columns is not None else header
+    dtypes = {col: column_dtype(col) for col in usecols if col not in DATE_COLUMNS}
+    # Why: integer columns can have gaps in older seasons; read them as float and let apply_schema decide
+    dtypes.update({col: 'float64' for col, dtype in dtypes.items() if dtype == 'int64'})
+    df = pd.read_csv(path, usecols=usecols, dtype=dtypes)
+    return compact(apply_schema(df)[usecols])
+
+
+def append_table(df, path):
+    """
+    Append rows to a stored table (columns are aligned to the stored table). CSV rows are
+    appended to the file; Parquet / Feather rows go to a new part file, so the rows already
+    stored are never read or rewritten.
+    """
+    if not os.path.exists(path):
+        write_table(df, path)
+        return
+    df = df.reindex(columns=table_columns(path))
+    if _format_of(path) == 'csv':
+        df.to_csv(path, mode='a', header=False, index=False, date_format='%d/%m/%Y')
+        return
+    _write_file(df, _next_part_path(path))
+
+
+# -------------------------
+# Streaming (chunked) read / write
+# -------------------------
+# Why: batch scoring reads and writes fixture lists of any size, so only one chunk is in memory at a time.
+#      Chunks keep text as strings - categoricals built per chunk would not share categories.
+
+def _as_strings(df):
+    categorical = [col for col, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    return df.astype({col: 'string' for col in categorical}) if categorical else df
+
+
+def iter_table(path, chunk_rows=50_000, columns=None):
+    """Yield a stored table as DataFrames of at most `chunk_rows` rows, with schema dtypes applied."""
+    fmt = _format_of(path)
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        for file in table_files(path):
+            for batch in pq.ParquetFile(file).iter_batches(batch_size=chunk_rows, columns=columns):
+                yield _as_strings(batch.to_pandas())
+        return
+    if fmt == 'feather':
+        import pyarrow.ipc as ipc
+        for file in table_files(path):
+            reader = ipc.open_file(file)
+            for i in range(reader.num_record_batches):
+                # Why: a record batch is as large as the DataFrame that was written, so it is sliced to chunk_rows
+                batch = reader.get_batch(i)
+                for start in range(0, batch.num_rows, chunk_rows):
+                    df = _as_strings(batch.slice(start, chunk_rows).to_pandas())
+                    yield df if columns is None else df[columns]
+        return
+
+    header = table_columns(path)
+    usecols = columns if columns is not None else header
+    dtypes = {col: column_dtype(col) for col in usecols if col not in DATE_COLUMNS}
+    dtypes.update({col: 'float64' for col, dtype in dtypes.items() if dtype == 'int64'})
+    for df in pd.read_csv(path, usecols=usecols, dtype=dtypes, chunksize=chunk_rows):
+        yield apply_schema(df)[usecols]
+
+
+class TableWriter:
+    """
+    Write a table chunk by chunk (parquet row groups, feather record batches or CSV appends).
+
+        with TableWriter(path) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fmt = _format_of(path)
+        self._writer = None
+        self._schema = None
+        self.rows = 0
+
+    def write(self, df):
+        if self.fmt == 'csv':
+            df.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0,
+                      index=False, date_format='%d/%m/%Y')
+        else:
+            import pyarrow as pa
+            table = pa.Table.from_pandas(df.reset_index(drop=True), schema=self._schema, preserve_index=False)
+            if self._writer is None:
+                import pyarrow.ipc as ipc
+                import pyarrow.parquet as pq
+                self._schema = table.schema
+                self._writer = (pq.ParquetWriter(self.path, self._schema) if self.fmt == 'parquet'
+                                else ipc.new_file(self.path, self._schema))
+            self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
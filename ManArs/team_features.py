@@ -0,0 +1,173 @@
+"""
+Team-perspective feature engines for Step 2
+-------------------------------------------
+Purpose:
+    Every match involves two teams, so per-team features (form, rest, ...)
+    are easiest to compute on a "long" table with one row per team per match.
+    The functions here build that table once and compute features with grouped
+    pandas operations instead of looping over matches with iterrows().
+
+Output:
+    The same *_last5 and days_rest_* columns that Step 2 has always produced, so the
+    rest of the pipeline does not need to change.
+"""
+
+import numpy as np
+import pandas as pd
+
+import profiling
+
+# Stats tracked for rolling form: output prefix -> (home column, away column)
+# Shots and shots on target come from the season files' HS/AS and HST/AST columns
+FORM_STATS = {
+    'points': ('home_points', 'away_points'),
+    'goals': ('FTHG', 'FTAG'),
+    'shots': ('HS', 'AS'),
+    'sot': ('HST', 'AST'),
+}
+
+POINTS_FOR_RESULT = {
+    # FTR -> (home points, away points)
+    'H': (3, 0),
+    'D': (1, 1),
+    'A': (0, 3),
+}
+
+
+def match_points(df):
+    """Return (home_points, away_points) arrays from the FTR column (unknown results score 0)."""
+    ftr = df['FTR']
+    # astype(float) first: a categorical FTR maps to a categorical, which cannot be filled with 0
+    home_points = ftr.map({k: v[0] for k, v in POINTS_FOR_RESULT.items()}).astype(float).fillna(0).to_numpy()
+    away_points = ftr.map({k: v[1] for k, v in POINTS_FOR_RESULT.items()}).astype(float).fillna(0).to_numpy()
+    return home_points, away_points
+
+
+def _stat_values(df, col, points):
+    # Why: 'points' is derived, everything else comes straight from the match table (0 if missing)
+    if col in points:
+        return points[col]
+    if col in df.columns:
+        return df[col].to_numpy()
+    return np.zeros(len(df))
+
+
+def team_long_view(df, stats=FORM_STATS):
+    """
+    Reshape matches into one row per (match, team).
+
+    Columns: match_idx, is_home, team, Date plus one column per stat in `stats`
+    (seen from that team's perspective). Rows are ordered by match position and
+    home before away, so a stable groupby keeps each team's matches in order.
+    """
+    n = len(df)
+    points = {}
+    if any('home_points' in cols or 'away_points' in cols for cols in stats.values()):
+        home_points, away_points = match_points(df)
+        points = {'home_points': home_points, 'away_points': away_points}
+
+    home, away = df['HomeTeam'], df['AwayTeam']
+    if isinstance(home.dtype, pd.CategoricalDtype) and home.dtype == away.dtype:
+        # Teams share one dictionary (storage.compact): stack the integer codes, group on them
+        team = pd.Categorical.from_codes(np.concatenate([home.cat.codes, away.cat.codes]), dtype=home.dtype)
+    else:
+        team = np.concatenate([home.to_numpy(), away.to_numpy()])
+
+    match_idx = np.arange(n)
+    long_df = pd.DataFrame({
+        'match_idx': np.concatenate([match_idx, match_idx]),
+        'is_home': np.concatenate([np.ones(n, dtype=bool), np.zeros(n, dtype=bool)]),
+        'team': team,
+        'Date': np.concatenate([df['Date'].to_numpy(), df['Date'].to_numpy()]),
+    })
+    for name, (home_col, away_col) in stats.items():
+        long_df[name] = np.concatenate([
+            _stat_values(df, home_col, points),
+            _stat_values(df, away_col, points),
+        ]).astype(float)
+
+    # Interleave so match i's home row comes before its away row
+    order = np.lexsort((~long_df['is_home'].to_numpy(), long_df['match_idx'].to_numpy()))
+    return long_df.iloc[order].reset_index(drop=True)
+
+
+@profiling.profiled
+def add_rolling_features(df, window=5):
+    """
+    Add rolling form features: the mean of each stat over a team's previous `window` matches.
+
+    The current match is excluded (shift by one) and the value is NaN until a team
+    has played `window` matches, matching the original loop in Step 2.
+    Columns are named home_<stat>_last<window> / away_<stat>_last<window>.
+    """
+    df = df.copy()
+    long_df = team_long_view(df)
+    stat_cols = list(FORM_STATS)
+
+    grouped = long_df.groupby('team', sort=False)[stat_cols]
+    rolled = (
+        grouped.shift(1)
+        .groupby(long_df['team'], sort=False)
+        .rolling(window, min_periods=window)
+        .mean()
+        .reset_index(level=0, drop=True)
+        .sort_index()
+    )
+
+    is_home = long_df['is_home'].to_numpy()
+    home_rows = rolled[is_home].set_axis(long_df.loc[is_home, 'match_idx'].to_numpy())
+    away_rows = rolled[~is_home].set_axis(long_df.loc[~is_home, 'match_idx'].to_numpy())
+
+    new_cols = {}
+    for stat in stat_cols:
+        new_cols[f'home_{stat}_last{window}'] = home_rows[stat].sort_index().to_numpy()
+        new_cols[f'away_{stat}_last{window}'] = away_rows[stat].sort_index().to_numpy()
+    return pd.concat([df, pd.DataFrame(new_cols, index=df.index)], axis=1)
+
+
+@profiling.profiled
+def add_rest_days(df, congestion_windows=()):
+    """
+    Add days_rest_home / days_rest_away (days since the team's previous match, NaN for its
+    first) and rest_days_diff.
+
+    Previous matches are taken in row order across every competition in `df`, so a
+    combined league + cup calendar counts all of them. For each number of days in
+    `congestion_windows` (e.g. (7, 14)) also add home_/away_matches_last<N>d: the matches
+    the team played in the N days before kick-off (time-based rolling count).
+    """
+    df = df.copy()
+    long_df = team_long_view(df, stats={})
+    is_home = long_df['is_home'].to_numpy()
+    match_idx = long_df['match_idx'].to_numpy()
+
+    # Why: long_df is in match order (home before away), so a grouped diff is the gap to the previous match
+    rest = long_df.groupby('team', sort=False)['Date'].diff().dt.days.to_numpy(dtype=float)
+
+    new_cols = {}
+    for side, rows in (('home', is_home), ('away', ~is_home)):
+        values = np.full(len(df), np.nan)
+        values[match_idx[rows]] = rest[rows]
+        new_cols[f'days_rest_{side}'] = values
+    new_cols['rest_days_diff'] = new_cols['days_rest_home'] - new_cols['days_rest_away']
+
+    if congestion_windows:
+        # Time-based rolling windows need each team's dates in order
+        by_date = long_df.sort_values('Date', kind='mergesort').assign(played=1.0)
+        # Rolling results come back team by team (in order of first appearance), each team's rows by date
+        codes = pd.factorize(by_date['team'])[0]
+        result_rows = by_date.index.to_numpy()[np.argsort(codes, kind='stable')]
+        for days in congestion_windows:
+            rolled = (
+                by_date.groupby('team', sort=False)
+                .rolling(f'{days}D', on='Date', closed='left')['played']
+                .sum()
+            )
+            counts = np.zeros(len(long_df))
+            counts[result_rows] = np.nan_to_num(rolled.to_numpy())
+            for side, rows in (('home', is_home), ('away', ~is_home)):
+                values = np.zeros(len(df))
+                values[match_idx[rows]] = counts[rows]
+                new_cols[f'{side}_matches_last{days}d'] = values
+
+    return pd.concat([df, pd.DataFrame(new_cols, index=df.index)], axis=1)
@@ -0,0 +1,5 @@
+# The pipeline modules are flat scripts in ManArs/, imported by name (import team_features)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
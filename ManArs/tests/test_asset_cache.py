@@ -0,0 +1,80 @@
+"""
+Logo background removal and the processed-asset cache
+-----------------------------------------------------
+asset_cache.remove_background replaced the dashboard's per-pixel loop over img.getdata().
+The loop is kept here as the reference and run on the logos shipped with the dashboard;
+processed_logo is checked to reuse its cached PNG.
+
+Run:
+    python -m pytest tests
+"""
+
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import asset_cache
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOGOS = ["arsenal_logo.png", "manutd_logo.png", "premier_league_logo.png"]
+
+
+# -------------------------
+# Reference implementation: the loop step6_dashboard used before asset_cache
+# -------------------------
+
+def legacy_remove_background(img):
+    img = img.convert("RGBA")
+    new_data = []
+    # Why: pixel tuples from NumPy rather than img.getdata(), which newer Pillow deprecates
+    for r, g, b, a in np.array(img).reshape(-1, 4).tolist():
+        is_background = (
+            (r > 240 and g > 240 and b > 240) or
+            (abs(r - g) < 10 and abs(g - b) < 10 and abs(r - b) < 10 and r > 200) or
+            (r > 230 and g > 230 and b > 220)
+        )
+        new_data.append((255, 255, 255, 0) if is_background else (r, g, b, a))
+    return Image.fromarray(np.array(new_data, dtype=np.uint8).reshape(img.height, img.width, 4), "RGBA")
+
+
+def every_colour():
+    # One pixel per (r, g, b) step of 5 around the thresholds, with varying alpha
+    levels = np.arange(180, 256, 5)
+    r, g, b = np.meshgrid(levels, levels, levels, indexing="ij")
+    alpha = np.resize(np.array([255, 128, 0]), r.size).reshape(r.shape)
+    pixels = np.stack([r, g, b, alpha], axis=-1).reshape(-1, 1, 4).astype(np.uint8)
+    return Image.fromarray(pixels, "RGBA")
+
+
+# -------------------------
+# Tests
+# -------------------------
+
+@pytest.mark.parametrize("logo", LOGOS)
+def test_logo_matches_legacy_loop(logo):
+    img = Image.open(os.path.join(CODE_DIR, logo)).resize((120, 120))
+    expected = np.array(legacy_remove_background(img))
+    np.testing.assert_array_equal(np.array(asset_cache.remove_background(img)), expected)
+
+
+def test_threshold_colours_match_legacy_loop():
+    img = every_colour()
+    np.testing.assert_array_equal(np.array(asset_cache.remove_background(img)),
+                                  np.array(legacy_remove_background(img)))
+
+
+def test_processed_logo_is_cached(tmp_path):
+    path = os.path.join(CODE_DIR, LOGOS[0])
+    first = asset_cache.processed_logo(path, (68, 68), cache_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 1
+
+    second = asset_cache.processed_logo(path, (68, 68), cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(np.array(second), np.array(first))
+    assert len(os.listdir(tmp_path)) == 1
+
+    # A different size or transparency is a different cache entry
+    asset_cache.processed_logo(path, (40, 40), cache_dir=str(tmp_path))
+    asset_cache.processed_logo(path, (68, 68), transparent=False, cache_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 3
@@ -0,0 +1,69 @@
+"""
+Batch scoring does not depend on the chunk size
+-----------------------------------------------
+batch_score.score_file streams a fixture list in chunks and carries rest days from one
+chunk to the next (FixtureFeatureBuilder.mark_played). A small registry and team state are
+built from the first part of tests/data/matches.csv, the rest of the matches are scored as
+fixtures, and the predictions must be the same for any chunk_rows.
+
+Run:
+    python -m pytest tests
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+import batch_score
+import feature_sets
+import feature_store
+import model_registry
+import storage
+import step2_feature_engineering as step2
+
+FIXTURE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "matches.csv")
+HISTORY_ROWS = 120
+FORMATS = ["csv"] + (["parquet"] if storage.HAVE_PYARROW else [])
+
+
+@pytest.fixture(scope="module")
+def data_dir(tmp_path_factory):
+    """Team state and a registered model (without odds features - the fixture has no prices)."""
+    data_dir = str(tmp_path_factory.mktemp("batch_score"))
+    matches = storage.read_table(FIXTURE_CSV).sort_values("Date", kind="mergesort").reset_index(drop=True)
+    features = step2.engineer_features(matches.iloc[:HISTORY_ROWS])
+    state = feature_store.build_state(features, window=step2.FORM_WINDOW, h2h_last_n=step2.H2H_LAST_N,
+                                      odds_method=step2.ODDS_MARGIN_METHOD, **step2.ELO_PARAMS)
+    feature_store.save_state(state, os.path.join(data_dir, "team_state.json"))
+
+    feature_cols = feature_sets.NO_ODDS_FEATURE_NAMES
+    model = RandomForestClassifier(n_estimators=20, random_state=42)
+    model.fit(feature_sets.build_matrix(features, feature_cols), features['match_winner'].to_numpy())
+    model_registry.register_model(model, feature_cols, registry_dir=os.path.join(data_dir, "models"))
+
+    fixtures = matches.iloc[HISTORY_ROWS:][['Date', 'HomeTeam', 'AwayTeam']]
+    for fmt in FORMATS:
+        storage.write_table(fixtures, storage.table_path(data_dir, "fixtures", fmt))
+    return data_dir
+
+
+def score(data_dir, fmt, chunk_rows):
+    output_path = os.path.join(data_dir, f"predictions-{fmt}-{chunk_rows}.csv")
+    rows, _ = batch_score.score_file(storage.table_path(data_dir, "fixtures", fmt), output_path,
+                                     chunk_rows=chunk_rows, data_dir=data_dir)
+    return rows, pd.read_csv(output_path)
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_predictions_do_not_depend_on_chunk_rows(data_dir, fmt):
+    rows, whole = score(data_dir, fmt, chunk_rows=1_000)
+    assert rows == len(whole) == 160 - HISTORY_ROWS
+    assert list(whole.columns) == batch_score.FIXTURE_COLUMNS + batch_score.PROB_COLUMNS + ['prediction']
+    np.testing.assert_allclose(whole[batch_score.PROB_COLUMNS].sum(axis=1), 1.0)
+
+    for chunk_rows in (1, 7):
+        _, chunked = score(data_dir, fmt, chunk_rows)
+        pd.testing.assert_frame_equal(chunked, whole)
@@ -0,0 +1,107 @@
+"""
+Parity tests for the Elo engine
+-------------------------------
+elo_engine replaced Step 2's two per-row Elo loops: compute_elo (post-match ratings
+elo_home / elo_away / elo_diff, from FTR) and add_elo_ratings (pre-match ratings
+home_elo / away_elo, from the goals). Both loops are kept here as the reference and
+checked against add_elo_features on tests/data/matches.csv.
+
+Run:
+    python -m pytest tests
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import storage
+from elo_engine import add_elo_features
+from step2_feature_engineering import standardize_matches
+
+FIXTURE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "matches.csv")
+
+
+@pytest.fixture(params=["categorical", "string"])
+def matches(request):
+    df = standardize_matches(storage.read_table(FIXTURE_CSV))
+    df = df.sort_values("Date", kind="mergesort").reset_index(drop=True)
+    if request.param == "string":
+        df = df.astype({"HomeTeam": "string", "AwayTeam": "string"})
+    return df
+
+
+# -------------------------
+# Reference implementations: the loops Step 2 used before elo_engine
+# -------------------------
+
+def legacy_compute_elo(df, k=20, base_elo=1500):
+    teams = pd.unique(df[['HomeTeam', 'AwayTeam']].values.ravel())
+    elo = {team: base_elo for team in teams}
+    elo_home, elo_away = [], []
+
+    for _, row in df.iterrows():
+        th = row['HomeTeam']
+        ta = row['AwayTeam']
+        Eh = 1 / (1 + 10 ** ((elo[ta] - elo[th]) / 400))
+        if row['FTR'] == 'H':
+            Sh = 1
+        elif row['FTR'] == 'D':
+            Sh = 0.5
+        else:
+            Sh = 0
+        elo[th] += k * (Sh - Eh)
+        elo[ta] += k * ((1 - Sh) - (1 - Eh))
+        elo_home.append(elo[th])
+        elo_away.append(elo[ta])
+
+    elo_home, elo_away = np.array(elo_home), np.array(elo_away)
+    return {'elo_home': elo_home, 'elo_away': elo_away, 'elo_diff': elo_home - elo_away}
+
+
+def legacy_add_elo_ratings(df, k=20, base_rating=1500):
+    teams = pd.unique(df[['HomeTeam', 'AwayTeam']].values.ravel('K'))
+    elo_dict = {team: base_rating for team in teams}
+    home_elo_list, away_elo_list = [], []
+
+    for _, row in df.iterrows():
+        home, away = row['HomeTeam'], row['AwayTeam']
+        home_elo_list.append(elo_dict[home])
+        away_elo_list.append(elo_dict[away])
+
+        expected_home = 1 / (1 + 10 ** ((elo_dict[away] - elo_dict[home]) / 400))
+        if row['FTHG'] > row['FTAG']:
+            result_home, result_away = 1, 0
+        elif row['FTHG'] < row['FTAG']:
+            result_home, result_away = 0, 1
+        else:
+            result_home, result_away = 0.5, 0.5
+        elo_dict[home] += k * (result_home - expected_home)
+        elo_dict[away] += k * (result_away - (1 - expected_home))
+
+    return {'home_elo': home_elo_list, 'away_elo': away_elo_list}
+
+
+# -------------------------
+# Tests
+# -------------------------
+
+def test_post_match_ratings_match_compute_elo(matches):
+    result = add_elo_features(matches)
+    for col, values in legacy_compute_elo(matches).items():
+        np.testing.assert_allclose(result[col].to_numpy(dtype=float), values, err_msg=col)
+
+
+def test_pre_match_ratings_match_add_elo_ratings(matches):
+    result = add_elo_features(matches)
+    for col, values in legacy_add_elo_ratings(matches).items():
+        np.testing.assert_allclose(result[col].to_numpy(dtype=float), np.array(values), err_msg=col)
+
+
+def test_interpreted_loop_matches_compiled(matches):
+    # Without numba both calls take the interpreted path; with numba this checks the compiled loop
+    compiled = add_elo_features(matches, use_compiled=True)
+    interpreted = add_elo_features(matches, use_compiled=False)
+    for col in ['home_elo', 'away_elo', 'elo_home', 'elo_away', 'elo_diff']:
+        np.testing.assert_allclose(compiled[col].to_numpy(), interpreted[col].to_numpy(), err_msg=col)
@@ -0,0 +1,94 @@
+"""
+Incremental Step 2 update vs a full rebuild
+-------------------------------------------
+feature_store.apply_matches adds new matches from the saved per-team state instead of
+replaying the whole history. These tests build the state from the first part of
+tests/data/matches.csv, apply the rest, and check the new rows and the updated state
+against a full Step 2 rebuild of every match.
+
+Run:
+    python -m pytest tests
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import feature_store
+import storage
+import step2_feature_engineering as step2
+
+FIXTURE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "matches.csv")
+# Why: the split falls inside a matchday, so select_new_matches must pick up the rest of that date
+SPLIT = 121
+KEY = ['Date', 'HomeTeam', 'AwayTeam']
+
+
+def build_state(features_df):
+    return feature_store.build_state(features_df, window=step2.FORM_WINDOW, h2h_last_n=step2.H2H_LAST_N,
+                                     odds_method=step2.ODDS_MARGIN_METHOD, **step2.ELO_PARAMS)
+
+
+@pytest.fixture
+def matches():
+    return storage.read_table(FIXTURE_CSV).sort_values("Date", kind="mergesort").reset_index(drop=True)
+
+
+@pytest.fixture
+def full(matches):
+    return step2.engineer_features(matches)
+
+
+@pytest.fixture
+def state(matches):
+    return build_state(step2.engineer_features(matches.iloc[:SPLIT]))
+
+
+def by_key(df):
+    return df.astype({"HomeTeam": str, "AwayTeam": str}).sort_values(KEY).reset_index(drop=True)
+
+
+def test_split_is_inside_a_matchday(matches):
+    assert matches['Date'].iloc[SPLIT - 1] == matches['Date'].iloc[SPLIT]
+
+
+def test_select_new_matches_returns_unapplied_rows(matches, state):
+    new = feature_store.select_new_matches(matches, state)
+    pd.testing.assert_frame_equal(by_key(new[KEY]), by_key(matches.iloc[SPLIT:][KEY]))
+
+
+def test_apply_matches_matches_full_rebuild(matches, full, state):
+    new_matches = step2.standardize_matches(feature_store.select_new_matches(matches, state))
+    new = by_key(feature_store.apply_matches(state, new_matches))
+    # Why: a full rebuild orders same-day matches differently, so rows are matched by date and teams
+    expected = by_key(full).merge(new[KEY], on=KEY)
+
+    assert len(expected) == len(new) == len(matches) - SPLIT
+    columns = [col for col in new.columns
+               if col in expected.columns and col not in KEY and pd.api.types.is_numeric_dtype(expected[col])]
+    assert 'home_elo' in columns and f'home_points_last{step2.FORM_WINDOW}' in columns
+    for col in columns:
+        np.testing.assert_allclose(new[col].to_numpy(dtype=float), expected[col].to_numpy(dtype=float),
+                                   rtol=1e-6, equal_nan=True, err_msg=col)
+
+
+def test_update_features_keeps_rebuild_columns(matches, full, state):
+    new = step2.update_features(feature_store.select_new_matches(matches, state), state, list(full.columns))
+    assert list(new.columns) == list(full.columns)
+    assert len(new) == len(matches) - SPLIT
+
+
+def test_updated_state_matches_rebuilt_state(matches, full, state):
+    feature_store.apply_matches(state, step2.standardize_matches(feature_store.select_new_matches(matches, state)))
+    rebuilt = build_state(full)
+
+    assert state['last_date'] == rebuilt['last_date']
+    assert sorted(map(tuple, state['last_date_matches'])) == sorted(map(tuple, rebuilt['last_date_matches']))
+    assert set(state['teams']) == set(rebuilt['teams'])
+    for team, expected in rebuilt['teams'].items():
+        assert state['teams'][team]['last_date'] == expected['last_date'], team
+        assert state['teams'][team]['elo'] == pytest.approx(expected['elo']), team
+        for stat, values in expected['form'].items():
+            np.testing.assert_allclose(state['teams'][team]['form'][stat], values, err_msg=f"{team} {stat}")
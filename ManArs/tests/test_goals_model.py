@@ -0,0 +1,73 @@
+"""
+Dixon-Coles goals model
+-----------------------
+DixonColesModel is fitted with L-BFGS-B on an analytic gradient. These tests compare that
+gradient with finite differences (scipy.optimize.check_grad) on the matches in
+tests/data/matches.csv, including the low-score correction rows, and check a fitted model
+gives proper Home / Draw / Away probabilities.
+
+Run:
+    python -m pytest tests
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.optimize import check_grad
+
+import storage
+from goals_model import DixonColesModel
+
+FIXTURE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "matches.csv")
+
+
+@pytest.fixture
+def matches():
+    return storage.read_table(FIXTURE_CSV)
+
+
+def likelihood_args(model, df):
+    """(home, away, x, y, weights, n_teams) as DixonColesModel.fit passes them to the objective."""
+    teams = sorted(pd.unique(np.concatenate([df['HomeTeam'].astype(str), df['AwayTeam'].astype(str)])))
+    team_id = {team: i for i, team in enumerate(teams)}
+    home = df['HomeTeam'].astype(str).map(team_id).to_numpy(dtype=int)
+    away = df['AwayTeam'].astype(str).map(team_id).to_numpy(dtype=int)
+    age_days = (df['Date'].max() - df['Date']).dt.days.to_numpy(dtype=float)
+    return (home, away, df['FTHG'].to_numpy(dtype=float), df['FTAG'].to_numpy(dtype=float),
+            np.exp(-model.xi * age_days), len(teams))
+
+
+def test_fixture_has_low_scores(matches):
+    # Every branch of the Dixon-Coles correction (0-0, 1-0, 0-1, 1-1) contributes to the gradient
+    scores = set(zip(matches['FTHG'], matches['FTAG']))
+    assert {(0, 0), (1, 0), (0, 1), (1, 1)} <= scores
+
+
+@pytest.mark.parametrize("rho", [-0.15, 0.0, 0.12])
+def test_gradient_matches_finite_differences(matches, rho):
+    model = DixonColesModel()
+    args = likelihood_args(model, matches)
+    n_teams = args[-1]
+    rng = np.random.default_rng(42)
+    params = np.concatenate([rng.normal(0, 0.3, 2 * n_teams), [0.25, rho]])
+
+    def value(p):
+        return model._neg_log_likelihood(p, *args)[0]
+
+    def gradient(p):
+        return model._neg_log_likelihood(p, *args)[1]
+
+    error = check_grad(value, gradient, params)
+    assert error < 1e-4 * max(1.0, np.linalg.norm(gradient(params)))
+
+
+def test_fitted_probabilities(matches):
+    model = DixonColesModel().fit(matches)
+    assert abs(model.attack.sum()) < 1e-3
+    assert model.home_advantage > 0
+
+    probs = model.predict("Arsenal", "Man United")
+    assert set(probs) == {'Away', 'Draw', 'Home'}
+    assert sum(probs.values()) == pytest.approx(1.0, abs=1e-6)
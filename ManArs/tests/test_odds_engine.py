@@ -0,0 +1,72 @@
+"""
+Margin removal in the odds engine
+---------------------------------
+odds_engine.remove_margin turns decimal 1X2 prices into probabilities with every method in
+odds_engine.METHODS. The match fixture has no bookmaker prices, so these tests use a few
+price rows typical of the season files (a heavy favourite, an even match, a long shot and
+a row with a missing price).
+
+Run:
+    python -m pytest tests
+"""
+
+import numpy as np
+import pytest
+
+from odds_engine import METHODS, remove_margin
+
+# home, draw, away decimal odds
+PRICES = np.array([
+    [1.25, 6.50, 11.00],
+    [2.60, 3.30, 2.75],
+    [9.00, 5.25, 1.33],
+    [1.95, 3.60, 4.00],
+])
+MISSING = np.array([[2.10, np.nan, 3.40]])
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_probabilities_sum_to_one(method):
+    probs = remove_margin(PRICES, method)
+    np.testing.assert_allclose(probs.sum(axis=-1), 1.0, rtol=1e-9)
+    assert ((probs > 0) & (probs < 1)).all()
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_every_bookmaker_sums_to_one(method):
+    # (matches, bookmakers, 3), as odds_engine.stack_prices builds it
+    prices = np.stack([PRICES, PRICES * 1.03], axis=1)
+    probs = remove_margin(prices, method)
+    assert probs.shape == prices.shape
+    np.testing.assert_allclose(probs.sum(axis=-1), 1.0, rtol=1e-9)
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_keeps_the_favourite(method):
+    probs = remove_margin(PRICES, method)
+    np.testing.assert_array_equal(probs.argmax(axis=-1), (1 / PRICES).argmax(axis=-1))
+
+
+def test_proportional_divides_by_booksum():
+    implied = 1 / PRICES
+    np.testing.assert_allclose(remove_margin(PRICES, 'proportional'), implied / implied.sum(axis=-1, keepdims=True))
+
+
+@pytest.mark.parametrize("method", ['shin', 'power'])
+def test_shades_longshots_more_than_proportional(method):
+    # Both models put more of the margin on the long shot than dividing by the booksum does
+    proportional = remove_margin(PRICES, 'proportional')
+    probs = remove_margin(PRICES, method)
+    longshot = (1 / PRICES).argmin(axis=-1)
+    rows = np.arange(len(PRICES))
+    assert (probs[rows, longshot] < proportional[rows, longshot]).all()
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_missing_price_gives_nan(method):
+    assert np.isnan(remove_margin(MISSING, method)).all()
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        remove_margin(PRICES, 'basic')
@@ -0,0 +1,110 @@
+"""
+Skip / rerun decisions of the cached pipeline runner
+----------------------------------------------------
+Two small steps in a temporary data directory: "head" copies the first rows of
+tests/data/matches.csv, "count" counts the rows "head" wrote and declares a fixture param.
+run_cached_steps must skip a step only while its inputs, params and outputs are unchanged.
+
+Run:
+    python -m pytest tests
+"""
+
+import os
+import shutil
+
+import pytest
+
+import pipeline_cache
+from pipeline_cache import Step
+
+FIXTURE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "matches.csv")
+HEAD_ROWS = 10
+FIXTURE = ["Arsenal", "Man United", "2025-08-17"]
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    shutil.copy(FIXTURE_CSV, tmp_path / "matches.csv")
+    return str(tmp_path)
+
+
+def make_steps(fixture=FIXTURE):
+    steps = [
+        Step("head", "step1_data_collection.py", inputs=["matches.csv"], outputs=["head.csv"]),
+        Step("count", "step5_finalOne.py", inputs=["head.csv"], outputs=["count.txt"],
+             depends_on=["head"], params={'fixture': list(FIXTURE)}),
+    ]
+    return pipeline_cache.with_params(steps, fixture=list(fixture))
+
+
+def run(data_dir, steps, force=False):
+    def run_step(step):
+        if step.name == "head":
+            with open(os.path.join(data_dir, "matches.csv")) as src:
+                lines = src.readlines()[:HEAD_ROWS + 1]
+            with open(os.path.join(data_dir, "head.csv"), "w") as dst:
+                dst.writelines(lines)
+        else:
+            with open(os.path.join(data_dir, "head.csv")) as src:
+                rows = len(src.readlines()) - 1
+            with open(os.path.join(data_dir, "count.txt"), "w") as dst:
+                dst.write(f"{rows} {step.params['fixture']}")
+
+    timings = pipeline_cache.run_cached_steps(steps, run_step, data_dir=data_dir, force=force)
+    return {name: status for name, status, _ in timings}
+
+
+def edit_line(path, line_no, old, new):
+    with open(path) as f:
+        lines = f.readlines()
+    assert old in lines[line_no]
+    lines[line_no] = lines[line_no].replace(old, new, 1)
+    with open(path, "w") as f:
+        f.writelines(lines)
+
+
+def test_first_run_runs_then_skips(data_dir):
+    assert run(data_dir, make_steps()) == {"head": "ran", "count": "ran"}
+    assert run(data_dir, make_steps()) == {"head": "skipped", "count": "skipped"}
+
+
+def test_changed_input_reruns_dependents(data_dir):
+    run(data_dir, make_steps())
+    edit_line(os.path.join(data_dir, "matches.csv"), 1, "E0", "E1")
+    assert run(data_dir, make_steps()) == {"head": "ran", "count": "ran"}
+
+
+def test_identical_outputs_skip_later_steps(data_dir):
+    # A change past the copied rows reruns "head", but head.csv comes out byte-identical
+    run(data_dir, make_steps())
+    edit_line(os.path.join(data_dir, "matches.csv"), -1, "E0", "E1")
+    assert run(data_dir, make_steps()) == {"head": "ran", "count": "skipped"}
+
+
+def test_changed_fixture_param_reruns_only_its_step(data_dir):
+    run(data_dir, make_steps())
+    other = ["Chelsea", "Liverpool", "2025-08-24"]
+    assert run(data_dir, make_steps(other)) == {"head": "skipped", "count": "ran"}
+    assert run(data_dir, make_steps(other)) == {"head": "skipped", "count": "skipped"}
+    with open(os.path.join(data_dir, "count.txt")) as f:
+        assert "Chelsea" in f.read()
+
+
+def test_touched_or_missing_output_reruns(data_dir):
+    run(data_dir, make_steps())
+    with open(os.path.join(data_dir, "count.txt"), "a") as f:
+        f.write(" edited")
+    assert run(data_dir, make_steps()) == {"head": "skipped", "count": "ran"}
+    os.remove(os.path.join(data_dir, "head.csv"))
+    assert run(data_dir, make_steps()) == {"head": "ran", "count": "skipped"}
+
+
+def test_force_runs_everything(data_dir):
+    run(data_dir, make_steps())
+    assert run(data_dir, make_steps(), force=True) == {"head": "ran", "count": "ran"}
+
+
+def test_with_params_ignores_undeclared_params():
+    steps = pipeline_cache.with_params(make_steps(), fixture=["A", "B", "2025-01-01"])
+    assert steps[0].params == {}
+    assert steps[1].params == {'fixture': ["A", "B", "2025-01-01"]}
@@ -0,0 +1,98 @@
+"""
+Round trips through the typed table storage
+-------------------------------------------
+write_table / append_table / read_table / iter_table on tests/data/matches.csv for every
+format: values survive, compact dtypes come back (one team dictionary shared by HomeTeam
+and AwayTeam), and rows appended as Parquet / Feather part files are read with the table.
+
+Run:
+    python -m pytest tests
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+import storage
+
+FIXTURE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "matches.csv")
+FORMATS = ["csv"] + (["parquet", "feather"] if storage.HAVE_PYARROW else [])
+
+
+@pytest.fixture
+def matches():
+    return storage.read_table(FIXTURE_CSV)
+
+
+def plain(df):
+    """`df` with text as strings, so tables with different category lists compare equal."""
+    return df.astype({col: str for col in df.columns if col in storage.TEXT_COLUMNS}).reset_index(drop=True)
+
+
+def assert_shared_team_dtype(df):
+    assert isinstance(df['HomeTeam'].dtype, pd.CategoricalDtype)
+    assert df['HomeTeam'].dtype == df['AwayTeam'].dtype
+
+
+def test_read_fixture_is_compact(matches):
+    assert_shared_team_dtype(matches)
+    assert matches['FTHG'].dtype == 'int8' and matches['HS'].dtype == 'int16'
+    assert pd.api.types.is_datetime64_any_dtype(matches['Date'])
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_write_read_round_trip(matches, tmp_path, fmt):
+    path = storage.table_path(str(tmp_path), "matches", fmt)
+    storage.write_table(matches, path)
+    result = storage.read_table(path)
+    pd.testing.assert_frame_equal(plain(result), plain(matches))
+    assert_shared_team_dtype(result)
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_read_selected_columns(matches, tmp_path, fmt):
+    path = storage.table_path(str(tmp_path), "matches", fmt)
+    storage.write_table(matches, path)
+    assert storage.table_columns(path) == list(matches.columns)
+    result = storage.read_table(path, columns=['Date', 'HomeTeam', 'FTHG'])
+    pd.testing.assert_frame_equal(plain(result), plain(matches[['Date', 'HomeTeam', 'FTHG']]))
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_append_round_trip(matches, tmp_path, fmt):
+    # The second season's promoted teams are only in the appended rows
+    path = storage.table_path(str(tmp_path), "matches", fmt)
+    storage.write_table(matches.iloc[:80], path)
+    storage.append_table(matches.iloc[80:120], path)
+    storage.append_table(matches.iloc[120:], path)
+
+    parts = storage.table_files(path)[1:]
+    assert len(parts) == (0 if fmt == "csv" else 2)
+    result = storage.read_table(path)
+    pd.testing.assert_frame_equal(plain(result), plain(matches))
+    assert_shared_team_dtype(result)
+    assert set(result['HomeTeam'].cat.categories) == set(matches['HomeTeam'].astype(str))
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_write_table_removes_part_files(matches, tmp_path, fmt):
+    path = storage.table_path(str(tmp_path), "matches", fmt)
+    storage.write_table(matches.iloc[:80], path)
+    storage.append_table(matches.iloc[80:], path)
+    storage.write_table(matches.iloc[:10], path)
+    assert storage.table_files(path) == [path]
+    assert len(storage.read_table(path)) == 10
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_iter_table_matches_read_table(matches, tmp_path, fmt):
+    path = storage.table_path(str(tmp_path), "matches", fmt)
+    storage.write_table(matches.iloc[:100], path)
+    storage.append_table(matches.iloc[100:], path)
+    columns = ['Date', 'HomeTeam', 'AwayTeam', 'FTHG']
+
+    chunks = list(storage.iter_table(path, chunk_rows=30, columns=columns))
+    assert all(len(chunk) <= 30 for chunk in chunks)
+    pd.testing.assert_frame_equal(plain(pd.concat(chunks)), plain(storage.read_table(path, columns=columns)),
+                                  check_dtype=False)
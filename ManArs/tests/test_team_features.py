@@ -0,0 +1,125 @@
+"""
+Parity tests for the vectorised Step 2 feature engines
+------------------------------------------------------
+team_features replaced Step 2's per-row iterrows() loops. These tests run the original
+loops (kept here as the reference) and the vectorised functions on the same fixture CSV
+(tests/data/matches.csv: the end of one season and the start of the next, so promoted
+teams appear part-way through) and check the outputs are identical.
+
+Run:
+    python -m pytest tests
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import storage
+from step2_feature_engineering import standardize_matches
+from team_features import FORM_STATS, add_rest_days, add_rolling_features
+
+FIXTURE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "matches.csv")
+WINDOW = 5
+
+
+@pytest.fixture(params=["categorical", "string"])
+def matches(request):
+    # read_table gives the compact dtypes Step 2 sees (categorical teams); also check plain strings
+    df = standardize_matches(storage.read_table(FIXTURE_CSV))
+    df = df.sort_values("Date").reset_index(drop=True)
+    if request.param == "string":
+        df = df.astype({"HomeTeam": "string", "AwayTeam": "string"})
+    return df
+
+
+# -------------------------
+# Reference implementations: the per-row loops Step 2 used before vectorisation
+# -------------------------
+
+def legacy_rolling_features(df, window=WINDOW):
+    points = {'H': (3, 0), 'D': (1, 1), 'A': (0, 3)}
+    history = {}
+    out = {f'{side}_{stat}_last{window}': [] for stat in FORM_STATS for side in ('home', 'away')}
+
+    for _, row in df.iterrows():
+        home_points, away_points = points.get(row['FTR'], (0, 0))
+        values = {'home_points': home_points, 'away_points': away_points}
+        for side, team in (('home', row['HomeTeam']), ('away', row['AwayTeam'])):
+            stats = history.setdefault(team, {stat: [] for stat in FORM_STATS})
+            for stat in FORM_STATS:
+                recent = stats[stat][-window:]
+                out[f'{side}_{stat}_last{window}'].append(np.mean(recent) if len(recent) >= window else np.nan)
+        for side, team in ((0, row['HomeTeam']), (1, row['AwayTeam'])):
+            for stat, cols in FORM_STATS.items():
+                col = cols[side]
+                history[team][stat].append(values[col] if col in values else row.get(col, 0))
+    return out
+
+
+def legacy_rest_days(df, congestion_windows=()):
+    last_game_date = {}
+    played = {}
+    out = {'days_rest_home': [], 'days_rest_away': []}
+    for days in congestion_windows:
+        out[f'home_matches_last{days}d'] = []
+        out[f'away_matches_last{days}d'] = []
+
+    for _, row in df.iterrows():
+        date = row['Date']
+        for side, team in (('home', row['HomeTeam']), ('away', row['AwayTeam'])):
+            out[f'days_rest_{side}'].append(
+                (date - last_game_date[team]).days if team in last_game_date else np.nan)
+            for days in congestion_windows:
+                window_start = date - pd.Timedelta(days=days)
+                out[f'{side}_matches_last{days}d'].append(
+                    sum(window_start <= d < date for d in played.get(team, [])))
+        for team in (row['HomeTeam'], row['AwayTeam']):
+            last_game_date[team] = date
+            played.setdefault(team, []).append(date)
+    out['rest_days_diff'] = np.array(out['days_rest_home']) - np.array(out['days_rest_away'])
+    return out
+
+
+# -------------------------
+# Tests
+# -------------------------
+
+def test_fixture_has_promoted_teams(matches):
+    # Teams that first appear part-way through the file exercise the "fewer than WINDOW matches" path
+    def teams(rows):
+        return set(rows['HomeTeam'].astype(str)) | set(rows['AwayTeam'].astype(str))
+    half = len(matches) // 2
+    assert teams(matches.iloc[half:]) - teams(matches.iloc[:half])
+
+
+def test_rolling_features_match_legacy_loop(matches):
+    result = add_rolling_features(matches, window=WINDOW)
+    expected = legacy_rolling_features(matches, window=WINDOW)
+    for col, values in expected.items():
+        np.testing.assert_allclose(result[col].to_numpy(dtype=float), np.array(values, dtype=float),
+                                   equal_nan=True, err_msg=col)
+
+
+def test_rolling_features_keep_input_columns(matches):
+    result = add_rolling_features(matches, window=WINDOW)
+    assert list(result.columns[:len(matches.columns)]) == list(matches.columns)
+    assert len(result) == len(matches)
+
+
+def test_rest_days_match_legacy_loop(matches):
+    result = add_rest_days(matches)
+    expected = legacy_rest_days(matches)
+    for col, values in expected.items():
+        np.testing.assert_allclose(result[col].to_numpy(dtype=float), np.array(values, dtype=float),
+                                   equal_nan=True, err_msg=col)
+
+
+def test_congestion_counts_match_legacy_loop(matches):
+    windows = (7, 14, 30)
+    result = add_rest_days(matches, congestion_windows=windows)
+    expected = legacy_rest_days(matches, congestion_windows=windows)
+    for col, values in expected.items():
+        np.testing.assert_allclose(result[col].to_numpy(dtype=float), np.array(values, dtype=float),
+                                   equal_nan=True, err_msg=col)
@@ -0,0 +1,128 @@
+"""
+Walk-forward (time-aware) validation
+------------------------------------
+Purpose:
+    Random train/test splits let the model train on matches played AFTER the ones it is
+    tested on, which leaks future information and inflates scores. Walk-forward validation
+    only ever trains on the past:
+
+        fold 1: train on season 1            -> predict season 2
+        fold 2: train on seasons 1 - 2       -> predict season 3
+        ...
+
+    Blocks can be seasons, calendar months or (ISO) weeks, i.e. matchweeks.
+    Folds are independent, so they are fitted in parallel on a process pool.
+
+Output:
+    One row per fold with its cutoff, sizes, log loss, Brier score, accuracy and timings.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, log_loss
+
+
+def season_of(dates):
+    """Season start year (a season runs August to May, so July onwards starts a new one)."""
+    dates = pd.to_datetime(pd.Series(dates))
+    return (dates.dt.year - (dates.dt.month < 7)).to_numpy()
+
+
+def block_labels(dates, block='season'):
+    """Label each match with its time block: 'season', 'month' or 'week'."""
+    dates = pd.to_datetime(pd.Series(dates))
+    if block == 'season':
+        return season_of(dates)
+    if block == 'month':
+        return dates.dt.to_period('M').astype(str).to_numpy()
+    if block == 'week':
+        return dates.dt.to_period('W').astype(str).to_numpy()
+    raise ValueError(f"Unknown block '{block}' (use 'season', 'month' or 'week')")
+
+
+def make_folds(dates, block='season', min_train_blocks=1, step=1):
+    """
+    (cutoff label, train indices, test indices) for each fold.
+
+    The first fold trains on the first `min_train_blocks` blocks; each later fold moves the
+    cutoff forward by `step` blocks and tests on the `step` blocks after it.
+    """
+    labels = block_labels(dates, block)
+    order = np.array(sorted(pd.unique(labels)))
+    folds = []
+    for cut in range(min_train_blocks, len(order), step):
+        train_blocks = order[:cut]
+        test_blocks = order[cut:cut + step]
+        train_idx = np.flatnonzero(np.isin(labels, train_blocks))
+        test_idx = np.flatnonzero(np.isin(labels, test_blocks))
+        folds.append((str(test_blocks[0]), train_idx, test_idx))
+    return folds
+
+
+def brier_score(y_true, proba, classes):
+    """Multi-class Brier score: mean over matches of the squared error summed over outcomes."""
+    onehot = (np.asarray(y_true)[:, None] == np.asarray(classes)[None, :]).astype(float)
+    return float(np.mean(np.sum((proba - onehot) ** 2, axis=1)))
+
+
+def _run_fold(model, X_train, y_train, X_test, y_test, classes, cutoff):
+    start = time.perf_counter()
+    fold_model = clone(model).fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Align columns to the full class list in case a class is missing from this training window
+    proba = np.zeros((len(X_test), len(classes)))
+    fold_proba = fold_model.predict_proba(X_test)
+    for j, cls in enumerate(fold_model.classes_):
+        proba[:, list(classes).index(cls)] = fold_proba[:, j]
+    predict_seconds = time.perf_counter() - start
+
+    return {
+        'cutoff': cutoff,
+        'n_train': len(y_train),
+        'n_test': len(y_test),
+        'log_loss': log_loss(y_test, proba, labels=classes),
+        'brier': brier_score(y_test, proba, classes),
+        'accuracy': accuracy_score(y_test, np.asarray(classes)[proba.argmax(axis=1)]),
+        'fit_seconds': fit_seconds,
+        'predict_seconds': predict_seconds,
+    }
+
+
+def walk_forward(model, X, y, dates, block='season', min_train_blocks=1, step=1, n_jobs=None):
+    """
+    Walk-forward backtest of `model` (any sklearn classifier with predict_proba).
+
+    Folds run on a process pool with `n_jobs` workers (default: one per CPU; 1 runs serially).
+    Returns a DataFrame with one row per fold.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    y = np.asarray(y)
+    classes = sorted(pd.unique(y))
+    folds = make_folds(dates, block, min_train_blocks, step)
+    if not folds:
+        raise ValueError(f"Not enough {block}s for walk-forward validation")
+
+    jobs = [(model, X[train], y[train], X[test], y[test], classes, cutoff)
+            for cutoff, train, test in folds]
+    n_jobs = n_jobs or os.cpu_count()
+    if n_jobs == 1:
+        rows = [_run_fold(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(jobs))) as pool:
+            futures = [pool.submit(_run_fold, *job) for job in jobs]
+            rows = [future.result() for future in futures]
+    return pd.DataFrame(rows)
+
+
+def print_report(report):
+    print("\n⏩ Walk-forward validation (train on the past, predict the next block):")
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"📈 Mean log loss: {report['log_loss'].mean():.3f} | "
+          f"Mean Brier: {report['brier'].mean():.3f} | Mean accuracy: {report['accuracy'].mean():.2%}")